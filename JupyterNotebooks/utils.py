@@ -1,8 +1,16 @@
 ## FUNCIONES DE UTILIDAD PARA EL ETL Y EDA
 # Importaciones
 import pandas as pd
-from textblob import TextBlob
+import numpy as np
+import os
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Constantes
+# Textos distintos a partir de los cuales conviene el pool: cada proceso tarda varios segundos en
+# arrancar e importar TextBlob, lo mismo que analizar unos 20.000 textos (~0,15 ms cada uno)
+TEXTOS_MINIMOS_POOL = 20_000
 
 # Funciones
 def verificar_tipo_datos(df):
@@ -55,6 +63,8 @@ def analisis_sentimiento(review):
              - 1 para sentimiento neutral o no clasificable.
              - 2 para sentimiento positivo.
     '''
+    from textblob import TextBlob
+
     if review is None:
         return 1
     analysis = TextBlob(review)
@@ -216,4 +226,414 @@ def bigote_max(columna):
     print(f'El bigote superior de la variable {columna.name} se ubica en:', bigote_max)
 
     # Cantidad de atípicos
-    print(f'Hay {(columna > bigote_max).sum()} valores atípicos en la variable {columna.name}')
\ No newline at end of file
+    print(f'Hay {(columna > bigote_max).sum()} valores atípicos en la variable {columna.name}')
+
+
+## VERSIONES VECTORIZADAS
+# Equivalentes de las funciones anteriores que operan sobre una Series (o DataFrame) completa
+# con operaciones nativas de pandas, en lugar de llamarse fila por fila con .apply. Las
+# versiones escalares se mantienen para los notebooks existentes. Ver benchmarks/bench_utils.py.
+
+def _tipos_serie(serie):
+    '''
+    Devuelve la lista de tipos de Python de los valores de una Series, sin recorrerla fila por fila.
+
+    En las columnas con dtype propio (numéricas, fechas, categorías) todos los valores no nulos
+    comparten el tipo, así que se inspecciona un solo valor no nulo y uno nulo. En las columnas
+    'object', pd.api.types.infer_dtype detecta sin llamar a type() por valor el caso habitual
+    de que todos los no nulos sean texto; sólo las columnas con otros tipos se recorren enteras.
+    '''
+    if serie.dtype != object:
+        muestra = pd.concat([serie.dropna().iloc[:1], serie[serie.isna()].iloc[:1]])
+        return [type(valor) for valor in muestra]
+
+    nulos = serie.isna()
+    tipos_nulos = list(serie[nulos].map(type).unique()) if nulos.any() else []
+    if pd.api.types.infer_dtype(serie, skipna=True) == 'string' and not nulos.all():
+        return [str] + tipos_nulos
+    return list(serie[~nulos].map(type).unique()) + tipos_nulos
+
+def verificar_tipo_datos_vectorizado(df):
+    '''
+    Versión vectorizada de verificar_tipo_datos, con el mismo formato de salida (ver _tipos_serie).
+
+    Parameters:
+        df (pandas.DataFrame): El DataFrame que se va a analizar.
+
+    Returns:
+        pandas.DataFrame: Mismas columnas que verificar_tipo_datos.
+    '''
+    no_nulos = df.count()
+    nulos = len(df) - no_nulos
+    porcentaje_no_nulos = (no_nulos / len(df)) * 100 if len(df) else no_nulos * 0.0
+
+    return pd.DataFrame({
+        "nombre_campo": df.columns,
+        "tipo_datos": [pd.unique(np.array(_tipos_serie(df[columna]), dtype=object)) for columna in df.columns],
+        "no_nulos_%": porcentaje_no_nulos.round(2).to_numpy(),
+        "nulos_%": (100 - porcentaje_no_nulos).round(2).to_numpy(),
+        "nulos": nulos.to_numpy(),
+    })
+
+def _polaridades(textos):
+    '''
+    Calcula la polaridad de TextBlob de un lote de textos (se ejecuta en cada proceso del pool).
+    '''
+    from textblob import TextBlob
+
+    return [TextBlob(texto).sentiment.polarity for texto in textos]
+
+def analisis_sentimiento_serie(reviews, procesos=None, tamanio_lote=1000):
+    '''
+    Versión por lotes de analisis_sentimiento.
+
+    Cada texto distinto se analiza una sola vez y los textos se reparten en lotes entre varios procesos.
+
+    Parameters:
+        reviews (pandas.Series): Textos a analizar; los nulos se clasifican como neutrales.
+        procesos (int, opcional): Cantidad de procesos; por defecto, uno por núcleo, y nunca más
+            que núcleos. Con un solo proceso, o menos de TEXTOS_MINIMOS_POOL textos distintos, no
+            se crea el pool.
+        tamanio_lote (int): Cantidad de textos por tarea enviada a cada proceso.
+
+    Returns:
+        pandas.Series: 0 (negativo), 1 (neutral o nulo) o 2 (positivo), con el índice de reviews.
+    '''
+    validos = reviews.notna()
+    textos = reviews[validos].astype(str)
+    unicos = textos.drop_duplicates().tolist()
+    lotes = [unicos[i:i + tamanio_lote] for i in range(0, len(unicos), tamanio_lote)]
+    nucleos = os.cpu_count() or 1
+    procesos = min(procesos or nucleos, nucleos)
+
+    # Con un solo proceso, un solo lote o pocos textos el pool sólo agrega el costo de crear los procesos
+    if procesos == 1 or len(lotes) <= 1 or len(unicos) < TEXTOS_MINIMOS_POOL:
+        resultados = map(_polaridades, lotes)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            resultados = list(ejecutor.map(_polaridades, lotes))
+    polaridades = pd.Series([p for lote in resultados for p in lote], index=unicos, dtype=float)
+    polaridad = textos.map(polaridades).to_numpy()
+
+    sentimiento = pd.Series(1, index=reviews.index, dtype='int8')
+    sentimiento[validos] = np.select([polaridad < -0.2, polaridad > 0.2], [0, 2], default=1).astype('int8')
+    return sentimiento
+
+def obtener_anio_release_serie(fechas):
+    '''
+    Versión vectorizada de obtener_anio_release.
+
+    Parameters:
+        fechas (pandas.Series): Fechas en formato 'yyyy-mm-dd' (texto), con posibles nulos.
+
+    Returns:
+        pandas.Series: El año como texto, o 'Dato no disponible' si es nulo o tiene otro formato.
+    '''
+    anio = fechas.astype('string').str.extract(r'^(\d{4})-\d{2}-\d{2}$', expand=False)
+    return anio.fillna('Dato no disponible').astype(object)
+
+def reemplaza_a_flotante_serie(valores):
+    '''
+    Versión vectorizada de reemplaza_a_flotante: convierte a float y reemplaza nulos y no numéricos por 0.0.
+    '''
+    return pd.to_numeric(valores, errors='coerce').astype('float64').fillna(0.0)
+
+def convertir_fecha_serie(cadenas_fecha):
+    '''
+    Versión vectorizada de convertir_fecha.
+
+    Extrae con una sola expresión regular la parte "Month Day, Year" y la convierte con un
+    formato fijo; sólo las que no respetan ese formato exacto (por ejemplo, meses abreviados)
+    se vuelven a intentar con el parser flexible de pandas.
+
+    Parameters:
+        cadenas_fecha (pandas.Series): Textos con fechas como "September 1, 2023".
+
+    Returns:
+        pandas.Series: Fechas "YYYY-MM-DD", 'Fecha inválida' o 'Formato inválido' (igual que convertir_fecha).
+    '''
+    extraidas = cadenas_fecha.astype('string').str.extract(r'(\w+\s\d{1,2},\s\d{4})', expand=False)
+    fechas = pd.to_datetime(extraidas, format='%B %d, %Y', errors='coerce')
+
+    reintentar = fechas.isna() & extraidas.notna()
+    if reintentar.any():
+        fechas[reintentar] = pd.to_datetime(extraidas[reintentar], format='mixed', errors='coerce')
+
+    resultado = fechas.dt.strftime('%Y-%m-%d').astype(object)
+    resultado[fechas.isna()] = 'Fecha inválida'
+    resultado[extraidas.isna()] = 'Formato inválido'
+    return resultado
+
+
+
+## PERFILADO DE DATOS EN UNA SOLA PASADA
+# Reemplaza las llamadas por columna a verificar_tipo_datos, resumen_cant_porcentaje y
+# bigote_max (cada una vuelve a recorrer los datos) por un perfil que se actualiza bloque a
+# bloque. Cada columna guarda resúmenes combinables: conteos de nulos y tipos, valores más
+# frecuentes (Misra-Gries) y un boceto de cuantiles tipo KLL, así que los perfiles de varios
+# bloques o archivos se suman con combinar() y un CSV se perfila sin cargarlo completo.
+
+class BocetoCuantiles:
+    '''
+    Boceto de cuantiles combinable (compactadores tipo KLL) con memoria acotada.
+
+    Mientras no se compacta (hasta k valores) los cuantiles son exactos e interpolan igual que
+    pandas.Series.quantile; luego el error de rango es del orden de log2(n / k) / k.
+
+    Parameters:
+        k (int): Capacidad de cada nivel del boceto.
+        semilla (int, opcional): Semilla para elegir qué mitad conserva cada compactación.
+    '''
+
+    def __init__(self, k=512, semilla=None):
+        self.k = k
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.niveles = [np.empty(0)]
+        self._rng = np.random.default_rng(semilla)
+
+    def actualizar(self, valores):
+        '''
+        Agrega un arreglo de valores (se ignoran los no finitos) y devuelve el boceto.
+        '''
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[np.isfinite(valores)]
+        if len(valores):
+            self.n += len(valores)
+            self.minimo = min(self.minimo, valores.min())
+            self.maximo = max(self.maximo, valores.max())
+            self.niveles[0] = np.concatenate([self.niveles[0], valores])
+            self._compactar()
+        return self
+
+    def combinar(self, otro):
+        '''
+        Suma al boceto los valores resumidos en otro boceto y lo devuelve.
+        '''
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for nivel, valores in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], valores])
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._compactar()
+        return self
+
+    def _compactar(self):
+        # Cada nivel que supera k valores se ordena y la mitad (pares o impares, al azar) sube
+        # al nivel siguiente, donde cada valor representa el doble de elementos
+        nivel = 0
+        while nivel < len(self.niveles):
+            valores = self.niveles[nivel]
+            if len(valores) > self.k:
+                valores = np.sort(valores)
+                sobrante, valores = valores[len(valores) - len(valores) % 2:], valores[:len(valores) - len(valores) % 2]
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], valores[self._rng.integers(2)::2]])
+                self.niveles[nivel] = sobrante
+            nivel += 1
+
+    def _ponderados(self):
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(v), 2.0 ** nivel) for nivel, v in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        return valores[orden], pesos[orden]
+
+    def cuantiles(self, q):
+        '''
+        Devuelve los cuantiles q (escalar o lista entre 0 y 1); NaN si el boceto está vacío.
+        '''
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            return np.full(len(q), np.nan)
+        if len(self.niveles) == 1:
+            return np.quantile(self.niveles[0], q)
+        valores, pesos = self._ponderados()
+        acumulado = np.cumsum(pesos)
+        posiciones = np.searchsorted(acumulado, q * acumulado[-1], side='left')
+        return valores[np.minimum(posiciones, len(valores) - 1)]
+
+    def cantidad_fuera(self, inferior, superior):
+        '''
+        Estima cuántos valores son menores que 'inferior' o mayores que 'superior'.
+        '''
+        if self.n == 0:
+            return 0
+        valores, pesos = self._ponderados()
+        estimado = pesos[(valores < inferior) | (valores > superior)].sum()
+        return int(round(estimado * self.n / pesos.sum()))
+
+
+class PerfilColumna:
+    '''
+    Resumen combinable de una columna: nulos, tipos, valores frecuentes y boceto de cuantiles.
+
+    Parameters:
+        k (int): Capacidad del boceto de cuantiles.
+        limite_valores (int): Cantidad máxima de valores distintos cuyo conteo se guarda; al
+            superarla se pasa a un resumen Misra-Gries y los conteos dejan de ser exactos.
+    '''
+
+    def __init__(self, k=512, limite_valores=100):
+        self.limite_valores = limite_valores
+        self.no_nulos = 0
+        self.nulos = 0
+        self.tipos = set()
+        self.frecuencias = Counter()
+        self.frecuencias_exactas = True
+        self.boceto = BocetoCuantiles(k)
+
+    def actualizar(self, serie):
+        nulos = int(serie.isna().sum())
+        self.nulos += nulos
+        self.no_nulos += len(serie) - nulos
+        self.tipos.update(_tipos_serie(serie))
+        self._sumar_frecuencias(serie.value_counts(dropna=True))
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            self.boceto.actualizar(serie.to_numpy(dtype=float, na_value=np.nan))
+        return self
+
+    def combinar(self, otro):
+        self.nulos += otro.nulos
+        self.no_nulos += otro.no_nulos
+        self.tipos |= otro.tipos
+        self.frecuencias_exactas &= otro.frecuencias_exactas
+        self._sumar_frecuencias(otro.frecuencias)
+        self.boceto.combinar(otro.boceto)
+        return self
+
+    def cuantiles(self, q):
+        '''
+        Devuelve los cuantiles q de la columna numérica: exactos (interpolados como
+        pandas.Series.quantile) si los conteos de valores son exactos y, si no, del boceto.
+        '''
+        if not self.frecuencias_exactas or not self.frecuencias:
+            return self.boceto.cuantiles(q)
+        valores = np.array(sorted(self.frecuencias), dtype=float)
+        acumulado = np.cumsum([self.frecuencias[v] for v in sorted(self.frecuencias)])
+        posiciones = np.atleast_1d(np.asarray(q, dtype=float)) * (acumulado[-1] - 1)
+        inferior = valores[np.searchsorted(acumulado, np.floor(posiciones), side='right')]
+        superior = valores[np.searchsorted(acumulado, np.ceil(posiciones), side='right')]
+        return inferior + (superior - inferior) * (posiciones - np.floor(posiciones))
+
+    def cantidad_fuera(self, inferior, superior):
+        '''
+        Cuenta los valores menores que 'inferior' o mayores que 'superior' (estimado si los conteos no son exactos).
+        '''
+        if not self.frecuencias_exactas:
+            return self.boceto.cantidad_fuera(inferior, superior)
+        return sum(c for v, c in self.frecuencias.items() if v < inferior or v > superior)
+
+    def _sumar_frecuencias(self, conteos):
+        self.frecuencias.update({valor: int(cantidad) for valor, cantidad in conteos.items() if cantidad})
+        if len(self.frecuencias) > self.limite_valores:
+            # Misra-Gries: se descuenta el conteo del primer valor que queda afuera
+            conservados = self.frecuencias.most_common(self.limite_valores + 1)
+            descuento = conservados[-1][1]
+            self.frecuencias = Counter({v: c - descuento for v, c in conservados[:-1] if c > descuento})
+            self.frecuencias_exactas = False
+
+
+class PerfilDatos:
+    '''
+    Perfil de calidad de un DataFrame, que se actualiza bloque a bloque en una sola pasada.
+
+    Parameters:
+        k (int): Capacidad de los bocetos de cuantiles.
+        limite_valores (int): Valores distintos por columna cuyo conteo se guarda (ver PerfilColumna).
+    '''
+
+    def __init__(self, k=512, limite_valores=100):
+        self.k = k
+        self.limite_valores = limite_valores
+        self.filas = 0
+        self.columnas = {}
+
+    def actualizar(self, df):
+        '''
+        Agrega un bloque de filas al perfil y lo devuelve.
+        '''
+        self.filas += len(df)
+        for columna in df.columns:
+            perfil = self.columnas.setdefault(columna, PerfilColumna(self.k, self.limite_valores))
+            perfil.actualizar(df[columna])
+        return self
+
+    def combinar(self, otro):
+        '''
+        Suma al perfil otro perfil (por ejemplo, el de otro archivo o proceso) y lo devuelve.
+        '''
+        self.filas += otro.filas
+        for columna, perfil in otro.columnas.items():
+            if columna in self.columnas:
+                self.columnas[columna].combinar(perfil)
+            else:
+                self.columnas[columna] = perfil
+        return self
+
+    def reporte(self, valores_frecuentes=5):
+        '''
+        Devuelve el reporte de calidad, una fila por columna.
+
+        Parameters:
+            valores_frecuentes (int): Cantidad de valores más frecuentes a incluir por columna.
+
+        Returns:
+            pandas.DataFrame: Con 'nombre_campo', 'tipo_datos', 'no_nulos', 'nulos', 'nulos_%',
+            'distintos' (NaN si se superó limite_valores), 'valores_frecuentes' (lista de
+            (valor, cantidad, porcentaje)), y para las numéricas 'minimo', 'q1', 'mediana', 'q3',
+            'maximo', 'bigote_min', 'bigote_max' y 'atipicos' (como bigote_max, pero hacia ambos lados).
+        '''
+        filas = []
+        for columna, perfil in self.columnas.items():
+            total = perfil.no_nulos + perfil.nulos
+            fila = {
+                "nombre_campo": columna,
+                "tipo_datos": sorted({tipo.__name__ for tipo in perfil.tipos}),
+                "no_nulos": perfil.no_nulos,
+                "nulos": perfil.nulos,
+                "nulos_%": round(100 * perfil.nulos / total, 2) if total else 0.0,
+                "distintos": len(perfil.frecuencias) if perfil.frecuencias_exactas else np.nan,
+                "valores_frecuentes": [
+                    (valor, cantidad, round(100 * cantidad / total, 2))
+                    for valor, cantidad in perfil.frecuencias.most_common(valores_frecuentes)
+                ],
+            }
+            boceto = perfil.boceto
+            if boceto.n:
+                q1, mediana, q3 = perfil.cuantiles([0.25, 0.5, 0.75])
+                bigote_min, bigote_max = round(q1 - 1.5 * (q3 - q1), 2), round(q3 + 1.5 * (q3 - q1), 2)
+                fila.update({
+                    "minimo": boceto.minimo, "q1": q1, "mediana": mediana, "q3": q3, "maximo": boceto.maximo,
+                    "bigote_min": bigote_min, "bigote_max": bigote_max,
+                    "atipicos": perfil.cantidad_fuera(bigote_min, bigote_max),
+                })
+            filas.append(fila)
+        return pd.DataFrame(filas)
+
+def perfilar(datos, tamanio_bloque=100_000, k=512, limite_valores=100, **kwargs_csv):
+    '''
+    Perfila un DataFrame, una secuencia de bloques o un CSV (leído por bloques) en una sola pasada.
+
+    Parameters:
+        datos (pandas.DataFrame, iterable de DataFrames o str): Datos a perfilar; si es una ruta,
+            se lee con pandas.read_csv en bloques de 'tamanio_bloque' filas.
+        tamanio_bloque (int): Filas por bloque al leer un CSV.
+        k (int), limite_valores (int): Ver PerfilDatos.
+        **kwargs_csv: Argumentos adicionales para pandas.read_csv.
+
+    Returns:
+        pandas.DataFrame: El reporte de PerfilDatos.reporte().
+    '''
+    if isinstance(datos, str):
+        datos = pd.read_csv(datos, chunksize=tamanio_bloque, **kwargs_csv)
+    elif isinstance(datos, pd.DataFrame):
+        datos = [datos]
+
+    perfil = PerfilDatos(k, limite_valores)
+    for bloque in datos:
+        perfil.actualizar(bloque)
+    return perfil.reporte()
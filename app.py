@@ -1,44 +1,132 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import folium
-from streamlit_folium import folium_static
-from folium.plugins import HeatMap
-import networkx as nx
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from geopy.distance import geodesic
-import osmnx as ox
-
-# Cargar los datos
-df_siniestros_final = pd.read_parquet('Datasets_limpios/siniestrosfinal.parquet')
-
-# Crear la columna 'hora_num' si aún no existe
-df_siniestros_final['hora_num'] = pd.to_datetime(df_siniestros_final['hora'], format='%H:%M:%S', errors='coerce').dt.hour
+
+import cubo
+import datos
+import ingesta
+import instrumentacion
+
+# Las dependencias pesadas (folium, seaborn/matplotlib, scipy, la red vial) se importan dentro de
+# las funciones que las usan, así el arranque y la primera pestaña no pagan su costo de importación.
+
+# Cargar el cubo de agregados (anio x mes x dia x hora_num x tipo_via x semaforo). La versión de
+# los datos (ver ingesta.py) forma parte de la clave: cuando se ingiere un lote nuevo se vuelve a
+# abrir el cubo, que ingesta.py ya actualizó, sin reiniciar la aplicación
+@st.cache_data(max_entries=2)
+def cargar_cubo(version):
+    return cubo.cargar_cubo()
+
+# Cubo de los siniestros con ciertos involucrados, armado desde el dataset particionado (sólo
+# los años pedidos); se guarda por versión, rango y tipos elegidos
+@st.cache_data(max_entries=16)
+def cargar_cubo_involucrados(version, rango_anios, mascara):
+    return cubo.cubo_involucrados(rango_anios, mascara)
+
+# Cargar las grillas preagregadas del mapa de calor
+@st.cache_data(max_entries=2)
+def cargar_mapa_calor(version):
+    import mapa_calor
+    return mapa_calor.cargar_mapa_calor()
+
+# Celdas por año de los siniestros con semáforos que no funcionan y semáforos existentes, para los puntos calientes.
+# Se guardan por radio con su versión; al cambiar la versión sólo se suman las celdas de los
+# siniestros ingeridos desde entonces (o se recalculan todas si el ETL reconstruyó el dataset)
+@st.cache_resource
+def celdas_por_radio():
+    return {}
+
+def cargar_celdas_puntos_calientes(radio, version):
+    import puntos_calientes
+    columnas = ['anio', 'latitud', 'longitud', 'semaforo']
+    guardadas = celdas_por_radio()
+    version_anterior, celdas = guardadas.get(radio, (None, None))
+    if version_anterior == version:
+        return celdas
+    nuevos = ingesta.leer_deltas(version_anterior, columnas) if celdas is not None else None
+    if nuevos is None:
+        celdas = puntos_calientes.agregar_celdas(datos.cargar_siniestros(columnas=columnas), radio)
+    elif not nuevos.empty:
+        celdas = ingesta.sumar_agregados(celdas, puntos_calientes.agregar_celdas(nuevos, radio),
+                                         ['anio', 'celda_x', 'celda_y'])
+    guardadas[radio] = (version, celdas)
+    return celdas
+
+@st.cache_resource
+def cargar_indice_semaforos():
+    import puntos_calientes
+    return puntos_calientes.cargar_indice_semaforos()
+
+# Tabla de riesgo precalculada por modelo_riesgo.py (celda x hora x día de la semana)
+@st.cache_data
+def cargar_tabla_riesgo():
+    import modelo_riesgo
+    return modelo_riesgo.cargar_tabla()
+
+@st.cache_resource
+def cargar_indice_riesgo():
+    import modelo_riesgo
+    return modelo_riesgo.indexar_tabla(cargar_tabla_riesgo())
+
+# Abrir la red vial en teselas (una sola vez por proceso, compartida entre sesiones): cada ruta
+# carga sólo las teselas de su corredor. Las versiones guardadas de la red y de las teselas
+# forman la clave: si la red es más nueva que sus teselas (o no hay teselas), se particiona antes
+# de abrirla, y si red_vial.py, riesgo_vial.py o el ETL las regeneran, se vuelve a abrir
+@st.cache_resource(max_entries=1)
+def cargar_red_teselada(version_red, version_teselas):
+    import teselas
+    teselas.actualizar_teselas()
+    return teselas.RedTeselada()
 
 # Configuración de la página
 st.set_page_config(page_title="Dashboard de Siniestros Viales", layout="wide")
 
+# Instrumentación opcional (ver instrumentacion.py): la activa sólo quien opera el servidor, con
+# INSTRUMENTACION=1 al iniciar streamlit, ya que mide todas las sesiones del proceso. ?depuracion=1
+# en la URL sólo muestra el panel de tiempos y memoria en la barra lateral
+depuracion = st.query_params.get('depuracion') == '1'
+instrumentacion.tomar_registros()  # descarta los tramos de ejecuciones anteriores en este hilo
+
 # Título del dashboard
 st.title("Dashboard Interactivo de Siniestros Viales")
 
 # Sidebar para filtros
 st.sidebar.header("Filtros")
 
+# Versión de los datos: cambia cuando ingesta.py agrega siniestros nuevos o el ETL reconstruye el dataset
+version_datos = ingesta.version_datos()
+
 # Filtrar por rango de años
-min_year = int(df_siniestros_final['anio'].min())
-max_year = int(df_siniestros_final['anio'].max())
+with instrumentacion.tramo('cargar_cubo'):
+    cubo_siniestros = cargar_cubo(version_datos)
+min_year = int(cubo_siniestros['anio'].min())
+max_year = int(cubo_siniestros['anio'].max())
 selected_year_range = st.sidebar.slider("Seleccione el rango de años", min_year, max_year, (min_year, max_year))
 
-# Filtrar el dataset por el rango seleccionado
-df_filtered = df_siniestros_final[df_siniestros_final['anio'].between(selected_year_range[0], selected_year_range[1])]
+# Filtrar por involucrados: siniestros con al menos uno de los tipos elegidos (KPIs y gráficos;
+# el mapa de calor y los sitios urgentes no se filtran por este control)
+tipos_involucrado = st.sidebar.multiselect("Involucrados en el siniestro", datos.TIPOS_INVOLUCRADO)
+mascara_involucrados = datos.mascara_involucrados(tipos_involucrado)
 
-# Tabs para organizar el contenido
-tab1, tab2, tab3 = st.tabs(["📊 Dashboard Principal", "📈 Gráficos Secundarios", "🔍 Análisis Predictivo"])
+# Filtrar el cubo de agregados por el rango y los involucrados seleccionados
+with instrumentacion.tramo('filtrar_cubo'):
+    if mascara_involucrados:
+        cubo_filtrado = cargar_cubo_involucrados(version_datos, selected_year_range, mascara_involucrados)
+    else:
+        cubo_filtrado = cubo.filtrar_cubo(cubo_siniestros, selected_year_range)
+    kpis = cubo.kpis(cubo_filtrado)
 
 # -------------------- Tab 1: Dashboard Principal --------------------
-with tab1:
+# Cada pestaña es un fragmento: al mover un control de la pestaña sólo se vuelve a ejecutar ese fragmento
+@st.fragment
+@instrumentacion.medido()
+def pestana_principal(cubo_filtrado, kpis, rango_anios, version):
+    import folium
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from folium.plugins import HeatMap
+    from streamlit_folium import folium_static
+
+    import mapa_calor
+
     st.header("Datos Principales")
 
     # Crear layout de 3 columnas para los KPIs
@@ -47,38 +135,46 @@ with tab1:
 
     # Total de siniestros
     with kpi_col1:
-        total_siniestros = df_filtered.shape[0]
+        total_siniestros = kpis['total']
         st.metric(label="Total de Siniestros", value=total_siniestros)
 
     # Siniestros con semáforo (Funciona, Intermitente, No Funciona)
     with kpi_col2:
-        siniestros_con_semaforo = df_filtered[df_filtered['semaforo'].isin(['Funciona', 'Intermitente', 'No Funciona'])].shape[0]
+        siniestros_con_semaforo = kpis['con_semaforo']
         st.metric(label="Siniestros con Semáforo", value=siniestros_con_semaforo)
 
     # Porcentaje de siniestros con semáforo
     with kpi_col3:
-        porcentaje_con_semaforo = (siniestros_con_semaforo / total_siniestros) * 100
+        porcentaje_con_semaforo = kpis['porcentaje_con_semaforo']
         st.metric(label="Porcentaje con Semáforo", value=f"{porcentaje_con_semaforo:.2f}%")
 
     # Mapa de calor de siniestros viales
     st.subheader("Mapa de Calor de Siniestros Viales")
-    map_data = [[row['latitud'], row['longitud']] for index, row in df_filtered.iterrows() if pd.notnull(row['latitud']) and pd.notnull(row['longitud'])]
-    m = folium.Map(location=[-27.480, -58.830], zoom_start=13)
-    HeatMap(map_data).add_to(m)
-    folium_static(m)
+    nivel_zoom = st.select_slider("Nivel de detalle del mapa de calor", options=mapa_calor.NIVELES_ZOOM, value=mapa_calor.NIVEL_POR_DEFECTO)
+    with instrumentacion.tramo('mapa_calor', nivel=nivel_zoom):
+        map_data = mapa_calor.puntos_mapa_calor(cargar_mapa_calor(version), rango_anios, nivel_zoom)
+        m = folium.Map(location=[-27.480, -58.830], zoom_start=13)
+        HeatMap(map_data).add_to(m)
+        folium_static(m)
 
     # Gráfico interactivo de cantidad de accidentes por año
     st.subheader("Cantidad de Accidentes por Año")
-    accidentes_por_anio = df_filtered.groupby('anio').size().reset_index(name='cantidad')
-    fig, ax = plt.subplots(figsize=(10, 4))
-    sns.lineplot(data=accidentes_por_anio, x='anio', y='cantidad', marker='o', ax=ax)
-    ax.set_title('Accidentes por Año')
-    ax.set_xlabel('Año')
-    ax.set_ylabel('Cantidad de Accidentes')
-    st.pyplot(fig)
+    with instrumentacion.tramo('grafico_anio'):
+        accidentes_por_anio = cubo.conteo_por(cubo_filtrado, 'anio')
+        fig, ax = plt.subplots(figsize=(10, 4))
+        sns.lineplot(data=accidentes_por_anio, x='anio', y='cantidad', marker='o', ax=ax)
+        ax.set_title('Accidentes por Año')
+        ax.set_xlabel('Año')
+        ax.set_ylabel('Cantidad de Accidentes')
+        st.pyplot(fig)
 
 # -------------------- Tab 2: Gráficos Secundarios --------------------
-with tab2:
+@st.fragment
+@instrumentacion.medido()
+def pestana_graficos(cubo_filtrado):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     st.header("Gráficos Secundarios")
 
     # Crear layout de 2 columnas para los gráficos secundarios
@@ -87,87 +183,165 @@ with tab2:
     # Gráfico 1: Distribución de siniestros por hora
     with col1:
         st.subheader("Distribución de Siniestros por Hora")
-        plt.figure(figsize=(8, 4))
-        sns.countplot(data=df_filtered, x='hora_num', palette='Blues')
-        plt.title("Distribución de Siniestros por Hora")
-        plt.xlabel('Hora del Día')
-        plt.ylabel('Frecuencia')
-        st.pyplot(plt)
+        with instrumentacion.tramo('grafico_hora'):
+            plt.figure(figsize=(8, 4))
+            conteo_hora = cubo.conteo_por(cubo_filtrado, 'hora_num').astype({'hora_num': int})
+            sns.barplot(data=conteo_hora, x='hora_num', y='cantidad', palette='Blues')
+            plt.title("Distribución de Siniestros por Hora")
+            plt.xlabel('Hora del Día')
+            plt.ylabel('Frecuencia')
+            st.pyplot(plt)
 
     # Gráfico 2: Distribución de siniestros por tipo de vía
     with col2:
         st.subheader("Distribución de Siniestros por Tipo de Vía")
-        plt.figure(figsize=(8, 4))
-        sns.countplot(data=df_filtered, x='tipo_via', palette='coolwarm')
-        plt.title('Distribución de Siniestros por Tipo de Vía')
-        plt.xlabel('Tipo de Vía')
-        plt.ylabel('Frecuencia')
-        plt.xticks(rotation=45)
-        st.pyplot(plt)
+        with instrumentacion.tramo('grafico_tipo_via'):
+            plt.figure(figsize=(8, 4))
+            sns.barplot(data=cubo.conteo_por(cubo_filtrado, 'tipo_via'), x='tipo_via', y='cantidad', palette='coolwarm')
+            plt.title('Distribución de Siniestros por Tipo de Vía')
+            plt.xlabel('Tipo de Vía')
+            plt.ylabel('Frecuencia')
+            plt.xticks(rotation=45)
+            st.pyplot(plt)
 
     # Gráfico 3: Distribución por día de la semana
     st.subheader("Distribución de Siniestros por Día de la Semana")
-    plt.figure(figsize=(8, 4))
-    sns.countplot(data=df_filtered, x='dia', palette='Set2')
-    plt.title("Distribución de Siniestros por Día")
-    plt.xlabel('Día de la Semana')
-    plt.ylabel('Frecuencia')
-    st.pyplot(plt)
+    with instrumentacion.tramo('grafico_dia'):
+        plt.figure(figsize=(8, 4))
+        sns.barplot(data=cubo.conteo_por(cubo_filtrado, 'dia'), x='dia', y='cantidad', palette='Set2')
+        plt.title("Distribución de Siniestros por Día")
+        plt.xlabel('Día de la Semana')
+        plt.ylabel('Frecuencia')
+        st.pyplot(plt)
 
     # Gráfico 4: Distribución por mes
     st.subheader("Distribución de Siniestros por Mes")
-    plt.figure(figsize=(8, 4))
-    sns.countplot(data=df_filtered, x='mes', palette='Set3')
-    plt.title("Distribución de Siniestros por Mes")
-    plt.xlabel('Mes')
-    plt.ylabel('Frecuencia')
-    st.pyplot(plt)
+    with instrumentacion.tramo('grafico_mes'):
+        plt.figure(figsize=(8, 4))
+        sns.barplot(data=cubo.conteo_por(cubo_filtrado, 'mes'), x='mes', y='cantidad', palette='Set3')
+        plt.title("Distribución de Siniestros por Mes")
+        plt.xlabel('Mes')
+        plt.ylabel('Frecuencia')
+        st.pyplot(plt)
 
 # -------------------- Tab 3: Análisis Predictivo --------------------
-with tab3:
-    st.header("Análisis Predictivo")
+@st.fragment
+@instrumentacion.medido()
+def seccion_sitios_urgentes(rango_anios, version):
+    import folium
+    from streamlit_folium import folium_static
+
+    import puntos_calientes
 
     # Modelo de recomendación de semáforos
     st.subheader("Recomendación de Sitios Urgentes para Colocación de Semáforos")
 
-    # Filtrar los siniestros sin semáforo
-    siniestros_sin_semaforo = df_siniestros_final[df_siniestros_final['semaforo'] == 'No Funciona']
-
-    # Contar los siniestros por ubicación (latitud y longitud)
-    siniestros_por_ubicacion = siniestros_sin_semaforo.groupby(['latitud', 'longitud']).size().reset_index(name='cantidad_siniestros')
-
-    # Encontrar las 5 ubicaciones con más accidentes
-    top_5_ubicaciones = siniestros_por_ubicacion.nlargest(5, 'cantidad_siniestros')
+    # Agrupar los siniestros cercanos en sitios y descartar los que ya tienen un semáforo cerca
+    col_radio, col_distancia = st.columns(2)
+    with col_radio:
+        radio_sitio = st.slider("Radio de agrupación (m)", 20, 200, int(puntos_calientes.RADIO), step=10)
+    with col_distancia:
+        distancia_semaforo = st.slider("Distancia mínima a un semáforo existente (m)", 0, 300,
+                                       int(puntos_calientes.DISTANCIA_SEMAFORO), step=10)
+
+    # Encontrar los 5 sitios con más accidentes
+    with instrumentacion.tramo('puntos_calientes', radio=radio_sitio):
+        top_5_ubicaciones = puntos_calientes.puntos_calientes(
+            cargar_celdas_puntos_calientes(radio_sitio, version), rango_anios, 5,
+            cargar_indice_semaforos(), distancia_semaforo,
+        )
 
     m = folium.Map(location=[-27.48, -58.83], zoom_start=13)
 
     for index, row in top_5_ubicaciones.iterrows():
         folium.Marker(
             location=[row['latitud'], row['longitud']],
-            popup=f"Cantidad de Siniestros: {row['cantidad_siniestros']}",
+            popup=f"Cantidad de Siniestros: {int(row['cantidad_siniestros'])}<br>"
+                  f"Semáforo más cercano: {row['distancia_semaforo']:.0f} m",
             icon=folium.Icon(color='red')
         ).add_to(m)
 
     folium_static(m)
 
-    # Recomendación de Ruta Segura
-    st.subheader("Recomendación de Ruta Segura entre Dos Ubicaciones")
+@st.fragment
+@instrumentacion.medido()
+def seccion_riesgo_estimado():
+    import folium
+    from folium.plugins import HeatMap
+    from streamlit_folium import folium_static
+
+    import modelo_riesgo
+
+    # Riesgo estimado por el modelo entrenado fuera de línea (ver modelo_riesgo.py)
+    st.subheader("Riesgo Estimado de Siniestros Graves por Zona y Horario")
+    col_hora, col_dia = st.columns(2)
+    with col_hora:
+        hora_riesgo = st.slider("Hora del día", 0, 23, 20, key='hora_riesgo')
+    with col_dia:
+        dia_riesgo = st.selectbox("Día de la semana", range(7), index=5, key='dia_riesgo',
+                                  format_func=lambda dia: modelo_riesgo.DIAS_SEMANA[dia])
+
+    with instrumentacion.tramo('riesgo_por_horario'):
+        celdas_riesgo = modelo_riesgo.riesgo_por_horario(cargar_tabla_riesgo(), hora_riesgo, dia_riesgo)
+    m = folium.Map(location=[-27.48, -58.83], zoom_start=13)
+    HeatMap(celdas_riesgo.to_numpy().tolist(), radius=12, min_opacity=0.2).add_to(m)
+    folium_static(m)
 
-    # Seleccionar dos ubicaciones de inicio y fin
-    lat_inicio = st.number_input("Latitud de Inicio", value=-27.4668)
-    lon_inicio = st.number_input("Longitud de Inicio", value=-58.8467)
-    lat_fin = st.number_input("Latitud de Destino", value=-27.4650)
-    lon_fin = st.number_input("Longitud de Destino", value=-58.8403)
+@st.fragment
+@instrumentacion.medido()
+def seccion_ruta_segura():
+    import folium
+    from streamlit_folium import folium_static
 
-    # Descargar la red vial de OpenStreetMap para la zona que te interesa (especificando una latitud/longitud central y un radio)
-    G = ox.graph_from_point((lat_inicio, lon_inicio), dist=2000, network_type='drive')
+    import modelo_riesgo
+    import red_vial
+    import teselas
 
-    # Encontrar el nodo más cercano al punto de inicio y al punto de destino en el grafo de calles
-    nodo_inicio = ox.nearest_nodes(G, lon_inicio, lat_inicio)
-    nodo_fin = ox.nearest_nodes(G, lon_fin, lat_fin)
+    # Recomendación de Ruta Segura
+    st.subheader("Recomendación de Ruta Segura entre Dos Ubicaciones")
 
-    # Calcular la ruta más corta en términos de distancia usando el grafo vial
-    ruta_segura = nx.shortest_path(G, source=nodo_inicio, target=nodo_fin, weight='length')
+    # Seleccionar dos ubicaciones de inicio y fin; la ruta se calcula sólo al enviar el formulario
+    with st.form("ruta_segura"):
+        lat_inicio = st.number_input("Latitud de Inicio", value=-27.4668)
+        lon_inicio = st.number_input("Longitud de Inicio", value=-58.8467)
+        lat_fin = st.number_input("Latitud de Destino", value=-27.4650)
+        lon_fin = st.number_input("Longitud de Destino", value=-58.8403)
+
+        # Peso del riesgo: 0 = ruta más corta, 1 = ruta con menos siniestros
+        alpha = st.slider("Prioridad de la seguridad sobre la distancia", 0.0, 1.0, 0.5, step=0.05)
+        if st.form_submit_button("Calcular ruta"):
+            st.session_state['ruta_pedida'] = (lat_inicio, lon_inicio, lat_fin, lon_fin, alpha)
+
+    if 'ruta_pedida' not in st.session_state:
+        st.info("Ingrese el origen y el destino y presione «Calcular ruta».")
+        return
+    lat_inicio, lon_inicio, lat_fin, lon_fin, alpha = st.session_state['ruta_pedida']
+
+    # Red vial en teselas (ver teselas.py): sólo se cargan las del corredor entre inicio y destino
+    with instrumentacion.tramo('cargar_teselas'):
+        red_teselada = cargar_red_teselada(red_vial.version_guardada(), teselas.version_guardada())
+
+    # Asignar el inicio y el destino a su calle más cercana y calcular la ruta que combina distancia y
+    # riesgo de siniestros (o reutilizarla de la caché). Un punto a más de DISTANCIA_MAXIMA_NODO de
+    # todos los nodos está fuera de la zona cubierta por la red: no se lo asigna al borde
+    with instrumentacion.tramo('ruteo', alpha=alpha):
+        try:
+            ruta_segura = red_teselada.ruta(lat_inicio, lon_inicio, lat_fin, lon_fin, alpha)
+        except ValueError as error:
+            st.warning(f"No se puede calcular la ruta: {error}.")
+            return
+    ruta_col1, ruta_col2, ruta_col3 = st.columns(3)
+    ruta_col1.metric(label="Longitud de la Ruta", value=f"{ruta_segura['longitud'] / 1000:.2f} km")
+    ruta_col2.metric(label="Riesgo Acumulado", value=f"{ruta_segura['riesgo']:.0f}")
+    ruta_col3.metric(label="Semáforos en la Ruta", value=ruta_segura['semaforos'])
+
+    # Consulta O(1) en la tabla de riesgo para el origen, con la hora y el día elegidos arriba
+    hora_riesgo = st.session_state.get('hora_riesgo', 20)
+    dia_riesgo = st.session_state.get('dia_riesgo', 5)
+    riesgo_origen = modelo_riesgo.consultar_riesgo(cargar_indice_riesgo(), lat_inicio, lon_inicio, hora_riesgo, dia_riesgo)
+    if riesgo_origen is not None:
+        st.caption(f"Probabilidad estimada de que un siniestro en el origen sea grave "
+                   f"({modelo_riesgo.DIAS_SEMANA[dia_riesgo]} a las {hora_riesgo} h): {riesgo_origen:.0%}")
 
     # Crear el mapa en Folium
     m = folium.Map(location=[(lat_inicio + lat_fin) / 2, (lon_inicio + lon_fin) / 2], zoom_start=13)
@@ -176,15 +350,45 @@ with tab3:
     folium.Marker(location=[lat_inicio, lon_inicio], popup="Inicio", icon=folium.Icon(color='green')).add_to(m)
     folium.Marker(location=[lat_fin, lon_fin], popup="Destino", icon=folium.Icon(color='red')).add_to(m)
 
-    # Extraer las coordenadas de la ruta más segura
-    ruta_coords = [(G.nodes[node]['y'], G.nodes[node]['x']) for node in ruta_segura]
-
-    # Dibujar la ruta en el mapa
-    folium.PolyLine(locations=ruta_coords, color='blue').add_to(m)
+    # Dibujar la ruta en el mapa a partir del fragmento GeoJSON guardado en la caché
+    folium.GeoJson(ruta_segura['fragmento'], style_function=lambda _: {'color': 'blue'}).add_to(m)
 
     # Mostrar el mapa en Streamlit
-    folium_static(m)
+    with instrumentacion.tramo('mapa_ruta'):
+        folium_static(m)
 
+    estadisticas_cache = red_teselada.cache.estadisticas()
+    estadisticas_teselas = red_teselada.estadisticas()
+    st.caption(f"Caché de rutas: {estadisticas_cache['entradas']} rutas, "
+               f"{estadisticas_cache['aciertos']} aciertos / {estadisticas_cache['fallos']} fallos; "
+               f"{estadisticas_teselas['teselas']} teselas en memoria "
+               f"({estadisticas_teselas['bytes'] / 2 ** 20:.1f} MB)")
 
+# Tabs para organizar el contenido; sólo se ejecuta la pestaña seleccionada
+tab1, tab2, tab3 = st.tabs(["📊 Dashboard Principal", "📈 Gráficos Secundarios", "🔍 Análisis Predictivo"],
+                           key='pestana', on_change='rerun')
 
+with tab1:
+    if tab1.open:
+        pestana_principal(cubo_filtrado, kpis, selected_year_range, version_datos)
+
+with tab2:
+    if tab2.open:
+        pestana_graficos(cubo_filtrado)
 
+with tab3:
+    if tab3.open:
+        st.header("Análisis Predictivo")
+        seccion_sitios_urgentes(selected_year_range, version_datos)
+        seccion_riesgo_estimado()
+        seccion_ruta_segura()
+
+# Panel de depuración con los tramos de esta ejecución (los fragmentos que se vuelven a ejecutar
+# solos registran sus tramos en el log, pero el panel se actualiza al volver a ejecutar la página)
+if depuracion:
+    with st.sidebar.expander("Depuración: tiempos y memoria", expanded=True):
+        if not instrumentacion.activa():
+            st.info("La instrumentación está desactivada: iniciar el dashboard con INSTRUMENTACION=1.")
+        else:
+            resumen_tramos = instrumentacion.resumir(instrumentacion.tomar_registros())
+            st.dataframe(resumen_tramos[['tramo', 'llamadas', 'total_s', 'max_s', 'pico_memoria_mb']], hide_index=True)
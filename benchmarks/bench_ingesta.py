@@ -0,0 +1,120 @@
+## INGESTA INCREMENTAL FRENTE A LA RECONSTRUCCIÓN COMPLETA
+# Arma en una carpeta temporal un dataset sintético (benchmarks/sinteticos.py) con su cubo y su
+# mapa de calor, ingiere varios lotes nuevos con ingesta.py y verifica que el dataset, el cubo,
+# las grillas y las celdas de puntos calientes actualizadas de forma incremental sean iguales a
+# las reconstruidas desde cero. Imprime el tiempo por lote frente al de la reconstrucción.
+# Termina con código 1 si algún agregado difiere.
+#
+# Uso:
+#     python benchmarks/bench_ingesta.py --filas 500000 --lotes 5 --filas-lote 1000
+
+# Importaciones
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cubo  # noqa: E402
+import datos  # noqa: E402
+import ingesta  # noqa: E402
+import mapa_calor  # noqa: E402
+import puntos_calientes  # noqa: E402
+from sinteticos import generar_siniestros  # noqa: E402
+
+COLUMNAS_CELDAS = ['anio', 'latitud', 'longitud', 'semaforo']
+
+
+# Funciones
+def ordenado(df, claves):
+    return df.astype({columna: str for columna in claves}).sort_values(claves).reset_index(drop=True)
+
+
+def iguales(a, b, claves):
+    try:
+        pd.testing.assert_frame_equal(ordenado(a, claves), ordenado(b, claves), check_dtype=False,
+                                      check_categorical=False)
+        return True
+    except AssertionError:
+        return False
+
+
+def reconstruir(ruta_dataset, ruta_cubo, ruta_mapa_calor):
+    '''
+    Reconstrucción completa: lee todo el dataset y vuelve a calcular y guardar el cubo y el mapa de calor.
+    '''
+    df = datos.cargar_siniestros(ruta=ruta_dataset)
+    cubo_completo = cubo.construir_cubo(df)
+    celdas_completas = mapa_calor.agregar_mapa_calor(df)
+    cubo.guardar_cubo(cubo_completo, ruta_cubo)
+    mapa_calor.guardar_mapa_calor(celdas_completas, ruta_mapa_calor)
+    return df, cubo_completo, celdas_completas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara la ingesta incremental con la reconstrucción completa.')
+    parser.add_argument('--filas', type=int, default=500_000, help='Siniestros del dataset inicial')
+    parser.add_argument('--lotes', type=int, default=5, help='Lotes a ingerir')
+    parser.add_argument('--filas-lote', type=int, default=1000, help='Siniestros por lote')
+    args = parser.parse_args()
+
+    base = generar_siniestros(args.filas)
+    with tempfile.TemporaryDirectory() as temporal:
+        rutas = {
+            'ruta_dataset': os.path.join(temporal, 'siniestros'),
+            'ruta_cubo': os.path.join(temporal, 'cubo.parquet'),
+            'ruta_mapa_calor': os.path.join(temporal, 'mapa_calor.parquet'),
+            'ruta_version': os.path.join(temporal, 'version_datos.json'),
+        }
+        datos.guardar_particionado(base, rutas['ruta_dataset'])
+        reconstruir(rutas['ruta_dataset'], rutas['ruta_cubo'], rutas['ruta_mapa_calor'])
+        ingesta.registrar_reconstruccion(rutas['ruta_version'])
+        celdas = puntos_calientes.agregar_celdas(base)
+
+        tiempos = []
+        for numero in range(args.lotes):
+            lote = generar_siniestros(args.filas_lote, semilla=numero + 1)
+            lote['id_feu'] = lote['id_feu'] + args.filas + numero * args.filas_lote
+            # Medio lote repetido: debe descartarse como ya cargado
+            lote = pd.concat([lote, lote.head(args.filas_lote // 2)], ignore_index=True) if numero else lote
+            version = ingesta.version_datos(rutas['ruta_version'])
+            inicio = time.perf_counter()
+            resultado = ingesta.ingerir(lote.iloc[:args.filas_lote], **rutas)
+            tiempos.append(time.perf_counter() - inicio)
+            if numero:
+                repetido = ingesta.ingerir(lote.iloc[args.filas_lote:], **rutas)
+                assert repetido['filas'] == 0 and repetido['duplicados'] == args.filas_lote // 2
+            delta = ingesta.leer_deltas(version, COLUMNAS_CELDAS, rutas['ruta_dataset'], rutas['ruta_version'])
+            celdas = ingesta.sumar_agregados(celdas, puntos_calientes.agregar_celdas(delta), ['anio', 'celda_x', 'celda_y'])
+
+        try:
+            ingesta.ingerir(generar_siniestros(10).assign(mes=13), **rutas)
+            lote_invalido = 'aceptado'
+        except ValueError:
+            lote_invalido = 'rechazado'
+
+        inicio = time.perf_counter()
+        completo, cubo_completo, celdas_completas = reconstruir(
+            rutas['ruta_dataset'], os.path.join(temporal, 'cubo_completo.parquet'),
+            os.path.join(temporal, 'mapa_calor_completo.parquet'))
+        tiempo_reconstruccion = time.perf_counter() - inicio
+        esperado_filas = args.filas + args.lotes * args.filas_lote
+        resultados = {
+            'dataset': len(completo) == esperado_filas and not completo['id_feu'].duplicated().any(),
+            'cubo': iguales(cubo.cargar_cubo(rutas['ruta_cubo']), cubo_completo, cubo.DIMENSIONES),
+            'mapa_calor': iguales(mapa_calor.cargar_mapa_calor(rutas['ruta_mapa_calor']),
+                                  celdas_completas, ingesta.CLAVES_MAPA_CALOR),
+            'puntos_calientes': iguales(celdas, puntos_calientes.agregar_celdas(completo), ['anio', 'celda_x', 'celda_y']),
+            'lote_invalido': lote_invalido == 'rechazado',
+        }
+
+    print(f'Dataset de {args.filas} siniestros, {args.lotes} lotes de {args.filas_lote} '
+          f'(versión final {resultado["version"]})')
+    for nombre, correcto in resultados.items():
+        print(f'  {nombre:<17} {"OK" if correcto else "FALLA"}')
+    print(f'  ingesta: {sum(tiempos) / len(tiempos):.3f} s por lote; '
+          f'reconstrucción (lectura del dataset, cubo y mapa de calor): {tiempo_reconstruccion:.3f} s')
+    sys.exit(0 if all(resultados.values()) else 1)
@@ -0,0 +1,119 @@
+## JERARQUÍAS DE CONTRACCIÓN FRENTE A NETWORKX Y A DIJKSTRA
+# Con el grafo de Corrientes guardado en cache/ (la respuesta de Overpass, sin internet) verifica
+# que las rutas de jerarquias.py tengan el mismo costo que nx.shortest_path_length, por longitud
+# y por el costo combinado con el riesgo, y que cada ruta devuelta sume ese costo. Luego repite
+# la red en un mosaico de ciudad (benchmarks/sinteticos.replicar_red, ~22 000 nodos con 4x4
+# copias), la preprocesa y compara, para pares al azar, el tiempo por consulta (sólo el costo y
+# la ruta completa) con el de un Dijkstra de scipy y sus costos. Termina con código 1 si algún
+# costo difiere.
+#
+# Uso:
+#     python benchmarks/bench_jerarquias.py --pares 500 --copias 4 --alpha 0.5
+
+# Importaciones
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DIRECTORIO)
+os.chdir(DIRECTORIO)
+import jerarquias  # noqa: E402
+import red_vial  # noqa: E402
+import riesgo_vial  # noqa: E402
+from bench_matriz import costo_networkx, grafo_costos, iguales  # noqa: E402
+from sinteticos import replicar_red  # noqa: E402
+
+
+# Funciones
+def costo_ruta(red, pesos, ruta):
+    '''
+    Suma el costo de las aristas de una ruta (posiciones de nodos consecutivos).
+    '''
+    costo = 0.0
+    for u, v in zip(ruta[:-1], ruta[1:]):
+        inicio, fin = red.indptr[u], red.indptr[u + 1]
+        arista = inicio + int(np.searchsorted(red.indices[inicio:fin], v))
+        if arista >= fin or red.indices[arista] != v:
+            return np.nan  # la ruta usa una arista que no existe
+        costo += pesos[arista]
+    return costo
+
+
+def verificar_rutas(red, tablas, pesos, pares, esperados):
+    '''
+    Cuenta los pares cuyo costo o cuya ruta (que debe ir del origen al destino sumando ese costo) no coinciden.
+    '''
+    diferencias = 0
+    for (origen, destino), esperado in zip(pares, esperados):
+        ruta, costo = jerarquias.ruta_jerarquia(tablas, origen, destino)
+        if ruta is None:
+            diferencias += not np.isinf(esperado)
+            continue
+        diferencias += not (iguales(costo, esperado) and ruta[0] == origen and ruta[-1] == destino
+                            and iguales(costo_ruta(red, pesos, ruta), esperado))
+    return diferencias
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara las jerarquías de contracción con NetworkX y Dijkstra.')
+    parser.add_argument('--pares', type=int, default=500, help='Pares origen-destino al azar')
+    parser.add_argument('--copias', type=int, default=4, help='Copias por lado del mosaico de ciudad')
+    parser.add_argument('--alpha', type=float, default=0.5, help='Peso del riesgo para el costo combinado')
+    args = parser.parse_args()
+
+    grafo = red_vial.descargar_grafo()
+    red = red_vial.cargar_red()
+    if set(red.osmid.tolist()) != set(grafo.nodes):
+        sys.exit('La red compilada no corresponde al grafo de cache/; ejecute python red_vial.py')
+    rng = np.random.default_rng(0)
+    todo_bien = True
+
+    print(f'Corrientes (cache/): {red.cantidad_nodos} nodos, {args.pares} pares')
+    for alpha, peso, grafo_nx in ((0.0, 'length', grafo), (args.alpha, 'costo', grafo_costos(red, grafo, args.alpha))):
+        tablas = jerarquias.preprocesar(red, alpha)
+        pesos, clave = jerarquias._pesos(red, alpha)
+        pares = rng.integers(0, red.cantidad_nodos, (args.pares, 2)).tolist()
+        esperados = [costo_networkx(grafo_nx, red.osmid[u], red.osmid[v], peso) for u, v in pares]
+        diferencias = verificar_rutas(red, tablas, pesos, pares, esperados)
+        todo_bien &= diferencias == 0
+        print(f'  alpha={alpha:g} ({clave}): {diferencias} de {args.pares} rutas distintas de NetworkX')
+
+    ciudad = replicar_red(red, args.copias)
+    print(f'Ciudad en mosaico de {args.copias}x{args.copias}: {ciudad.cantidad_nodos} nodos, '
+          f'{ciudad.cantidad_aristas} aristas, {args.pares} pares')
+    for alpha in (0.0, args.alpha):
+        inicio = time.perf_counter()
+        tablas = jerarquias.preprocesar(ciudad, alpha)
+        tiempo_preproceso = time.perf_counter() - inicio
+        pesos, clave = jerarquias._pesos(ciudad, alpha)
+        pares = rng.integers(0, ciudad.cantidad_nodos, (args.pares, 2)).tolist()
+        matriz = ciudad.matriz(pesos, clave)  # la misma que usa rutas_seguras, armada fuera de la medición
+        tablas.medios  # ídem con el diccionario de atajos
+        inicio = time.perf_counter()
+        for origen, destino in pares:
+            riesgo_vial.rutas_seguras(ciudad, origen, [destino], alpha)
+        tiempo_dijkstra = (time.perf_counter() - inicio) / args.pares
+
+        inicio = time.perf_counter()
+        for origen, destino in pares:
+            jerarquias.costo_jerarquia(tablas, origen, destino)
+        tiempo_costo = (time.perf_counter() - inicio) / args.pares
+
+        inicio = time.perf_counter()
+        for origen, destino in pares:
+            jerarquias.ruta_jerarquia(tablas, origen, destino)
+        tiempo_ruta = (time.perf_counter() - inicio) / args.pares
+
+        esperados = [dijkstra(matriz, directed=True, indices=origen)[destino] for origen, destino in pares]
+        diferencias = verificar_rutas(ciudad, tablas, pesos, pares, esperados)
+        todo_bien &= diferencias == 0
+        print(f'  alpha={alpha:g}: preproceso {tiempo_preproceso:.1f} s ({len(tablas.atajo_medio)} atajos, '
+              f'{len(tablas.nodos_ida) / ciudad.cantidad_nodos:.0f} nodos por etiqueta, {tablas.bytes / 2 ** 20:.1f} MB); '
+              f'costo {tiempo_costo * 1000:.3f} ms, ruta {tiempo_ruta * 1000:.3f} ms, '
+              f'Dijkstra {tiempo_dijkstra * 1000:.3f} ms por consulta; {diferencias} costos distintos de Dijkstra')
+    sys.exit(0 if todo_bien else 1)
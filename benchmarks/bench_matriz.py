@@ -0,0 +1,91 @@
+## MATRIZ DE COSTOS DE MUCHOS A MUCHOS FRENTE A NETWORKX
+# Verifica con el grafo de Corrientes guardado en cache/ (la respuesta de Overpass, sin internet)
+# que riesgo_vial.matriz_costos dé los mismos costos que nx.shortest_path_length, tanto por
+# longitud como por el costo combinado con el riesgo, e imprime su tiempo frente al de calcular
+# cada celda con un camino mínimo punto a punto. Termina con código 1 si algún costo difiere.
+#
+# Uso:
+#     python benchmarks/bench_matriz.py --matriz 300 --alpha 0.5
+
+# Importaciones
+import argparse
+import os
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DIRECTORIO)
+os.chdir(DIRECTORIO)
+import red_vial  # noqa: E402
+import riesgo_vial  # noqa: E402
+
+TOLERANCIA = 1e-9  # diferencia relativa admitida (orden de las sumas en punto flotante)
+MUESTRA = 200  # celdas de la matriz que se comparan con NetworkX
+
+
+# Funciones
+def grafo_costos(red, grafo, alpha):
+    '''
+    Copia del grafo de OSMnx con el costo de cada arista de la red (por osmid) en el atributo 'costo'.
+    '''
+    costos = riesgo_vial.costo_aristas(red, alpha)
+    origen = red_vial.origenes_aristas(red)
+    por_arista = {(u, v): costo for u, v, costo in
+                  zip(red.osmid[origen].tolist(), red.osmid[red.indices].tolist(), costos.tolist())}
+    dirigido = nx.DiGraph()
+    for u, v in grafo.edges():
+        dirigido.add_edge(u, v, costo=por_arista[(u, v)])
+    return dirigido
+
+
+def costo_networkx(grafo, u, v, peso):
+    try:
+        return nx.shortest_path_length(grafo, u, v, weight=peso)
+    except nx.NetworkXNoPath:
+        return np.inf
+
+
+def iguales(a, b):
+    return (np.isinf(a) and np.isinf(b)) or abs(a - b) <= TOLERANCIA * max(abs(b), 1.0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara la matriz de costos de muchos a muchos con NetworkX.')
+    parser.add_argument('--matriz', type=int, default=300, help='Orígenes y destinos de la matriz')
+    parser.add_argument('--alpha', type=float, default=0.5, help='Peso del riesgo para el costo combinado')
+    args = parser.parse_args()
+
+    grafo = red_vial.descargar_grafo()
+    red = red_vial.cargar_red()
+    if set(red.osmid.tolist()) != set(grafo.nodes):
+        sys.exit('La red compilada no corresponde al grafo de cache/; ejecute python red_vial.py')
+    rng = np.random.default_rng(0)
+    print(f'Red de {red.cantidad_nodos} nodos y {red.cantidad_aristas} aristas, matriz {args.matriz}x{args.matriz}')
+
+    todo_bien = True
+    for alpha, peso, grafo_nx in ((0.0, 'length', grafo), (args.alpha, 'costo', grafo_costos(red, grafo, args.alpha))):
+        origenes = rng.integers(0, red.cantidad_nodos, args.matriz)
+        destinos = rng.integers(0, red.cantidad_nodos, args.matriz)
+        riesgo_vial.matriz_costos(red, origenes[:1], destinos[:1], alpha)  # arma la matriz dispersa fuera de la medición
+
+        inicio = time.perf_counter()
+        matriz = riesgo_vial.matriz_costos(red, origenes, destinos, alpha)
+        tiempo_matriz = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for origen in origenes.tolist():
+            riesgo_vial.rutas_seguras(red, origen, destinos.tolist(), alpha)
+        tiempo_rutas = time.perf_counter() - inicio
+
+        muestra = rng.integers(0, args.matriz, (MUESTRA, 2))
+        diferencias = sum(not iguales(matriz[i, j], costo_networkx(grafo_nx, red.osmid[origenes[i]],
+                                                                   red.osmid[destinos[j]], peso))
+                          for i, j in muestra.tolist())
+        todo_bien &= diferencias == 0
+        print(f'alpha={alpha:g} ({riesgo_vial.clave_costo(red, alpha)}): matriz en {tiempo_matriz:.3f} s, '
+              f'rutas_seguras por origen en {tiempo_rutas:.3f} s; '
+              f'{diferencias} de {MUESTRA} celdas distintas de NetworkX')
+    sys.exit(0 if todo_bien else 1)
@@ -0,0 +1,100 @@
+## RUTAS POR TESELAS FRENTE A LA RED COMPLETA
+# Parte una red sintética en grilla (benchmarks/sinteticos.py) en teselas y, para pares de
+# puntos al azar, compara la ruta calculada cargando sólo las teselas del corredor con la
+# ruta sobre la red completa: el costo (longitud y riesgo combinados con alpha) debe ser el
+# mismo. Imprime la memoria de la red completa, la de la caché de teselas y los tiempos; los
+# pares se consultan de nuevo con la caché de rutas vacía para medir la de corredores armados.
+# Termina con código 1 si alguna ruta difiere.
+#
+# Uso:
+#     python benchmarks/bench_teselas.py --lado 400 --pares 50
+
+# Importaciones
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import riesgo_vial  # noqa: E402
+import teselas  # noqa: E402
+from cache_rutas import armar_entrada  # noqa: E402
+from red_vial import ARREGLOS, ARREGLOS_RIESGO, nodos_mas_cercanos  # noqa: E402
+from sinteticos import generar_red_grilla  # noqa: E402
+
+TOLERANCIA = 1e-6  # diferencia relativa de costo admitida
+DISTANCIA_MAXIMA = 5000.0  # metros entre origen y destino
+
+
+# Funciones
+def costo(entrada, alpha, medias):
+    media_longitud, media_riesgo = medias
+    return ((1 - alpha + riesgo_vial.EPSILON_LONGITUD) * entrada['longitud'] / media_longitud
+            + alpha * entrada['riesgo'] / media_riesgo)
+
+
+def pares_cercanos(red, cantidad, rng):
+    '''
+    Elige pares de nodos al azar a menos de DISTANCIA_MAXIMA metros (viajes dentro de una ciudad).
+    '''
+    origenes = rng.integers(0, red.cantidad_nodos, cantidad)
+    angulos = rng.uniform(0, 2 * np.pi, cantidad)
+    distancias = rng.uniform(200, DISTANCIA_MAXIMA, cantidad) / teselas.METROS_POR_GRADO
+    lat = np.asarray(red.lat)[origenes] + distancias * np.sin(angulos)
+    lon = np.asarray(red.lon)[origenes] + distancias * np.cos(angulos) / np.cos(np.radians(lat))
+    destinos, _ = nodos_mas_cercanos(red, lat, lon)
+    return origenes, destinos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara las rutas por teselas con las de la red completa.')
+    parser.add_argument('--lado', type=int, default=400, help='Intersecciones por lado de la red en grilla')
+    parser.add_argument('--pares', type=int, default=50, help='Pares de puntos a comparar')
+    parser.add_argument('--alpha', type=float, default=0.5, help='Peso del riesgo frente a la distancia')
+    parser.add_argument('--memoria', type=float, default=8.0, help='Límite de la caché de teselas (MB)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    red = generar_red_grilla(args.lado)
+    bytes_red = sum(np.asarray(getattr(red, nombre)).nbytes for nombre in ARREGLOS + ARREGLOS_RIESGO)
+    origenes, destinos = pares_cercanos(red, args.pares, rng)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        meta = teselas.particionar(red, temporal)
+        red_teselada = teselas.RedTeselada(temporal, memoria_maxima=int(args.memoria * 2 ** 20), subredes=2 * args.pares)
+        print(f'Red de {red.cantidad_nodos} nodos ({bytes_red / 2 ** 20:.1f} MB) en {len(meta["teselas"])} teselas')
+
+        diferencias, tiempo_completa, tiempo_teselas = [], 0.0, 0.0
+        for origen, destino in zip(origenes.tolist(), destinos.tolist()):
+            inicio = time.perf_counter()
+            completa = armar_entrada(red, riesgo_vial.ruta_segura(red, origen, destino, args.alpha))
+            tiempo_completa += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            por_teselas = red_teselada.ruta(float(red.lat[origen]), float(red.lon[origen]),
+                                            float(red.lat[destino]), float(red.lon[destino]), args.alpha)
+            tiempo_teselas += time.perf_counter() - inicio
+
+            esperado = costo(completa, args.alpha, red_teselada.medias)
+            diferencias.append(abs(costo(por_teselas, args.alpha, red_teselada.medias) - esperado) / esperado)
+
+        # Segunda pasada sin la caché de rutas: los corredores ya armados se reutilizan
+        red_teselada.cache.limpiar()
+        inicio = time.perf_counter()
+        for origen, destino in zip(origenes.tolist(), destinos.tolist()):
+            red_teselada.ruta(float(red.lat[origen]), float(red.lon[origen]),
+                              float(red.lat[destino]), float(red.lon[destino]), args.alpha)
+        tiempo_corredores = time.perf_counter() - inicio
+
+        estadisticas = red_teselada.estadisticas()
+        peor = max(diferencias)
+        print(f'  diferencia de costo máxima {peor:.2e} (tolerancia {TOLERANCIA:g})  {"OK" if peor <= TOLERANCIA else "FALLA"}')
+        print(f'  red completa: {tiempo_completa / args.pares * 1000:.1f} ms por ruta, {bytes_red / 2 ** 20:.1f} MB')
+        print(f'  teselas: {tiempo_teselas / args.pares * 1000:.1f} ms por ruta, caché {estadisticas["bytes"] / 2 ** 20:.1f} MB '
+              f'(límite {args.memoria:g} MB), {estadisticas["cargadas"]} cargas, {estadisticas["aciertos"]} aciertos')
+        print(f'  teselas con el corredor ya armado: {tiempo_corredores / args.pares * 1000:.1f} ms por ruta '
+              f'({estadisticas["subredes"]} corredores en caché, {estadisticas["subredes_armadas"]} armados)')
+    sys.exit(0 if peor <= TOLERANCIA else 1)
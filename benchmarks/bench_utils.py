@@ -0,0 +1,155 @@
+## BENCHMARK DE LAS FUNCIONES DE JupyterNotebooks/utils.py
+# Compara cada función escalar (aplicada con .apply, como en los notebooks) con su versión
+# vectorizada sobre datos sintéticos, verifica que ambas den el mismo resultado e imprime los
+# tiempos y la aceleración.
+#
+# El análisis de sentimiento se mide por separado sobre textos todos distintos (sin ganancia
+# por deduplicar: compara el cálculo por lotes en un proceso y en el pool de procesos, que sólo
+# se crea con varios núcleos y al menos utils.TEXTOS_MINIMOS_POOL textos) y sobre un conjunto
+# chico de textos repetidos (donde la ganancia viene sólo de deduplicar).
+#
+# Uso:
+#     python benchmarks/bench_utils.py
+#     python benchmarks/bench_utils.py --filas 1000000 --repeticiones 3
+
+# Importaciones
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'JupyterNotebooks'))
+import utils  # noqa: E402
+
+MESES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+         'October', 'November', 'December']
+TEXTOS = ['great safe street, very good lighting', 'terrible crossing, awful traffic', 'a street',
+          'nice and quiet avenue', 'bad and dangerous intersection', None]
+ADJETIVOS = ['great', 'safe', 'terrible', 'awful', 'nice', 'quiet', 'bad', 'dangerous', 'dark', 'wide',
+             'narrow', 'busy', 'good', 'slow', 'fast', 'clean']
+SUSTANTIVOS = ['street', 'crossing', 'avenue', 'intersection', 'lighting', 'traffic', 'corner',
+               'sidewalk', 'road', 'bridge']
+
+
+# Funciones
+def datos_sinteticos(filas, semilla=0):
+    '''
+    Genera columnas sintéticas con los formatos (y errores) que reciben las funciones de utils.
+    '''
+    rng = np.random.default_rng(semilla)
+    anios = rng.integers(1990, 2025, filas).astype(str)
+    meses = rng.integers(1, 13, filas)
+    dias = rng.integers(1, 29, filas)
+
+    fechas_iso = pd.Series(np.char.add(np.char.add(anios, '-'), np.char.zfill(meses.astype(str), 2)), dtype=object)
+    fechas_iso = fechas_iso + '-' + pd.Series(np.char.zfill(dias.astype(str), 2))
+    fechas_iso[rng.random(filas) < 0.05] = None
+    fechas_iso[rng.random(filas) < 0.05] = 'sin fecha'
+
+    fechas_texto = pd.Series(np.take(MESES, meses - 1), dtype=object) + ' ' + dias.astype(str) + ', ' + anios
+    fechas_texto = 'Released on ' + fechas_texto
+    fechas_texto[rng.random(filas) < 0.05] = 'Coming soon'
+
+    precios = pd.Series(np.round(rng.random(filas) * 60, 2).astype(str), dtype=object)
+    precios[rng.random(filas) < 0.05] = 'Free to Play'
+    precios[rng.random(filas) < 0.05] = None
+
+    return pd.DataFrame({
+        'fecha_iso': fechas_iso,
+        'fecha_texto': fechas_texto,
+        'precio': precios,
+        'cantidad': rng.integers(0, 100, filas),
+        'valor': np.where(rng.random(filas) < 0.1, np.nan, rng.random(filas)),
+    })
+
+
+def textos_unicos(cantidad, semilla=0):
+    '''
+    Genera reseñas sintéticas todas distintas (dos adjetivos, un sustantivo y un número).
+    '''
+    rng = np.random.default_rng(semilla)
+    adjetivos = np.array(ADJETIVOS, dtype=object)
+    sustantivos = np.array(SUSTANTIVOS, dtype=object)
+    textos = (adjetivos[rng.integers(0, len(ADJETIVOS), cantidad)] + ' and '
+              + adjetivos[rng.integers(0, len(ADJETIVOS), cantidad)] + ' '
+              + sustantivos[rng.integers(0, len(SUSTANTIVOS), cantidad)] + ' number '
+              + np.arange(cantidad).astype(str).astype(object))
+    return pd.Series(textos, dtype=object)
+
+
+def medir(funcion, repeticiones):
+    '''
+    Ejecuta la función 'repeticiones' veces y devuelve (mejor tiempo en segundos, último resultado).
+    '''
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def comparar(nombre, escalar, vectorizada, repeticiones, iguales=None):
+    tiempo_escalar, esperado = medir(escalar, repeticiones)
+    tiempo_vectorizado, obtenido = medir(vectorizada, repeticiones)
+    # Se comparan los valores: el dtype de .apply depende de la versión de pandas
+    coincide = iguales(esperado, obtenido) if iguales else esperado.astype(object).equals(obtenido.astype(object))
+    print(f'{nombre:<26} escalar {tiempo_escalar:8.3f} s   vectorizada {tiempo_vectorizado:8.3f} s   '
+          f'x{tiempo_escalar / tiempo_vectorizado:7.1f}   {"OK" if coincide else "DISTINTO"}')
+    return coincide
+
+
+def tipos_iguales(esperado, obtenido):
+    columnas = ['nombre_campo', 'no_nulos_%', 'nulos_%', 'nulos']
+    mismos_tipos = all(set(a) == set(b) for a, b in zip(esperado['tipo_datos'], obtenido['tipo_datos']))
+    return mismos_tipos and esperado[columnas].astype(float, errors='ignore').equals(obtenido[columnas].astype(float, errors='ignore'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara las funciones escalares de utils.py con sus versiones vectorizadas.')
+    parser.add_argument('--filas', type=int, default=100_000, help='Filas de los datos sintéticos')
+    parser.add_argument('--textos', type=int, default=5_000, help='Textos para el análisis de sentimiento')
+    parser.add_argument('--procesos', type=int, default=2, help='Procesos del pool en el análisis de sentimiento')
+    parser.add_argument('--tamanio-lote', type=int, default=500, help='Textos por lote enviado al pool')
+    parser.add_argument('--repeticiones', type=int, default=1, help='Repeticiones por medición (se toma la mejor)')
+    args = parser.parse_args()
+
+    df = datos_sinteticos(args.filas)
+    repetidos = pd.Series(np.resize(np.array(TEXTOS, dtype=object), args.textos), dtype=object)
+    unicos = textos_unicos(args.textos)
+    print(f'{args.filas} filas, {args.textos} textos; pool de {args.procesos} procesos en lotes de '
+          f'{args.tamanio_lote} ({os.cpu_count()} núcleos)')
+    # La primera llamada importa TextBlob y carga su léxico: se hace antes de medir
+    utils.analisis_sentimiento(TEXTOS[0])
+    iguales_sentimiento = lambda a, b: (a.to_numpy() == b.to_numpy()).all()  # noqa: E731
+
+    resultados = [
+        comparar('reemplaza_a_flotante',
+                 lambda: df['precio'].apply(utils.reemplaza_a_flotante),
+                 lambda: utils.reemplaza_a_flotante_serie(df['precio']), args.repeticiones),
+        comparar('obtener_anio_release',
+                 lambda: df['fecha_iso'].apply(utils.obtener_anio_release),
+                 lambda: utils.obtener_anio_release_serie(df['fecha_iso']), args.repeticiones),
+        comparar('convertir_fecha',
+                 lambda: df['fecha_texto'].apply(utils.convertir_fecha),
+                 lambda: utils.convertir_fecha_serie(df['fecha_texto']), args.repeticiones),
+        comparar('verificar_tipo_datos',
+                 lambda: utils.verificar_tipo_datos(df),
+                 lambda: utils.verificar_tipo_datos_vectorizado(df), args.repeticiones, tipos_iguales),
+        comparar('sentimiento unicos, lotes',
+                 lambda: unicos.apply(utils.analisis_sentimiento),
+                 lambda: utils.analisis_sentimiento_serie(unicos, procesos=1, tamanio_lote=args.tamanio_lote),
+                 args.repeticiones, iguales_sentimiento),
+        comparar('sentimiento unicos, pool',
+                 lambda: unicos.apply(utils.analisis_sentimiento),
+                 lambda: utils.analisis_sentimiento_serie(unicos, procesos=args.procesos, tamanio_lote=args.tamanio_lote),
+                 args.repeticiones, iguales_sentimiento),
+        comparar('sentimiento repetidos',
+                 lambda: repetidos.apply(utils.analisis_sentimiento),
+                 lambda: utils.analisis_sentimiento_serie(repetidos, procesos=1),
+                 args.repeticiones, iguales_sentimiento),
+    ]
+    sys.exit(0 if all(resultados) else 1)
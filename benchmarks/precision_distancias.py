@@ -0,0 +1,106 @@
+## PRECISIÓN Y VELOCIDAD DE distancias.py FRENTE A GEOPY
+# Compara cada método con geopy sobre pares aleatorios (en Corrientes y en todo el globo):
+#   - 'haversine' contra geopy.distance.great_circle (misma esfera) y contra geodesic (elipsoide);
+#   - 'vincenty' contra geopy.distance.geodesic.
+# También verifica que mas_cercanos por bloques coincida con la matriz completa. Termina con
+# código 1 si algún error supera su tolerancia.
+#
+# Uso:
+#     python benchmarks/precision_distancias.py --pares 20000
+
+# Importaciones
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from geopy.distance import geodesic, great_circle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import distancias  # noqa: E402
+
+# Tolerancias
+TOLERANCIA_GREAT_CIRCLE = 1e-6  # error relativo de haversine frente a la misma esfera
+TOLERANCIA_HAVERSINE = 6e-3  # error relativo de la esfera frente al elipsoide
+TOLERANCIA_VINCENTY = 1e-3  # metros
+
+
+# Funciones
+def pares_aleatorios(cantidad, rng, zona=None):
+    '''
+    Genera pares de puntos aleatorios, en la zona (lat_min, lat_max, lon_min, lon_max) o en todo el globo.
+    '''
+    if zona:
+        lat_min, lat_max, lon_min, lon_max = zona
+        lat = rng.uniform(lat_min, lat_max, (2, cantidad))
+        lon = rng.uniform(lon_min, lon_max, (2, cantidad))
+    else:
+        lat = np.degrees(np.arcsin(rng.uniform(-1, 1, (2, cantidad))))
+        lon = rng.uniform(-180, 180, (2, cantidad))
+        # Se descartan los pares casi antípodas, donde la fórmula de Vincenty no converge
+        casi_antipodas = (np.abs(lat[0] + lat[1]) < 1) & (np.abs(np.abs(lon[0] - lon[1]) - 180) < 1)
+        lat, lon = lat[:, ~casi_antipodas], lon[:, ~casi_antipodas]
+    return lat[0], lon[0], lat[1], lon[1]
+
+
+def medir_geopy(funcion, lat1, lon1, lat2, lon2):
+    inicio = time.perf_counter()
+    resultado = np.array([funcion((a, b), (c, d)).meters for a, b, c, d in zip(lat1, lon1, lat2, lon2)])
+    return resultado, time.perf_counter() - inicio
+
+
+def medir_numpy(metodo, lat1, lon1, lat2, lon2):
+    inicio = time.perf_counter()
+    resultado = distancias.distancia(lat1, lon1, lat2, lon2, metodo)
+    return resultado, time.perf_counter() - inicio
+
+
+def verificar(nombre, obtenido, esperado, tolerancia, relativo):
+    error = np.abs(obtenido - esperado)
+    if relativo:
+        error = error / np.maximum(esperado, 1e-9)
+    peor = float(error.max())
+    unidad = '' if relativo else ' m'
+    print(f'  {nombre:<30} error máximo {peor:.3g}{unidad} (tolerancia {tolerancia:g}{unidad})  '
+          f'{"OK" if peor <= tolerancia else "FALLA"}')
+    return peor <= tolerancia
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara distancias.py con geopy.')
+    parser.add_argument('--pares', type=int, default=20_000, help='Pares aleatorios por zona')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla aleatoria')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semilla)
+    zonas = {'Corrientes': (-27.6, -27.35, -58.95, -58.70), 'Globo': None}
+
+    resultados = []
+    for nombre_zona, zona in zonas.items():
+        lat1, lon1, lat2, lon2 = pares_aleatorios(args.pares, rng, zona)
+        print(f'{nombre_zona}: {len(lat1)} pares')
+
+        circulo, _ = medir_geopy(great_circle, lat1, lon1, lat2, lon2)
+        elipsoide, tiempo_geopy = medir_geopy(geodesic, lat1, lon1, lat2, lon2)
+        haversine, tiempo_haversine = medir_numpy('haversine', lat1, lon1, lat2, lon2)
+        vincenty, tiempo_vincenty = medir_numpy('vincenty', lat1, lon1, lat2, lon2)
+
+        resultados += [
+            verificar('haversine vs great_circle', haversine, circulo, TOLERANCIA_GREAT_CIRCLE, True),
+            verificar('haversine vs geodesic', haversine, elipsoide, TOLERANCIA_HAVERSINE, True),
+            verificar('vincenty vs geodesic', vincenty, elipsoide, TOLERANCIA_VINCENTY, False),
+        ]
+        print(f'  tiempo: geodesic {tiempo_geopy:.3f} s, haversine {tiempo_haversine:.4f} s '
+              f'(x{tiempo_geopy / tiempo_haversine:.0f}), vincenty {tiempo_vincenty:.4f} s '
+              f'(x{tiempo_geopy / tiempo_vincenty:.0f})')
+
+    # Más cercano por bloques contra la matriz completa
+    lat_a, lon_a, lat_b, lon_b = pares_aleatorios(2_000, rng, zonas['Corrientes'])
+    completa = distancias.muchos_a_muchos(lat_a, lon_a, lat_b[:300], lon_b[:300])
+    posiciones, minimas = distancias.mas_cercanos(lat_a, lon_a, lat_b[:300], lon_b[:300], elementos_por_bloque=10_000)
+    coincide = np.array_equal(posiciones, completa.argmin(axis=1)) and np.allclose(minimas, completa.min(axis=1))
+    print(f'mas_cercanos por bloques vs matriz completa: {"OK" if coincide else "FALLA"}')
+    resultados.append(coincide)
+
+    sys.exit(0 if all(resultados) else 1)
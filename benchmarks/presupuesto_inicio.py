@@ -0,0 +1,98 @@
+## PRESUPUESTO DE ARRANQUE DEL DASHBOARD
+# Mide, en intérpretes nuevos (sin módulos en caché):
+#   - el tiempo de importación de los módulos que app.py importa al inicio;
+#   - el tiempo hasta el primer render de la pestaña por defecto (con streamlit.testing.AppTest);
+#   - qué dependencias pesadas quedaron cargadas tras ese primer render.
+# Falla (código 1) si algún tiempo supera su presupuesto o si se cargó alguna dependencia que
+# sólo deberían necesitar otras pestañas.
+#
+# Uso:
+#     python benchmarks/presupuesto_inicio.py
+#     python benchmarks/presupuesto_inicio.py --importacion 1.5 --primer-render 5
+
+# Importaciones
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Presupuestos por defecto (segundos)
+PRESUPUESTO_IMPORTACION = 2.0
+PRESUPUESTO_PRIMER_RENDER = 8.0
+# Dependencias que la pestaña por defecto no debe cargar (scipy no se incluye: lo importa seaborn)
+NO_CARGADAS = ['sklearn', 'osmnx', 'networkx', 'geopy', 'red_vial', 'indice_espacial', 'distancias', 'puntos_calientes',
+               'modelo_riesgo', 'cache_rutas']
+
+CODIGO_IMPORTACION = '''
+import json, time
+inicio = time.perf_counter()
+import streamlit, cubo, ingesta
+print(json.dumps({'segundos': time.perf_counter() - inicio}))
+'''
+
+CODIGO_PRIMER_RENDER = '''
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+prueba = AppTest.from_file('app.py', default_timeout=120).run()
+print(json.dumps({
+    'segundos': time.perf_counter() - inicio,
+    'excepciones': [str(e.value) for e in prueba.exception],
+    'modulos': sorted({nombre.split('.')[0] for nombre in sys.modules}),
+}))
+'''
+
+
+# Funciones
+def ejecutar_aislado(codigo):
+    '''
+    Ejecuta el código en un intérprete nuevo, desde la raíz del repositorio, y devuelve su salida JSON.
+    '''
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir(repeticiones=3):
+    '''
+    Devuelve el mejor tiempo de importación y de primer render de 'repeticiones' ejecuciones aisladas.
+    '''
+    importacion = min(ejecutar_aislado(CODIGO_IMPORTACION)['segundos'] for _ in range(repeticiones))
+    renders = [ejecutar_aislado(CODIGO_PRIMER_RENDER) for _ in range(repeticiones)]
+    primer_render = min(renders, key=lambda r: r['segundos'])
+    return {
+        'importacion': importacion,
+        'primer_render': primer_render['segundos'],
+        'excepciones': primer_render['excepciones'],
+        'cargadas_de_mas': [modulo for modulo in NO_CARGADAS if modulo in primer_render['modulos']],
+    }
+
+
+def verificar(resultado, presupuesto_importacion, presupuesto_primer_render):
+    '''
+    Imprime el resultado frente a los presupuestos y devuelve True si se cumplen todos.
+    '''
+    controles = [
+        (f"importación inicial {resultado['importacion']:.2f} s (presupuesto {presupuesto_importacion:.2f} s)",
+         resultado['importacion'] <= presupuesto_importacion),
+        (f"primer render {resultado['primer_render']:.2f} s (presupuesto {presupuesto_primer_render:.2f} s)",
+         resultado['primer_render'] <= presupuesto_primer_render),
+        (f"sin excepciones en el primer render {resultado['excepciones'] or ''}", not resultado['excepciones']),
+        (f"dependencias no cargadas en el primer render {resultado['cargadas_de_mas'] or ''}", not resultado['cargadas_de_mas']),
+    ]
+    for descripcion, cumple in controles:
+        print(f'  {"OK   " if cumple else "FALLA"} {descripcion}')
+    return all(cumple for _, cumple in controles)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verifica el presupuesto de arranque del dashboard.')
+    parser.add_argument('--importacion', type=float, default=PRESUPUESTO_IMPORTACION, help='Presupuesto de importación (s)')
+    parser.add_argument('--primer-render', type=float, default=PRESUPUESTO_PRIMER_RENDER, help='Presupuesto del primer render (s)')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones aisladas (se toma la mejor)')
+    args = parser.parse_args()
+
+    print('Presupuesto de arranque del dashboard')
+    sys.exit(0 if verificar(medir(args.repeticiones), args.importacion, args.primer_render) else 1)
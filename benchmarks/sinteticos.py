@@ -0,0 +1,227 @@
+## GENERADORES DE DATOS SINTÉTICOS PARA LOS BENCHMARKS
+# Arma, sin acceder a internet ni al dataset real, tablas de siniestros con el esquema del
+# dataset final (datos.ESQUEMA, el de siniestrosfinal) y redes viales en forma de grilla con
+# el formato CSR de red_vial.py, incluido el riesgo por arista y los semáforos por nodo.
+# Las coordenadas se concentran alrededor del centro de Corrientes, como los datos reales.
+# Para medir a escala de ciudad con calles reales, replicar_red repite la red de cache/ en un
+# mosaico cosido en los bordes (una grilla no tiene avenidas ni calles cortadas).
+
+# Importaciones
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import datos  # noqa: E402
+import red_vial  # noqa: E402
+import riesgo_vial  # noqa: E402
+from distancias import haversine  # noqa: E402
+from indice_espacial import METROS_POR_GRADO, proyectar  # noqa: E402
+
+# Constantes
+ANIOS = range(2018, 2025)
+DISPERSION = 0.02  # grados; desvío de las coordenadas alrededor del centro
+CATEGORIAS = {
+    'zona': (['Urbana', 'Rural', 'S/D'], [0.98, 0.015, 0.005]),
+    'tipo_via': (['Avenida', 'Calle', 'Ruta Nacional', 'Ruta Provincial', 'Semiautopista/Autovía'], None),
+    'tipo_siniestro': (['Atropello a animal/es', 'Atropello a peatón/es', 'Caída desde vehículo',
+                        'Colisión entre vehículos', 'Despiste', 'Otro', 'Salida de calzada',
+                        'Vuelco (solo 1 participante)'], None),
+    'material_de_la_calzada': (['Adoquín', 'Asfalto', 'Hormigón', 'Otro', 'Ripio', 'S/D', 'Tierra'], None),
+    'estado_de_la_calzada': (['Ahuellamiento', 'Apto', 'Baches', 'En reparación'], [0.05, 0.8, 0.1, 0.05]),
+    'luz_artificial': (['NO', 'SI'], None),
+    'condiciones_climaticas': (['Despejado', 'Lluvia', 'Niebla / Neblina', 'Nublado', 'S/D', 'Viento'],
+                               [0.7, 0.1, 0.02, 0.1, 0.05, 0.03]),
+    'semaforo': (['Sin Semáforo', 'Funciona', 'S/D', 'Intermitente', 'No Funciona'], [0.725, 0.209, 0.052, 0.007, 0.007]),
+    'cruce': (['NO', 'SI'], None),
+    'es_colision': (['Asumido', 'Real'], None),
+    'tipo_siniestro_para_grafico': (['Atropello a peatón/es', 'Caída desde vehículo', 'Colisión entre vehículos',
+                                     'Despiste', 'Otros', 'Vuelco (solo 1 participante)'], None),
+}
+# Tipos de involucrado más frecuentes (bits de datos.TIPOS_INVOLUCRADO) y su probabilidad
+INVOLUCRADOS = ([0, 1, 2, 3, 5, 6], [0.4, 0.35, 0.12, 0.04, 0.04, 0.05])
+CALLES = ['AV INDEPENDENCIA', 'BELGRANO', 'SAN JUAN', 'AVENIDA FERRE', 'ESPAÑA', 'MENDOZA', '25 DE MAYO',
+          'JUNIN', 'SAN MARTIN', 'AV 3 DE ABRIL', 'LAS PIEDRAS', 'VIUDES']
+COSTURA = 150.0  # metros; los nodos a esta distancia del borde se unen con la copia vecina (replicar_red)
+HORAS = np.array([datetime.time(h, m) for h in range(24) for m in range(60)], dtype=object)
+
+
+# Funciones
+def _categoria(rng, filas, valores, probabilidades=None):
+    codigos = rng.choice(len(valores), filas, p=probabilidades).astype(np.int8)
+    return pd.Categorical.from_codes(codigos, categories=valores)
+
+
+def generar_siniestros(filas, semilla=0):
+    '''
+    Genera una tabla de siniestros sintéticos con las columnas y tipos de datos.ESQUEMA.
+
+    Parameters:
+        filas (int): Cantidad de siniestros (pensado para 10 mil a 10 millones).
+        semilla (int): Semilla aleatoria.
+
+    Returns:
+        pandas.DataFrame: Siniestros que pasan datos.validar_esquema.
+    '''
+    rng = np.random.default_rng(semilla)
+    minuto = rng.integers(0, 24 * 60, filas)
+    lat_centro, lon_centro = red_vial.CENTRO
+    calles = np.array(CALLES, dtype=object)
+
+    df = pd.DataFrame({
+        'id_feu': np.arange(filas, dtype=np.int32),
+        'hora': HORAS[minuto],
+        'hora_num': (minuto // 60).astype(np.uint8),
+        'latitud': rng.normal(lat_centro, DISPERSION, filas).astype(np.float32),
+        'longitud': rng.normal(lon_centro, DISPERSION, filas).astype(np.float32),
+        'ilesos': rng.poisson(1.2, filas).clip(0, 20).astype(np.int8),
+        'heridos': rng.poisson(0.8, filas).clip(0, 20).astype(np.int8),
+        'fallecidos': (rng.random(filas) < 0.013).astype(np.int8),
+        'peatones': (rng.random(filas) < 0.03).astype(np.int8),
+        'vehiculos_involucrados': rng.integers(1, 5, filas).astype(np.int8),
+        'anio': rng.integers(ANIOS.start, ANIOS.stop, filas).astype(np.int16),
+        'mes': rng.integers(1, 13, filas).astype(np.int8),
+        'dia': rng.integers(1, 29, filas).astype(np.int8),
+        'lugar_del_hecho': calles[rng.integers(0, len(CALLES), filas)] + ' y ' + calles[rng.integers(0, len(CALLES), filas)],
+    })
+    # Uno o dos involucrados por siniestro
+    bits, probabilidades = INVOLUCRADOS
+    primero = np.left_shift(1, rng.choice(bits, filas, p=probabilidades))
+    segundo = np.left_shift(1, rng.choice(bits, filas, p=probabilidades)) * (rng.random(filas) < 0.7)
+    df['mascara_involucrados'] = (primero | segundo).astype(np.int16)
+    for columna, (valores, probabilidades) in CATEGORIAS.items():
+        df[columna] = _categoria(rng, filas, valores, probabilidades)
+    return datos.aplicar_esquema(df)
+
+
+def generar_red_grilla(lado, separacion=100.0, centro=red_vial.CENTRO, semilla=0):
+    '''
+    Genera una red vial en grilla de lado x lado intersecciones con calles de doble mano.
+
+    Cada nodo se conecta con sus vecinos de arriba, abajo, izquierda y derecha. El riesgo por
+    arista (nulo en la mayoría de las cuadras) y los semáforos por nodo son aleatorios.
+
+    Parameters:
+        lado (int): Intersecciones por lado de la grilla.
+        separacion (float): Metros entre intersecciones vecinas.
+        centro (tuple): (latitud, longitud) del centro de la grilla.
+
+    Returns:
+        RedVial: La red en memoria, con 'riesgo' y 'semaforos'.
+    '''
+    rng = np.random.default_rng(semilla)
+    fila, columna = np.divmod(np.arange(lado * lado, dtype=np.int32), lado)
+    paso_lat = separacion / METROS_POR_GRADO
+    paso_lon = paso_lat / np.cos(np.radians(centro[0]))
+
+    origen, destino = [], []
+    for delta_fila, delta_col in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        validos = ((fila + delta_fila >= 0) & (fila + delta_fila < lado)
+                   & (columna + delta_col >= 0) & (columna + delta_col < lado))
+        origen.append(np.flatnonzero(validos))
+        destino.append(((fila + delta_fila) * lado + columna + delta_col)[validos])
+    origen, destino = np.concatenate(origen), np.concatenate(destino)
+    orden = np.lexsort((destino, origen))
+    origen, destino = origen[orden], destino[orden]
+
+    indptr = np.zeros(lado * lado + 1, dtype=np.int32)
+    np.cumsum(np.bincount(origen, minlength=lado * lado), out=indptr[1:])
+    riesgo = np.where(rng.random(len(destino)) < 0.2, rng.gamma(1.5, 2.0, len(destino)), 0.0)
+
+    return red_vial.RedVial(
+        indptr=indptr,
+        indices=destino.astype(np.int32),
+        longitud=separacion * rng.uniform(0.9, 1.1, len(destino)),
+        lat=(centro[0] + (fila - lado / 2) * paso_lat).astype(np.float32),
+        lon=(centro[1] + (columna - lado / 2) * paso_lon).astype(np.float32),
+        osmid=np.arange(lado * lado, dtype=np.int64),
+        riesgo=riesgo.astype(np.float32),
+        semaforos=(rng.random(lado * lado) < 0.1).astype(np.uint8),
+    )
+
+
+def replicar_red(red, copias, costura=COSTURA):
+    '''
+    Repite una red en un mosaico de copias x copias y cose las copias vecinas en sus bordes.
+
+    Cada copia se desplaza el ancho o el alto de la red original. Los nodos a menos de 'costura'
+    metros del borde derecho (o superior) de una copia se unen, en ambos sentidos, con el nodo
+    más cercano de la copia vecina; esas aristas no tienen riesgo.
+
+    Parameters:
+        red (RedVial): La red a repetir, con 'riesgo' y 'semaforos'.
+        copias (int): Copias por lado del mosaico.
+        costura (float): Distancia en metros al borde de los nodos que se cosen.
+
+    Returns:
+        RedVial: La red en memoria, con 'riesgo' y 'semaforos'; los osmid son las posiciones.
+    '''
+    from scipy.spatial import cKDTree
+
+    n = red.cantidad_nodos
+    lat, lon = np.asarray(red.lat, dtype=np.float64), np.asarray(red.lon, dtype=np.float64)
+    alto, ancho = np.ptp(lat), np.ptp(lon)
+    filas, columnas = np.divmod(np.arange(copias * copias), copias)
+    lat_total = np.concatenate([lat + fila * alto for fila in filas])
+    lon_total = np.concatenate([lon + columna * ancho for columna in columnas])
+
+    origen_red = red_vial.origenes_aristas(red).astype(np.int64)
+    origen = [origen_red + k * n for k in range(copias * copias)]
+    destino = [np.asarray(red.indices, dtype=np.int64) + k * n for k in range(copias * copias)]
+    longitud = [np.asarray(red.longitud, dtype=np.float64)] * (copias * copias)
+    riesgo = [np.asarray(red.riesgo, dtype=np.float32)] * (copias * copias)
+
+    x, y = proyectar(lat, lon)
+    bordes = {  # (nodos del borde de una copia, nodos del borde opuesto de la vecina, desplazamiento de fila y columna)
+        'derecha': (np.flatnonzero(x > x.max() - costura), np.flatnonzero(x < x.min() + costura), 0, 1),
+        'arriba': (np.flatnonzero(y > y.max() - costura), np.flatnonzero(y < y.min() + costura), 1, 0),
+    }
+    for salientes, entrantes, delta_fila, delta_columna in bordes.values():
+        for k, (fila, columna) in enumerate(zip(filas.tolist(), columnas.tolist())):
+            if fila + delta_fila >= copias or columna + delta_columna >= copias:
+                continue
+            vecina = (fila + delta_fila) * copias + columna + delta_columna
+            a, b = salientes + k * n, entrantes + vecina * n
+            xa, ya = proyectar(lat_total[a], lon_total[a])
+            xb, yb = proyectar(lat_total[b], lon_total[b])
+            _, mas_cercanos = cKDTree(np.column_stack([xb, yb])).query(np.column_stack([xa, ya]))
+            b = b[mas_cercanos]
+            tramo = haversine(lat_total[a], lon_total[a], lat_total[b], lon_total[b])
+            origen += [a, b]
+            destino += [b, a]
+            longitud += [tramo, tramo]
+            riesgo += [np.zeros(len(a), np.float32)] * 2
+
+    origen, destino = np.concatenate(origen), np.concatenate(destino)
+    longitud, riesgo = np.concatenate(longitud), np.concatenate(riesgo)
+    # Un nodo de la esquina puede coserse dos veces con el mismo vecino: se conserva una arista por par
+    orden = np.lexsort((longitud, destino, origen))
+    unicas = np.ones(len(orden), dtype=bool)
+    unicas[1:] = (origen[orden][1:] != origen[orden][:-1]) | (destino[orden][1:] != destino[orden][:-1])
+    orden = orden[unicas]
+    total = copias * copias * n
+    indptr = np.zeros(total + 1, dtype=np.int32)
+    np.cumsum(np.bincount(origen[orden], minlength=total), out=indptr[1:])
+
+    return red_vial.RedVial(
+        indptr=indptr,
+        indices=destino[orden].astype(np.int32),
+        longitud=longitud[orden],
+        lat=lat_total.astype(np.float32),
+        lon=lon_total.astype(np.float32),
+        osmid=np.arange(total, dtype=np.int64),
+        riesgo=riesgo[orden],
+        semaforos=np.tile(np.asarray(red.semaforos, dtype=np.uint8), copias * copias),
+    )
+
+
+def guardar_red_grilla(red, directorio):
+    '''
+    Guarda la red sintética (arreglos CSR, riesgo y semáforos) como lo hacen red_vial.py y riesgo_vial.py.
+    '''
+    red_vial.guardar_red(red, directorio)
+    red.version_riesgo = riesgo_vial.guardar_riesgo(red.riesgo, red.semaforos, directorio)
+    return red.version
@@ -0,0 +1,239 @@
+## SUITE DE BENCHMARKS DE LAS ETAPAS PRINCIPALES
+# Mide, sin acceder a internet ni al dataset real, las etapas que recorre el dashboard sobre
+# datos sintéticos (benchmarks/sinteticos.py):
+#   - carga: lectura del dataset particionado completo;
+#   - filtro_anios: lectura de un rango de años con filtro por partición y filtro del cubo;
+#   - agregacion: cubo, KPIs y conteos de los gráficos;
+#   - mapa_calor: grillas por año y nivel de zoom, y puntos de la vista;
+#   - carga_red: apertura de la red CSR, su matriz de adyacencia y su KD-tree;
+#   - asignacion_nodos: nodo más cercano de cada punto de consulta;
+#   - ruteo: rutas seguras entre pares de nodos al azar;
+#   - utils: funciones vectorizadas de JupyterNotebooks/utils.py y el perfilador;
+#   - arranque_importacion y arranque_primer_render: importación inicial y primer render del
+#     dashboard en intérpretes nuevos, sobre los datos reales (ver presupuesto_inicio.py).
+# Cada etapa toma el mejor tiempo de varias repeticiones. Los resultados se guardan en JSON y
+# se comparan con una línea base: la suite termina con código 1 si alguna etapa es más lenta
+# que la línea base en más de 'umbral' (relativo), si supera su presupuesto absoluto
+# ('presupuestos' de la línea base) o si el primer render falla o carga dependencias de otras
+# pestañas. Los tiempos dependen de la máquina, así que la línea base debe regrabarse
+# (--guardar-linea-base, que conserva los presupuestos) al cambiar de equipo.
+#
+# Uso:
+#     python benchmarks/suite.py
+#     python benchmarks/suite.py --filas 1000000 --lado 300 --umbral 1.0
+#     python benchmarks/suite.py --guardar-linea-base
+#     python benchmarks/suite.py --sin-arranque       # omite las etapas de arranque (las más lentas)
+
+# Importaciones
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, '..'))
+sys.path.insert(0, os.path.join(DIRECTORIO, '..', 'JupyterNotebooks'))
+import cubo  # noqa: E402
+import datos  # noqa: E402
+import mapa_calor  # noqa: E402
+import red_vial  # noqa: E402
+import riesgo_vial  # noqa: E402
+import presupuesto_inicio  # noqa: E402
+import utils  # noqa: E402
+from bench_utils import datos_sinteticos  # noqa: E402
+from sinteticos import generar_red_grilla, generar_siniestros, guardar_red_grilla  # noqa: E402
+
+# Constantes
+RUTA_RESULTADOS = os.path.join(DIRECTORIO, 'resultados.json')
+RUTA_LINEA_BASE = os.path.join(DIRECTORIO, 'linea_base.json')
+UMBRAL = 0.5  # regresión relativa tolerada frente a la línea base
+MINIMO = 0.02  # segundos; diferencias menores se consideran ruido
+RANGO_FILTRO = (2020, 2022)
+GRAFICOS = ['anio', 'hora_num', 'tipo_via', 'dia', 'mes']
+CONSULTAS_NODOS = 100_000
+PARES_RUTEO = 20
+REPETICIONES_ARRANQUE = 3  # cada repetición abre dos intérpretes nuevos
+PRESUPUESTOS = {
+    'arranque_importacion': presupuesto_inicio.PRESUPUESTO_IMPORTACION,
+    'arranque_primer_render': presupuesto_inicio.PRESUPUESTO_PRIMER_RENDER,
+}
+
+
+# Funciones
+def medir(funcion, repeticiones):
+    '''
+    Devuelve el mejor tiempo (segundos) de 'repeticiones' llamadas a funcion.
+    '''
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def ejecutar(filas, lado, repeticiones, semilla=0):
+    '''
+    Genera los datos sintéticos en una carpeta temporal y mide cada etapa.
+
+    Returns:
+        dict: {etapa: segundos}.
+    '''
+    rng = np.random.default_rng(semilla)
+    df = generar_siniestros(filas, semilla)
+    red_grilla = generar_red_grilla(lado, semilla=semilla)
+    tiempos = {}
+
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta_dataset = os.path.join(temporal, 'siniestros')
+        directorio_red = os.path.join(temporal, 'red_vial')
+        datos.guardar_particionado(df, ruta_dataset)
+        guardar_red_grilla(red_grilla, directorio_red)
+
+        tiempos['carga'] = medir(lambda: datos.cargar_siniestros(ruta=ruta_dataset), repeticiones)
+
+        cubo_completo = cubo.construir_cubo(df)
+        columnas_cubo = cubo.DIMENSIONES + ['heridos', 'fallecidos']
+        tiempos['filtro_anios'] = medir(lambda: (
+            datos.cargar_siniestros(RANGO_FILTRO, columnas_cubo, ruta_dataset),
+            cubo.filtrar_cubo(cubo_completo, RANGO_FILTRO),
+        ), repeticiones)
+
+        def agregar():
+            cubo_filtrado = cubo.filtrar_cubo(cubo.construir_cubo(df), RANGO_FILTRO)
+            cubo.kpis(cubo_filtrado)
+            for dimension in GRAFICOS:
+                cubo.conteo_por(cubo_filtrado, dimension)
+        tiempos['agregacion'] = medir(agregar, repeticiones)
+
+        tiempos['mapa_calor'] = medir(lambda: mapa_calor.puntos_mapa_calor(
+            mapa_calor.agregar_mapa_calor(df), RANGO_FILTRO), repeticiones)
+
+        def cargar_red():
+            red = red_vial.cargar_red(directorio_red)
+            red.matriz()
+            red.indice_nodos
+            return red
+        tiempos['carga_red'] = medir(cargar_red, repeticiones)
+
+        red = cargar_red()
+        lat = rng.uniform(red.lat.min(), red.lat.max(), CONSULTAS_NODOS)
+        lon = rng.uniform(red.lon.min(), red.lon.max(), CONSULTAS_NODOS)
+        tiempos['asignacion_nodos'] = medir(lambda: red_vial.nodos_mas_cercanos(red, lat, lon), repeticiones)
+
+        pares = rng.integers(0, red.cantidad_nodos, (PARES_RUTEO, 2))
+        riesgo_vial.ruta_segura(red, 0, 0)  # arma la matriz de costos fuera de la medición
+        tiempos['ruteo'] = medir(lambda: [riesgo_vial.ruta_segura(red, int(a), int(b)) for a, b in pares], repeticiones)
+
+    columnas_utils = datos_sinteticos(filas, semilla)
+    tiempos['utils'] = medir(lambda: (
+        utils.reemplaza_a_flotante_serie(columnas_utils['precio']),
+        utils.obtener_anio_release_serie(columnas_utils['fecha_iso']),
+        utils.convertir_fecha_serie(columnas_utils['fecha_texto']),
+        utils.verificar_tipo_datos_vectorizado(columnas_utils),
+        utils.perfilar(df),
+    ), repeticiones)
+    return tiempos
+
+
+def medir_arranque(repeticiones):
+    '''
+    Mide la importación inicial y el primer render del dashboard con presupuesto_inicio.py.
+
+    Returns:
+        tuple: ({etapa: segundos}, dict con las 'excepciones' y las dependencias 'cargadas_de_mas').
+    '''
+    arranque = presupuesto_inicio.medir(repeticiones)
+    tiempos = {'arranque_importacion': arranque['importacion'], 'arranque_primer_render': arranque['primer_render']}
+    return tiempos, {'excepciones': arranque['excepciones'], 'cargadas_de_mas': arranque['cargadas_de_mas']}
+
+
+def comparar(resultado, linea_base, umbral=UMBRAL, minimo=MINIMO):
+    '''
+    Imprime cada etapa frente a la línea base y devuelve True si ninguna empeoró más que el umbral.
+
+    Las etapas con presupuesto en la línea base fallan además si lo superan, aunque la línea base
+    se haya medido con otros parámetros.
+
+    Parameters:
+        resultado (dict): Resultado de esta ejecución ('parametros', 'etapas' y, si se midió, 'arranque').
+        linea_base (dict): Resultado guardado anteriormente, o None.
+        umbral (float): Regresión relativa tolerada (0.5 = 50 % más lento).
+        minimo (float): Diferencia absoluta en segundos por debajo de la cual no se considera regresión.
+    '''
+    presupuestos = linea_base.get('presupuestos', PRESUPUESTOS) if linea_base else PRESUPUESTOS
+    if linea_base and linea_base['parametros'] != resultado['parametros']:
+        print(f"La línea base se midió con otros parámetros ({linea_base['parametros']}); no se compara")
+        linea_base = None
+
+    correcto = True
+    for etapa, segundos in resultado['etapas'].items():
+        base = linea_base['etapas'].get(etapa) if linea_base else None
+        presupuesto = presupuestos.get(etapa)
+        excedido = presupuesto is not None and segundos > presupuesto
+        detalle = f'   presupuesto {presupuesto:.2f} s' if presupuesto is not None else ''
+        if base is None:
+            correcto &= not excedido
+            print(f'  {etapa:<22} {segundos:8.4f} s{detalle}   {"FALLA" if excedido else "OK"}')
+            continue
+        regresion = segundos > base * (1 + umbral) and segundos - base > minimo
+        correcto &= not (regresion or excedido)
+        print(f'  {etapa:<22} {segundos:8.4f} s   base {base:8.4f} s   {segundos / base - 1:+7.1%}{detalle}   '
+              f'{"FALLA" if regresion or excedido else "OK"}')
+
+    for control, problemas in resultado.get('arranque', {}).items():
+        correcto &= not problemas
+        print(f'  {control:<22} {problemas or "ninguna"}   {"FALLA" if problemas else "OK"}')
+    return correcto
+
+
+def guardar_json(contenido, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, indent=2)
+
+
+def cargar_json(ruta):
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide las etapas principales sobre datos sintéticos.')
+    parser.add_argument('--filas', type=int, default=100_000, help='Siniestros sintéticos (10 mil a 10 millones)')
+    parser.add_argument('--lado', type=int, default=150, help='Intersecciones por lado de la red en grilla')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones por etapa (se toma la mejor)')
+    parser.add_argument('--umbral', type=float, default=UMBRAL, help='Regresión relativa tolerada')
+    parser.add_argument('--salida', default=RUTA_RESULTADOS, help='JSON con los resultados de esta ejecución')
+    parser.add_argument('--linea-base', default=RUTA_LINEA_BASE, help='JSON con la línea base')
+    parser.add_argument('--guardar-linea-base', action='store_true', help='Guardar esta ejecución como línea base')
+    parser.add_argument('--sin-arranque', action='store_true', help='No medir la importación ni el primer render del dashboard')
+    args = parser.parse_args()
+
+    print(f'Suite de benchmarks: {args.filas} siniestros, red de {args.lado}x{args.lado}')
+    resultado_suite = {
+        'parametros': {'filas': args.filas, 'lado': args.lado},
+        'entorno': {'repeticiones': args.repeticiones, 'python': platform.python_version(), 'plataforma': platform.platform(),
+                    'fecha': datetime.datetime.now().isoformat(timespec='seconds')},
+        'etapas': ejecutar(args.filas, args.lado, args.repeticiones),
+    }
+    if not args.sin_arranque:
+        tiempos_arranque, resultado_suite['arranque'] = medir_arranque(min(args.repeticiones, REPETICIONES_ARRANQUE))
+        resultado_suite['etapas'].update(tiempos_arranque)
+    guardar_json(resultado_suite, args.salida)
+
+    linea_base_suite = cargar_json(args.linea_base)
+    if args.guardar_linea_base:
+        presupuestos_guardados = (linea_base_suite or {}).get('presupuestos', PRESUPUESTOS)
+        guardar_json({**resultado_suite, 'presupuestos': presupuestos_guardados}, args.linea_base)
+        comparar(resultado_suite, None)
+        print(f'Línea base guardada en {args.linea_base}')
+        sys.exit(0)
+    sys.exit(0 if comparar(resultado_suite, linea_base_suite, args.umbral) else 1)
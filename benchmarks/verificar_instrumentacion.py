@@ -0,0 +1,50 @@
+## INSTRUMENTACIÓN ACTIVADA SÓLO CON LA VARIABLE DE ENTORNO
+# Ejecuta en un proceso nuevo, con INSTRUMENTACION=1 y un log en una carpeta que todavía no
+# existe, un tramo anidado que asigna memoria, sin llamar a instrumentacion.activar(). Verifica
+# que el log se haya creado con una línea por tramo y que cada tramo tenga su pico de memoria
+# (tracemalloc arrancado al importar el módulo). Termina con código 1 si algo falla.
+#
+# Uso:
+#     python benchmarks/verificar_instrumentacion.py
+
+# Importaciones
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CODIGO_TRAMOS = '''
+import instrumentacion
+
+with instrumentacion.tramo('externo'):
+    with instrumentacion.tramo('interno', filas=10):
+        bloque = bytearray(4 * 2 ** 20)
+'''
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta_log = os.path.join(temporal, 'logs', 'instrumentacion.jsonl')
+        entorno = {**os.environ, 'INSTRUMENTACION': '1', 'INSTRUMENTACION_LOG': ruta_log, 'PYTHONPATH': DIRECTORIO}
+        proceso = subprocess.run([sys.executable, '-c', CODIGO_TRAMOS], env=entorno, capture_output=True, text=True)
+        registros = []
+        if os.path.exists(ruta_log):
+            with open(ruta_log, encoding='utf-8') as archivo:
+                registros = [json.loads(linea) for linea in archivo]
+
+    por_tramo = {registro['tramo']: registro for registro in registros}
+    verificaciones = {
+        'proceso sin errores': proceso.returncode == 0,
+        'log creado con un registro por tramo': sorted(por_tramo) == ['externo', 'interno'],
+        'pico de memoria medido': bool(registros) and all(registro.get('pico_memoria') for registro in registros),
+        'pico del tramo interno >= 4 MB': (por_tramo.get('interno', {}).get('pico_memoria') or 0) >= 4 * 2 ** 20,
+        'tramo anidado con su padre': por_tramo.get('interno', {}).get('padre') == 'externo',
+    }
+    for nombre, correcto in verificaciones.items():
+        print(f'  {"OK   " if correcto else "FALLA"} {nombre}')
+    if proceso.returncode:
+        print(proceso.stderr)
+    sys.exit(0 if all(verificaciones.values()) else 1)
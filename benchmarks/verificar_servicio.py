@@ -0,0 +1,171 @@
+## SERVICIO DE RUTAS CONTRA LA RED DE cache/ (SIN INTERNET)
+# Compila la red de Corrientes desde la respuesta de Overpass guardada en cache/ en una carpeta
+# temporal, levanta el servidor HTTP de servicio.py en un puerto libre y verifica sus endpoints:
+# rutas con la misma longitud que nx.shortest_path_length, puntos fuera de la red (422 en /ruta,
+# error por pedido en /rutas, 400 en /matriz), las mismas rutas desde las jerarquías de
+# contracción, pedidos sin camino, entradas inválidas, agregados filtrados por involucrados y la recarga de la red cuando cambia la versión de meta.json.
+# Termina con código 1 si algo falla.
+#
+# Uso:
+#     python benchmarks/verificar_servicio.py --pedidos 50
+
+# Importaciones
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DIRECTORIO)
+os.chdir(DIRECTORIO)
+import jerarquias  # noqa: E402
+import red_vial  # noqa: E402
+import servicio  # noqa: E402
+
+TOLERANCIA = 1e-6  # metros
+LEJOS = (-27.60, -58.60)  # a más de 20 km de la red de cache/
+
+
+# Funciones
+def pedir(url, cuerpo=None):
+    '''
+    Hace un GET (o un POST con cuerpo JSON) y devuelve (estado HTTP, respuesta JSON).
+    '''
+    datos = None if cuerpo is None else json.dumps(cuerpo).encode('utf-8')
+    pedido = Request(url, data=datos, headers={'Content-Type': 'application/json'})
+    try:
+        with urlopen(pedido, timeout=60) as respuesta:
+            return respuesta.status, json.loads(respuesta.read())
+    except HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def longitud_networkx(grafo, u, v):
+    try:
+        return nx.shortest_path_length(grafo, u, v, weight='length')
+    except nx.NetworkXNoPath:
+        return None
+
+
+def pedido_nodos(red, u, v, alpha=0.0):
+    return {'lat_inicio': float(red.lat[u]), 'lon_inicio': float(red.lon[u]),
+            'lat_fin': float(red.lat[v]), 'lon_fin': float(red.lon[v]), 'alpha': alpha}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verifica el servicio de rutas con la red de cache/.')
+    parser.add_argument('--pedidos', type=int, default=50, help='Rutas que se comparan con NetworkX')
+    args = parser.parse_args()
+
+    grafo = red_vial.descargar_grafo()
+    rng = np.random.default_rng(0)
+    verificaciones = {}
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio_red = os.path.join(temporal, 'red_vial')
+        servicio_rutas = servicio.Servicio(directorio_red)
+        red = servicio_rutas.red
+        servidor = servicio.crear_servidor(servicio_rutas, puerto=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+        estado, salud = pedir(f'{base}/salud')
+        verificaciones['/salud responde la red compilada desde cache/'] = (
+            estado == 200 and salud['nodos'] == red.cantidad_nodos == grafo.number_of_nodes())
+
+        # Rutas por longitud contra NetworkX, en lote y una por una
+        pares = rng.integers(0, red.cantidad_nodos, (args.pedidos, 2)).tolist()
+        estado, lote = pedir(f'{base}/rutas', {'pedidos': [pedido_nodos(red, u, v) for u, v in pares]})
+        diferencias = 0
+        for (u, v), respuesta in zip(pares, lote['rutas'] if estado == 200 else [None] * len(pares)):
+            esperada = longitud_networkx(grafo, int(red.osmid[u]), int(red.osmid[v]))
+            obtenida = None if respuesta is None or 'error' in respuesta else respuesta['longitud']
+            diferencias += not ((esperada is None and obtenida is None) or
+                                (esperada is not None and obtenida is not None and abs(esperada - obtenida) <= TOLERANCIA))
+        verificaciones[f'POST /rutas: {args.pedidos} longitudes iguales a NetworkX'] = estado == 200 and diferencias == 0
+
+        # Las mismas rutas de a una, desde las jerarquías de contracción guardadas junto a la red
+        jerarquias.guardar_jerarquia(jerarquias.preprocesar(red, 0.0), 0.0, directorio_red)
+        servicio_rutas.cache.limpiar()
+        etiquetadas = [pedir(f'{base}/rutas', {'pedidos': [pedido_nodos(red, u, v)]})[1]['rutas'][0] for u, v in pares]
+        verificaciones[f'POST /rutas con jerarquías: {args.pedidos} rutas iguales a Dijkstra'] = (
+            jerarquias.jerarquia(red, 0.0, directorio_red) is not None and
+            all(a.get('longitud') is not None and abs(a['longitud'] - b['longitud']) <= TOLERANCIA
+                if 'error' not in b else 'error' in a for a, b in zip(etiquetadas, lote['rutas'])))
+
+        u, v = pares[0]
+        estado, unica = pedir(f'{base}/ruta?{urlencode(pedido_nodos(red, u, v))}')
+        verificaciones['GET /ruta igual al mismo pedido en lote'] = (
+            estado == (422 if 'error' in lote['rutas'][0] else 200) and unica.get('longitud') == lote['rutas'][0].get('longitud'))
+
+        # Un nodo al que no se llega desde el primero: la ruta no tiene solución
+        alcanzables = np.isfinite(dijkstra(red.matriz(), indices=int(pares[0][0])))
+        if alcanzables.all():
+            verificaciones['GET /ruta sin camino responde 422'] = True  # la red es fuertemente conexa
+        else:
+            sin_camino = int(np.flatnonzero(~alcanzables)[0])
+            estado, respuesta = pedir(f'{base}/ruta?{urlencode(pedido_nodos(red, pares[0][0], sin_camino))}')
+            verificaciones['GET /ruta sin camino responde 422'] = estado == 422 and 'No existe' in respuesta['error']
+
+        # Puntos fuera de la red
+        lejos = {'lat_inicio': LEJOS[0], 'lon_inicio': LEJOS[1],
+                 'lat_fin': float(red.lat[v]), 'lon_fin': float(red.lon[v])}
+        estado, respuesta = pedir(f'{base}/ruta?{urlencode(lejos)}')
+        verificaciones['GET /ruta fuera de la red responde 422'] = estado == 422 and 'fuera de la red' in respuesta['error']
+        estado, respuesta = pedir(f'{base}/rutas', {'pedidos': [lejos, pedido_nodos(red, u, v)]})
+        verificaciones['POST /rutas marca sólo el pedido fuera de la red'] = (
+            estado == 200 and 'fuera de la red' in respuesta['rutas'][0].get('error', '')
+            and 'error' not in respuesta['rutas'][1])
+        puntos = [[float(red.lat[n]), float(red.lon[n])] for n in rng.integers(0, red.cantidad_nodos, 5).tolist()]
+        estado, respuesta = pedir(f'{base}/matriz', {'origenes': puntos, 'destinos': puntos + [list(LEJOS)]})
+        verificaciones['POST /matriz fuera de la red responde 400'] = estado == 400 and 'destino 5' in respuesta['error']
+
+        # Matriz contra NetworkX
+        estado, respuesta = pedir(f'{base}/matriz', {'origenes': puntos, 'destinos': puntos})
+        nodos = [int(red.osmid[n]) for n in red_vial.nodos_mas_cercanos(red, *np.array(puntos).T)[0]]
+        esperadas = [[longitud_networkx(grafo, a, b) for b in nodos] for a in nodos]
+        verificaciones['POST /matriz igual a NetworkX'] = estado == 200 and all(
+            (e is None and o is None) or (e is not None and o is not None and abs(e - o) <= 1e-3)
+            for fila_e, fila_o in zip(esperadas, respuesta['costos']) for e, o in zip(fila_e, fila_o))
+
+        # Entradas inválidas
+        estado_campo, _ = pedir(f'{base}/ruta?lat_inicio=-27.46&lon_inicio=-58.84&lat_fin=-27.46')
+        estado_rango, _ = pedir(f'{base}/ruta?lat_inicio=-127&lon_inicio=-58.84&lat_fin=-27.46&lon_fin=-58.84')
+        estado_dimension, _ = pedir(f'{base}/agregados?dimensiones=color')
+        verificaciones['entradas inválidas responden 400'] = estado_campo == estado_rango == estado_dimension == 400
+
+        # Agregados: los filtrados por involucrados son un subconjunto de los totales
+        estado_total, total = pedir(f'{base}/agregados?dimensiones=anio')
+        estado_motos, motos = pedir(f'{base}/agregados?dimensiones=anio&involucrados=Motocicleta')
+        verificaciones['/agregados con involucrados'] = (
+            estado_total == estado_motos == 200
+            and 0 < motos['kpis']['total'] <= total['kpis']['total']
+            and all(cantidad <= total['conteos']['anio'][anio] for anio, cantidad in motos['conteos']['anio'].items()))
+
+        # Recarga de la red cuando otra versión reemplaza a la guardada
+        ruta_meta = os.path.join(directorio_red, 'meta.json')
+        with open(ruta_meta, encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+        meta['version'] = 'recargada'
+        with open(ruta_meta, 'w', encoding='utf-8') as archivo:
+            json.dump(meta, archivo)
+        estado, salud = pedir(f'{base}/salud')
+        _, recalculada = pedir(f'{base}/ruta?{urlencode(pedido_nodos(red, u, v))}')
+        verificaciones['recarga la red al cambiar meta.json'] = (
+            estado == 200 and salud['version_red'] == 'recargada' and servicio_rutas.red is not red
+            and recalculada.get('longitud') == unica.get('longitud'))
+
+        servidor.shutdown()
+        servidor.server_close()
+
+    for nombre, correcto in verificaciones.items():
+        print(f'  {"OK   " if correcto else "FALLA"} {nombre}')
+    sys.exit(0 if all(verificaciones.values()) else 1)
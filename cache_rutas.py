@@ -0,0 +1,159 @@
+## CACHE DE RUTAS CALCULADAS
+# Caché LRU acotada y compartida por todo el proceso. La clave es (nodo de inicio, nodo de fin,
+# alpha) ya asignados a la red, así que pedidos con coordenadas casi iguales reutilizan la
+# misma ruta. Cada entrada guarda la ruta, sus coordenadas, el resumen y el fragmento de mapa
+# (GeoJSON) listo para folium. La caché se vacía sola cuando cambia la versión de la red o del riesgo
+# guardada en disco (meta.json), aunque el proceso conserve abierta la red anterior.
+
+# Importaciones
+import threading
+from collections import OrderedDict
+
+import red_vial
+import riesgo_vial
+
+# Constantes
+CAPACIDAD = 512
+
+
+# Clases
+class CacheRutas:
+    '''
+    Caché LRU con contadores de aciertos y fallos, segura para uso desde varios hilos.
+
+    Parameters:
+        capacidad (int): Cantidad máxima de rutas guardadas; al superarla se descarta la menos usada.
+    '''
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self.capacidad = capacidad
+        self.version = None
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def validar_version(self, version):
+        '''
+        Vacía la caché si la versión de los datos (red y riesgo) es distinta de la de sus entradas.
+        '''
+        with self._lock:
+            if version != self.version:
+                self._entradas.clear()
+                self.version = version
+
+    def obtener(self, clave):
+        '''
+        Devuelve la entrada guardada para 'clave' (y la marca como la más reciente) o None.
+        '''
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada
+
+    def guardar(self, clave, entrada):
+        '''
+        Guarda una entrada y descarta las menos usadas si se supera la capacidad.
+        '''
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self):
+        '''
+        Devuelve un diccionario con el tamaño, la capacidad, los aciertos, los fallos y la tasa de aciertos.
+        '''
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'capacidad': self.capacidad,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+# Instancia compartida por el proceso
+CACHE_RUTAS = CacheRutas()
+
+
+# Funciones
+def fragmento_geojson(coordenadas, propiedades=None):
+    '''
+    Arma el fragmento GeoJSON (Feature LineString) de una ruta, listo para folium.GeoJson.
+
+    Parameters:
+        coordenadas (list): Lista de (latitud, longitud) de la ruta.
+        propiedades (dict, opcional): Propiedades a incluir en la Feature.
+
+    Returns:
+        dict: La Feature GeoJSON, con coordenadas en orden (longitud, latitud).
+    '''
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in coordenadas]},
+        'properties': propiedades or {},
+    }
+
+
+def armar_entrada(red, ruta):
+    '''
+    Arma la entrada de caché de una ruta: sus coordenadas, su resumen y su fragmento GeoJSON.
+
+    Returns:
+        dict: 'ruta', 'coordenadas', 'longitud', 'riesgo', 'semaforos' y 'fragmento' (GeoJSON).
+    '''
+    coordenadas = red_vial.coordenadas_ruta(red, ruta)
+    longitud, riesgo, semaforos = riesgo_vial.resumen_ruta(red, ruta)
+    return {
+        'ruta': ruta,
+        'coordenadas': coordenadas,
+        'longitud': longitud,
+        'riesgo': riesgo,
+        'semaforos': semaforos,
+        'fragmento': fragmento_geojson(coordenadas, {'longitud': longitud, 'riesgo': riesgo}),
+    }
+
+
+def ruta_cacheada(red, nodo_inicio, nodo_fin, alpha=0.5, cache=CACHE_RUTAS, directorio=red_vial.DIRECTORIO_RED):
+    '''
+    Devuelve la ruta segura entre dos nodos, calculándola sólo si no está en la caché.
+
+    Parameters:
+        red (RedVial): La red vial compilada, con su riesgo precalculado.
+        nodo_inicio, nodo_fin (int): Nodos ya asignados a la red.
+        alpha (float): Peso del riesgo frente a la distancia (ver riesgo_vial.costo_aristas).
+        cache (CacheRutas): Caché a usar; por defecto la compartida por el proceso.
+        directorio (str): Carpeta de la red guardada, cuya versión en disco valida la caché.
+
+    Returns:
+        dict: La entrada de la ruta (ver armar_entrada).
+    '''
+    version = red_vial.version_guardada(directorio)
+    cache.validar_version(version)
+    clave = (int(nodo_inicio), int(nodo_fin), round(float(alpha), 3))
+    if (red.version, red.version_riesgo) != version:
+        # La red en memoria es anterior a la guardada: su ruta no se mezcla con las de la versión nueva
+        return armar_entrada(red, riesgo_vial.ruta_segura(red, nodo_inicio, nodo_fin, alpha))
+
+    entrada = cache.obtener(clave)
+    if entrada is None:
+        entrada = armar_entrada(red, riesgo_vial.ruta_segura(red, nodo_inicio, nodo_fin, alpha))
+        cache.guardar(clave, entrada)
+    return entrada
@@ -0,0 +1,132 @@
+## CUBO DE AGREGADOS PARA LOS FILTROS Y GRÁFICOS DEL DASHBOARD
+# Etapa de ETL que resume los siniestros en un cubo anio x mes x dia x hora_num x tipo_via x semaforo
+# con la cantidad de siniestros y la suma de heridos y fallecidos. Todos los KPIs y gráficos de las
+# pestañas 1 y 2 se responden filtrando y sumando el cubo, cuyo tamaño está acotado por la
+# cantidad de combinaciones de dimensiones y no por la cantidad de siniestros.
+#
+# El filtro por tipos de involucrado no pasa por el cubo: agrupar también por la máscara de bits
+# dejaba casi una celda por siniestro. Esas consultas se responden con cubo_involucrados, que lee
+# del dataset particionado sólo los años y columnas pedidos y arma un cubo chico para ellos.
+#
+# Uso de la etapa de agregación:
+#     python cubo.py
+
+# Importaciones
+import argparse
+
+import pandas as pd
+
+import datos
+
+# Constantes
+RUTA_CUBO = 'Datasets_limpios/cubo_siniestros.parquet'
+DIMENSIONES = ['anio', 'mes', 'dia', 'hora_num', 'tipo_via', 'semaforo']
+MEDIDAS = ['cantidad', 'heridos', 'fallecidos']
+ESTADOS_CON_SEMAFORO = ['Funciona', 'Intermitente', 'No Funciona']
+
+
+# Funciones
+def construir_cubo(df):
+    '''
+    Construye el cubo de agregados a partir del dataset final de siniestros.
+
+    Las combinaciones con valores nulos en alguna dimensión (por ejemplo, hora no informada) se
+    conservan para que los totales del cubo coincidan con la cantidad de filas.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros con las columnas de DIMENSIONES (o 'hora' en lugar de
+            'hora_num'), 'heridos' y 'fallecidos'.
+
+    Returns:
+        pandas.DataFrame: Una fila por combinación de dimensiones con 'cantidad', 'heridos' y 'fallecidos'.
+    '''
+    df = df.copy()
+    if 'hora_num' not in df.columns:
+        df['hora_num'] = pd.to_datetime(df['hora'], format='%H:%M:%S', errors='coerce').dt.hour
+    df['cantidad'] = 1
+    # Los contadores del dataset son int8 (ver datos.ESQUEMA): se suman en int32 para no desbordar
+    df[MEDIDAS] = df[MEDIDAS].astype('int32')
+
+    return df.groupby(DIMENSIONES, dropna=False, observed=True)[MEDIDAS].sum().reset_index()
+
+
+def filtrar_cubo(cubo, rango_anios):
+    '''
+    Devuelve las celdas del cubo cuyo año está en el rango (inclusive).
+
+    Parameters:
+        cubo (pandas.DataFrame): Cubo de construir_cubo.
+        rango_anios (tuple): (año inicial, año final).
+    '''
+    return cubo[cubo['anio'].between(*rango_anios)]
+
+
+def cubo_involucrados(rango_anios, mascara, ruta=datos.RUTA_DATASET):
+    '''
+    Construye el cubo de los siniestros de un rango de años con algún involucrado de ciertos tipos.
+
+    Lee del dataset particionado sólo las particiones del rango y las columnas del cubo, así que
+    su costo depende de los años pedidos y no del total de siniestros.
+
+    Parameters:
+        rango_anios (tuple): (año inicial, año final).
+        mascara (int): Tipos de involucrado (ver datos.mascara_involucrados); 0 no filtra.
+        ruta (str): Carpeta raíz del dataset.
+
+    Returns:
+        pandas.DataFrame: Cubo con las mismas columnas que el de construir_cubo.
+    '''
+    df = datos.cargar_siniestros(rango_anios, DIMENSIONES + ['mascara_involucrados', 'heridos', 'fallecidos'], ruta)
+    if mascara:
+        df = df[(df['mascara_involucrados'] & mascara) != 0]
+    return construir_cubo(df.drop(columns='mascara_involucrados'))
+
+
+def kpis(cubo):
+    '''
+    Calcula los KPIs de semáforos sobre un cubo (ya filtrado).
+
+    Returns:
+        dict: 'total', 'con_semaforo' y 'porcentaje_con_semaforo'.
+    '''
+    total = int(cubo['cantidad'].sum())
+    con_semaforo = int(cubo.loc[cubo['semaforo'].isin(ESTADOS_CON_SEMAFORO), 'cantidad'].sum())
+    return {
+        'total': total,
+        'con_semaforo': con_semaforo,
+        'porcentaje_con_semaforo': (con_semaforo / total) * 100 if total else 0.0,
+    }
+
+
+def conteo_por(cubo, dimension, medida='cantidad'):
+    '''
+    Suma una medida del cubo por una dimensión, ordenada por el valor de la dimensión.
+
+    Equivale a df.groupby(dimension).size() (o a sns.countplot) sobre las filas originales;
+    los valores nulos de la dimensión se descartan.
+
+    Returns:
+        pandas.DataFrame: Columnas [dimension, medida].
+    '''
+    return cubo.groupby(dimension, observed=True)[medida].sum().reset_index().sort_values(dimension)
+
+
+def guardar_cubo(cubo, ruta=RUTA_CUBO):
+    cubo.to_parquet(ruta, index=False)
+
+
+def cargar_cubo(ruta=RUTA_CUBO):
+    return pd.read_parquet(ruta)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construye el cubo de agregados del dashboard.')
+    parser.add_argument('--siniestros', default=datos.RUTA_DATASET, help='Dataset particionado de siniestros (con los deltas de ingesta.py)')
+    parser.add_argument('--destino', default=RUTA_CUBO, help='Parquet de salida')
+    args = parser.parse_args()
+
+    columnas = [d for d in DIMENSIONES if d != 'hora_num'] + ['hora', 'heridos', 'fallecidos']
+    cubo_siniestros = construir_cubo(datos.cargar_siniestros(columnas=columnas, ruta=args.siniestros))
+    guardar_cubo(cubo_siniestros, args.destino)
+    print(f'Cubo guardado en {args.destino}: {len(cubo_siniestros)} celdas, '
+          f'{int(cubo_siniestros["cantidad"].sum())} siniestros')
@@ -0,0 +1,242 @@
+## ALMACENAMIENTO PARTICIONADO DEL DATASET FINAL
+# El dataset final de siniestros se guarda como un dataset Parquet particionado por año
+# (Datasets_limpios/siniestros/anio=AAAA/...), con estadísticas por grupo de filas. Cada vista
+# del dashboard pide sólo el rango de años y las columnas que usa, así que pyarrow lee
+# únicamente las particiones y columnas necesarias: el tiempo de carga y la memoria de cada
+# proceso no crecen con los años que no se consultan.
+#
+# ESQUEMA fija el tipo de cada columna: categorías para los textos de pocos valores, enteros
+# chicos para los contadores, float32 para las coordenadas y la hora ya parseada en 'hora_num'.
+# El ETL lo aplica al escribir y el cargador lo verifica al leer.
+#
+# Los involucrados de cada siniestro (vehículos y peatones) se guardan aparte, una fila por
+# involucrado, en Datasets_limpios/involucrados/ (también particionado por año, con
+# ESQUEMA_INVOLUCRADOS). El dataset de siniestros sólo lleva 'mascara_involucrados': un bit por
+# cada tipo de TIPOS_INVOLUCRADO presente, de modo que filtrar, por ejemplo, los siniestros con
+# motocicletas es una operación de bits sobre una columna entera y no una búsqueda de texto.
+# Reemplaza a la columna de texto 'vehiculo', que el ETL escribe sólo en siniestrosfinal.parquet
+# durante la transición (ver etl.columna_vehiculo).
+
+# Importaciones
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Constantes
+RUTA_DATASET = 'Datasets_limpios/siniestros'
+RUTA_INVOLUCRADOS = 'Datasets_limpios/involucrados'
+COLUMNA_PARTICION = 'anio'
+FILAS_POR_GRUPO = 50_000
+
+ESQUEMA = {
+    'id_feu': 'int32',
+    'hora': 'object',  # datetime.time
+    'hora_num': 'UInt8',  # hora del día (0-23), nula si la hora no se informó
+    'zona': 'category',
+    'tipo_via': 'category',
+    'latitud': 'float32',
+    'longitud': 'float32',
+    'ilesos': 'int8',
+    'heridos': 'int8',
+    'fallecidos': 'int8',
+    'peatones': 'int8',
+    'tipo_siniestro': 'category',
+    'vehiculos_involucrados': 'int8',
+    'material_de_la_calzada': 'category',
+    'estado_de_la_calzada': 'category',
+    'luz_artificial': 'category',
+    'condiciones_climaticas': 'category',
+    'semaforo': 'category',
+    'anio': 'int16',
+    'mes': 'int8',
+    'dia': 'int8',
+    'cruce': 'category',
+    'lugar_del_hecho': 'str',
+    'es_colision': 'category',
+    'tipo_siniestro_para_grafico': 'category',
+    'mascara_involucrados': 'int16',  # bit i encendido si participó un involucrado de TIPOS_INVOLUCRADO[i]
+}
+
+# El orden define el bit de cada tipo en 'mascara_involucrados': agregar tipos nuevos sólo al final
+TIPOS_INVOLUCRADO = [
+    'Automóvil', 'Motocicleta', 'Camioneta/Utilitario', 'Transporte de carga', 'Transporte de pasajeros',
+    'Bicicleta', 'Peatón', 'Tracción a sangre', 'Maquinaria', 'Cuatriciclo',
+    'Vehículos de movilidad personal', 'Otro', 'S/D',
+]
+
+ESQUEMA_INVOLUCRADOS = {
+    'id_feu': 'int32',
+    'numero': 'int8',  # número del involucrado dentro del siniestro
+    'tipo_involucrado': 'category',
+    'anio': 'int16',
+}
+
+
+# Funciones
+def aplicar_esquema(df):
+    '''
+    Convierte las columnas del dataset final a los tipos de ESQUEMA.
+
+    Los contadores se redondean antes de pasarlos a entero, ya que el relleno de nulos con la
+    media puede dejar valores fraccionarios.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros con (al menos) las columnas de ESQUEMA.
+
+    Returns:
+        pandas.DataFrame: Las columnas de ESQUEMA, en ese orden y con sus tipos.
+    '''
+    df = df[list(ESQUEMA)].copy()
+    for columna, tipo in ESQUEMA.items():
+        if tipo.startswith(('int', 'UInt')) and pd.api.types.is_float_dtype(df[columna]):
+            df[columna] = df[columna].round()
+    return df.astype(ESQUEMA)
+
+
+def categorizar_involucrados(tipos):
+    '''
+    Convierte los tipos de involucrado a una categoría con las categorías de TIPOS_INVOLUCRADO.
+
+    Los nulos pasan a 'S/D' y los tipos que no figuran en la lista, a 'Otro'.
+
+    Parameters:
+        tipos (pandas.Series): Tipos de involucrado tal como vienen en el FEU.
+
+    Returns:
+        pandas.Series: Los mismos tipos, con dtype category y las categorías en el orden de los bits.
+    '''
+    tipos = tipos.astype('object').fillna('S/D')
+    tipos = tipos.where(tipos.isin(TIPOS_INVOLUCRADO), 'Otro')
+    return tipos.astype(pd.CategoricalDtype(TIPOS_INVOLUCRADO))
+
+
+def mascara_involucrados(tipos):
+    '''
+    Devuelve la máscara de bits de un conjunto de tipos de involucrado.
+
+    Un siniestro tiene alguno de los tipos si (df['mascara_involucrados'] & mascara) != 0.
+
+    Parameters:
+        tipos (list): Tipos de TIPOS_INVOLUCRADO.
+
+    Returns:
+        int: Suma de los bits de los tipos (0 si la lista está vacía).
+
+    Raises:
+        ValueError: Si algún tipo no figura en TIPOS_INVOLUCRADO.
+    '''
+    desconocidos = [tipo for tipo in tipos if tipo not in TIPOS_INVOLUCRADO]
+    if desconocidos:
+        raise ValueError(f'Tipos de involucrado desconocidos: {desconocidos}')
+    mascara = 0
+    for tipo in tipos:
+        mascara |= 1 << TIPOS_INVOLUCRADO.index(tipo)
+    return mascara
+
+
+def validar_esquema(df, esquema=ESQUEMA):
+    '''
+    Verifica que las columnas de esquema presentes en df tengan el tipo esperado.
+
+    Raises:
+        ValueError: Si alguna columna tiene otro tipo (por ejemplo, un parquet generado con una
+            versión anterior del ETL).
+    '''
+    diferencias = [
+        f'{columna}: {df[columna].dtype} (se esperaba {tipo})'
+        for columna, tipo in esquema.items()
+        if columna in df.columns and str(df[columna].dtype) != tipo
+    ]
+    if diferencias:
+        raise ValueError('El dataset no respeta el esquema; volver a ejecutar etl.py. ' + '; '.join(diferencias))
+
+
+def guardar_particionado(df, ruta=RUTA_DATASET, filas_por_grupo=FILAS_POR_GRUPO):
+    '''
+    Guarda el dataset final particionado por año, reemplazando las particiones existentes.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros (o involucrados) con la columna 'anio'.
+        ruta (str): Carpeta raíz del dataset.
+        filas_por_grupo (int): Tamaño máximo de cada grupo de filas (con sus estadísticas min/max).
+    '''
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(
+        tabla,
+        root_path=ruta,
+        partition_cols=[COLUMNA_PARTICION],
+        basename_template='parte-{i}.parquet',
+        existing_data_behavior='delete_matching',
+        row_group_size=filas_por_grupo,
+        write_statistics=True,
+    )
+
+
+def _dataset(ruta=RUTA_DATASET):
+    return ds.dataset(ruta, format='parquet', partitioning='hive')
+
+
+def anios_disponibles(ruta=RUTA_DATASET):
+    '''
+    Devuelve la lista ordenada de años del dataset, leyendo sólo los nombres de las particiones.
+    '''
+    anios = set()
+    for nombre in os.listdir(ruta):
+        clave, _, valor = nombre.partition('=')
+        if clave == COLUMNA_PARTICION and valor.isdigit():
+            anios.add(int(valor))
+    return sorted(anios)
+
+
+def _cargar(ruta, rango_anios, columnas, esquema):
+    filtro = None
+    if rango_anios is not None:
+        inicio, fin = rango_anios
+        filtro = (ds.field(COLUMNA_PARTICION) >= int(inicio)) & (ds.field(COLUMNA_PARTICION) <= int(fin))
+
+    df = _dataset(ruta).to_table(columns=columnas, filter=filtro).to_pandas()
+    if COLUMNA_PARTICION in df.columns:
+        df[COLUMNA_PARTICION] = df[COLUMNA_PARTICION].astype(esquema[COLUMNA_PARTICION])
+    validar_esquema(df, esquema)
+    return df
+
+
+def cargar_siniestros(rango_anios=None, columnas=None, ruta=RUTA_DATASET):
+    '''
+    Carga los siniestros de un rango de años, leyendo sólo las particiones y columnas pedidas.
+
+    Parameters:
+        rango_anios (tuple, opcional): (año inicial, año final), ambos inclusive; por defecto, todos.
+        columnas (list, opcional): Columnas a leer; por defecto, todas. 'anio' puede pedirse
+            aunque no esté guardada en los archivos (se reconstruye desde la partición).
+        ruta (str): Carpeta raíz del dataset.
+
+    Returns:
+        pandas.DataFrame: Los siniestros filtrados, con los tipos de ESQUEMA.
+
+    Raises:
+        ValueError: Si los datos leídos no respetan ESQUEMA.
+    '''
+    return _cargar(ruta, rango_anios, columnas, ESQUEMA)
+
+
+def cargar_involucrados(rango_anios=None, columnas=None, ruta=RUTA_INVOLUCRADOS):
+    '''
+    Carga la tabla de involucrados (una fila por vehículo o peatón de cada siniestro).
+
+    Parameters:
+        rango_anios (tuple, opcional): (año inicial, año final), ambos inclusive; por defecto, todos.
+        columnas (list, opcional): Columnas a leer; por defecto, todas.
+        ruta (str): Carpeta raíz de la tabla.
+
+    Returns:
+        pandas.DataFrame: Los involucrados filtrados, con los tipos de ESQUEMA_INVOLUCRADOS; se
+        relacionan con los siniestros por 'id_feu'.
+
+    Raises:
+        ValueError: Si los datos leídos no respetan ESQUEMA_INVOLUCRADOS.
+    '''
+    return _cargar(ruta, rango_anios, columnas, ESQUEMA_INVOLUCRADOS)
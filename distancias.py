@@ -0,0 +1,158 @@
+## DISTANCIAS GEOGRÁFICAS VECTORIZADAS
+# Reemplaza las llamadas par a par a geopy.distance.geodesic por funciones NumPy que calculan
+# en lote. Hay dos métodos: 'haversine' (esfera de radio medio, error relativo de hasta ~0,6 %)
+# y 'vincenty' (elipsoide WGS-84, error por debajo del milímetro salvo en puntos casi
+# antípodas). Las matrices de distancia entre conjuntos grandes (todos los siniestros contra
+# todos los semáforos) se calculan por bloques para acotar la memoria.
+# indice_espacial.py devuelve con haversine la distancia de cada punto al nodo, semáforo o calle
+# que le asigna su KD-tree. La precisión frente a geopy se verifica con benchmarks/precision_distancias.py.
+
+# Importaciones
+import numpy as np
+
+# Constantes
+RADIO_TIERRA = 6371008.8  # metros, radio medio
+SEMIEJE_MAYOR = 6378137.0  # WGS-84
+ACHATAMIENTO = 1 / 298.257223563
+SEMIEJE_MENOR = SEMIEJE_MAYOR * (1 - ACHATAMIENTO)
+METODOS = ('haversine', 'vincenty')
+ELEMENTOS_POR_BLOQUE = 4_000_000  # distancias por bloque (32 MB en float64)
+MAX_ITERACIONES = 200
+TOLERANCIA = 1e-12
+
+
+# Funciones
+def haversine(lat1, lon1, lat2, lon2):
+    '''
+    Distancia de círculo máximo en metros. Los argumentos se combinan con broadcasting de NumPy.
+    '''
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _terminos_vincenty(lam, sen_u1, cos_u1, sen_u2, cos_u2):
+    # Términos de la esfera auxiliar para una diferencia de longitud lam
+    sen_lam, cos_lam = np.sin(lam), np.cos(lam)
+    sen_sigma = np.hypot(cos_u2 * sen_lam, cos_u1 * sen_u2 - sen_u1 * cos_u2 * cos_lam)
+    cos_sigma = sen_u1 * sen_u2 + cos_u1 * cos_u2 * cos_lam
+    sigma = np.arctan2(sen_sigma, cos_sigma)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sen_alfa = np.where(sen_sigma == 0, 0.0, cos_u1 * cos_u2 * sen_lam / sen_sigma)
+        cos2_alfa = 1 - sen_alfa ** 2
+        cos_2sigma_m = np.where(cos2_alfa == 0, 0.0, cos_sigma - 2 * sen_u1 * sen_u2 / cos2_alfa)
+    return sen_sigma, cos_sigma, sigma, sen_alfa, cos2_alfa, cos_2sigma_m
+
+
+def vincenty(lat1, lon1, lat2, lon2, max_iteraciones=MAX_ITERACIONES, tolerancia=TOLERANCIA):
+    '''
+    Distancia en metros sobre el elipsoide WGS-84 (fórmula inversa de Vincenty), con broadcasting.
+
+    Todos los pares iteran juntos; cada par deja de actualizarse cuando converge. Los pares casi
+    antípodas que no convergen en max_iteraciones conservan la última aproximación.
+    '''
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.radians(np.asarray(v, dtype=np.float64))
+                                                   for v in (lat1, lon1, lat2, lon2)))
+    f = ACHATAMIENTO
+    u1 = np.arctan((1 - f) * np.tan(lat1))
+    u2 = np.arctan((1 - f) * np.tan(lat2))
+    esfera = (np.sin(u1), np.cos(u1), np.sin(u2), np.cos(u2))
+    delta_lon = lon2 - lon1
+
+    lam = delta_lon.copy()
+    pendientes = np.ones(lam.shape, dtype=bool)
+    for _ in range(max_iteraciones):
+        sen_sigma, cos_sigma, sigma, sen_alfa, cos2_alfa, cos_2sigma_m = _terminos_vincenty(lam, *esfera)
+        c = f / 16 * cos2_alfa * (4 + f * (4 - 3 * cos2_alfa))
+        lam_nuevo = delta_lon + (1 - c) * f * sen_alfa * (
+            sigma + c * sen_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        convergidos = np.abs(lam_nuevo - lam) <= tolerancia
+        lam = np.where(pendientes, lam_nuevo, lam)
+        pendientes &= ~convergidos
+        if not pendientes.any():
+            break
+
+    sen_sigma, cos_sigma, sigma, _, cos2_alfa, cos_2sigma_m = _terminos_vincenty(lam, *esfera)
+    u2_cuad = cos2_alfa * (SEMIEJE_MAYOR ** 2 - SEMIEJE_MENOR ** 2) / SEMIEJE_MENOR ** 2
+    a = 1 + u2_cuad / 16384 * (4096 + u2_cuad * (-768 + u2_cuad * (320 - 175 * u2_cuad)))
+    b = u2_cuad / 1024 * (256 + u2_cuad * (-128 + u2_cuad * (74 - 47 * u2_cuad)))
+    delta_sigma = b * sen_sigma * (cos_2sigma_m + b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - b / 6 * cos_2sigma_m * (-3 + 4 * sen_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    return SEMIEJE_MENOR * a * (sigma - delta_sigma)
+
+
+def _funcion(metodo):
+    if metodo not in METODOS:
+        raise ValueError(f'Método de distancia desconocido: {metodo!r} (opciones: {", ".join(METODOS)})')
+    return haversine if metodo == 'haversine' else vincenty
+
+
+def distancia(lat1, lon1, lat2, lon2, metodo='haversine'):
+    '''
+    Distancia en metros par a par (con broadcasting) con el método indicado ('haversine' o 'vincenty').
+    '''
+    return _funcion(metodo)(lat1, lon1, lat2, lon2)
+
+
+def uno_a_muchos(lat, lon, lats, lons, metodo='haversine'):
+    '''
+    Distancias en metros de un punto a cada uno de los puntos (lats, lons).
+
+    Returns:
+        numpy.ndarray: Arreglo de forma (N,).
+    '''
+    return _funcion(metodo)(lat, lon, np.asarray(lats), np.asarray(lons))
+
+
+def muchos_a_muchos(lats_a, lons_a, lats_b, lons_b, metodo='haversine'):
+    '''
+    Matriz completa de distancias en metros entre los puntos A (filas) y B (columnas).
+
+    Returns:
+        numpy.ndarray: Arreglo de forma (N, M). Para N * M grande conviene matriz_por_bloques.
+    '''
+    lats_a, lons_a = np.asarray(lats_a, dtype=np.float64), np.asarray(lons_a, dtype=np.float64)
+    return _funcion(metodo)(lats_a[:, None], lons_a[:, None], np.asarray(lats_b)[None, :], np.asarray(lons_b)[None, :])
+
+
+def matriz_por_bloques(lats_a, lons_a, lats_b, lons_b, metodo='haversine', elementos_por_bloque=ELEMENTOS_POR_BLOQUE):
+    '''
+    Recorre la matriz de distancias A x B por bloques de filas, sin armarla completa.
+
+    Parameters:
+        elementos_por_bloque (int): Cantidad máxima de distancias por bloque (al menos una fila).
+
+    Yields:
+        tuple: (inicio, bloque), donde bloque es la matriz de las filas de A desde 'inicio'.
+    '''
+    lats_a, lons_a = np.asarray(lats_a, dtype=np.float64), np.asarray(lons_a, dtype=np.float64)
+    filas = max(1, elementos_por_bloque // max(len(lats_b), 1))
+    for inicio in range(0, len(lats_a), filas):
+        fin = inicio + filas
+        yield inicio, muchos_a_muchos(lats_a[inicio:fin], lons_a[inicio:fin], lats_b, lons_b, metodo)
+
+
+def mas_cercanos(lats_a, lons_a, lats_b, lons_b, metodo='haversine', elementos_por_bloque=ELEMENTOS_POR_BLOQUE):
+    '''
+    Para cada punto de A, el punto de B más cercano y su distancia, con memoria acotada por bloque.
+
+    Se usa, por ejemplo, para la distancia de cada siniestro al semáforo más cercano. Los puntos
+    de A con coordenadas nulas devuelven posición -1 y distancia infinita.
+
+    Returns:
+        tuple: (posiciones en B, distancias en metros), ambos de forma (N,).
+    '''
+    posiciones = np.full(len(lats_a), -1, dtype=np.int64)
+    distancias = np.full(len(lats_a), np.inf)
+    if len(lats_b) == 0:
+        return posiciones, distancias
+    for inicio, bloque in matriz_por_bloques(lats_a, lons_a, lats_b, lons_b, metodo, elementos_por_bloque):
+        bloque = np.where(np.isnan(bloque), np.inf, bloque)
+        fin = inicio + len(bloque)
+        posiciones[inicio:fin] = bloque.argmin(axis=1)
+        distancias[inicio:fin] = bloque[np.arange(len(bloque)), posiciones[inicio:fin]]
+    posiciones[~np.isfinite(distancias)] = -1
+    return posiciones, distancias
@@ -0,0 +1,523 @@
+## ETL INCREMENTAL DE SINIESTROS VIALES
+# Reemplaza a las notebooks ETL_siniestros<año>.ipynb, ETL_siniestrostotales.ipynb y ETL_completo.ipynb.
+# Cada año se procesa por separado (en procesos paralelos) a un parquet intermedio en
+# Datasets_limpios/etl/. Un manifiesto con el hash SHA-256 de cada archivo fuente permite
+# reprocesar sólo los años nuevos o modificados. Los pasos que dependen del histórico completo
+# (tipos de siniestro más frecuentes, medias y modas para los nulos) usan un resumen de cada año
+# guardado en el manifiesto, así que no hace falta volver a leer los años sin cambios: sólo se
+# reescriben las particiones (de datos.py) de los años reprocesados o de todos si cambiaron esas
+# estadísticas. Luego se arma siniestrosfinal.parquet desde el dataset particionado y se
+# regeneran los agregados que usa el dashboard. Los involucrados de cada año se guardan como
+# tabla propia (Datasets_limpios/involucrados/, una fila por involucrado) y en los siniestros
+# queda sólo la máscara de bits de los tipos presentes.
+#
+# Diferencias con los notebooks originales:
+#   - Los siniestros sin latitud ni longitud quedan con coordenadas nulas (ver imputar_coordenadas).
+#   - Los notebooks de 2020 y 2021 descartaban 'tipo_siniestro_unico' (con más del 98 % de los
+#     valores informados), así que todos los siniestros de esos años quedaban como colisiones
+#     'Asumido'. El ETL conserva el tipo del FEU: 'es_colision' es 'Asumido' sólo donde falta.
+#
+# Uso:
+#     python etl.py                 # procesa sólo lo nuevo o modificado
+#     python etl.py --forzar        # reprocesa todos los años
+#     python etl.py --procesos 4    # cantidad de procesos en paralelo
+
+# Importaciones
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import datos
+import ingesta
+import limpieza
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JupyterNotebooks'))
+import utils  # noqa: E402
+
+# Constantes
+DIRECTORIO_FUENTES = 'Datasets'
+DIRECTORIO_LIMPIOS = 'Datasets_limpios'
+DIRECTORIO_INTERMEDIOS = os.path.join(DIRECTORIO_LIMPIOS, 'etl')
+RUTA_MANIFIESTO = os.path.join(DIRECTORIO_INTERMEDIOS, 'manifest.json')
+RUTA_FINAL = os.path.join(DIRECTORIO_LIMPIOS, 'siniestrosfinal.parquet')
+RUTA_SEMAFOROS = os.path.join(DIRECTORIO_LIMPIOS, 'semaforos_lat_lng.csv')
+PATRON_SINIESTROS = 'feu-siniestros*.csv'
+PATRON_INVOLUCRADOS = 'feu-involucrado*.csv'
+PATRON_SEMAFOROS = 'bdgis_semaforos*.csv'
+VERSION_ETL = 5  # incrementar al cambiar procesar_anio para invalidar los intermedios guardados
+
+# Columnas de los CSV del FEU que se conservan (el resto tiene demasiados nulos o no se usa)
+COLUMNAS_SINIESTROS = [
+    'id_feu', 'siniestro_fecha', 'siniestro_hora', 'zona_ocurrencia', 'via_publica', 'nombre_via',
+    'altura_km', 'entre_calle_1', 'latitud', 'longitud', 'ilesos', 'heridos', 'fallecidos', 'vehiculos',
+    'peatones', 'tipo_siniestro_unico', 'cantidad_de_involucrados', 'material_de_la_calzada',
+    'estado_de_la_calzada', 'estado_fisico_ambiental', 'luminosidad', 'luz_artificial',
+    'estado_ambiental', 'visibilidad', 'semaforo',
+]
+RENOMBRAR = {
+    'estado_ambiental': 'condiciones_climaticas',
+    'siniestro_hora': 'hora',
+    'zona_ocurrencia': 'zona',
+    'via_publica': 'tipo_via',
+    'tipo_siniestro_unico': 'tipo_siniestro',
+    'cantidad_de_involucrados': 'vehiculos_involucrados',
+}
+COLUMNAS_FINALES = list(datos.ESQUEMA)
+# Columnas cuyos nulos se completan con la media (numéricas) o con la moda (texto) del histórico
+COLUMNAS_MEDIA = ['ilesos', 'heridos', 'fallecidos', 'peatones', 'vehiculos_involucrados']
+COLUMNAS_MODA = [
+    'zona', 'tipo_via', 'tipo_siniestro', 'material_de_la_calzada', 'estado_de_la_calzada', 'luz_artificial',
+    'condiciones_climaticas', 'semaforo', 'cruce', 'lugar_del_hecho', 'es_colision',
+]
+
+
+# Funciones
+def hash_archivo(ruta, bloque=1 << 20):
+    '''
+    Calcula el hash SHA-256 del contenido de un archivo, leyéndolo por bloques.
+    '''
+    huella = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for parte in iter(lambda: archivo.read(bloque), b''):
+            huella.update(parte)
+    return huella.hexdigest()
+
+
+def descubrir_fuentes(directorio=DIRECTORIO_FUENTES):
+    '''
+    Busca los CSV de siniestros e involucrados del FEU y los agrupa por año (tomado del nombre).
+
+    Returns:
+        dict: {anio: {'siniestros': ruta, 'involucrados': ruta o None}}.
+    '''
+    fuentes = {}
+    for clave, patron in (('siniestros', PATRON_SINIESTROS), ('involucrados', PATRON_INVOLUCRADOS)):
+        for ruta in sorted(glob.glob(os.path.join(directorio, patron))):
+            anio = re.search(r'(\d{4})', os.path.basename(ruta).split('feu-')[-1])
+            if anio:
+                fuentes.setdefault(int(anio.group(1)), {'siniestros': None, 'involucrados': None})[clave] = ruta
+    return {anio: rutas for anio, rutas in sorted(fuentes.items()) if rutas['siniestros']}
+
+
+def cargar_manifiesto(ruta=RUTA_MANIFIESTO):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_manifiesto(manifiesto, ruta=RUTA_MANIFIESTO):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+
+
+def resumir_calidad(reporte):
+    '''
+    Reduce el reporte de utils.perfilar a lo que se guarda en el manifiesto por cada carga.
+
+    Returns:
+        dict: {columna: {'nulos_%': ..., 'distintos': ... y, en las numéricas, 'atipicos': ...}}.
+    '''
+    calidad = {}
+    for fila in reporte.to_dict('records'):
+        resumen = {'nulos_%': fila['nulos_%']}
+        for clave in ('distintos', 'atipicos'):
+            if pd.notna(fila.get(clave)):
+                resumen[clave] = int(fila[clave])
+        calidad[fila['nombre_campo']] = resumen
+    return calidad
+
+
+def preparar_involucrados(df_inv, ids, anio):
+    '''
+    Arma la tabla de involucrados de un año con los tipos de datos.ESQUEMA_INVOLUCRADOS.
+
+    Parameters:
+        df_inv (pandas.DataFrame): Columnas 'id_feu', 'numero' y 'tipo_involucrado' del CSV del FEU.
+        ids (pandas.Series): id_feu de los siniestros del año; se descartan los involucrados de otros.
+        anio (int): Año de los siniestros.
+
+    Returns:
+        pandas.DataFrame: Un involucrado por fila (sin repetir id_feu y número).
+    '''
+    df_inv = df_inv[df_inv['id_feu'].isin(ids)].drop_duplicates(subset=['id_feu', 'numero'])
+    df_inv = df_inv.assign(anio=anio).astype({columna: tipo for columna, tipo in datos.ESQUEMA_INVOLUCRADOS.items()
+                                              if columna != 'tipo_involucrado'})
+    df_inv['tipo_involucrado'] = datos.categorizar_involucrados(df_inv['tipo_involucrado'])
+    return df_inv[list(datos.ESQUEMA_INVOLUCRADOS)].reset_index(drop=True)
+
+
+def mascaras_involucrados(involucrados):
+    '''
+    Calcula la máscara de bits de los tipos de involucrado de cada siniestro (ver datos.TIPOS_INVOLUCRADO).
+
+    Returns:
+        pandas.Series: Máscara int16 indexada por id_feu; los siniestros sin involucrados no figuran.
+    '''
+    codigos = involucrados['tipo_involucrado'].cat.codes.to_numpy(np.int16)
+    bits = pd.DataFrame({'id_feu': involucrados['id_feu'].to_numpy(), 'bit': np.left_shift(1, codigos, dtype=np.int16)})
+    return bits.drop_duplicates().groupby('id_feu')['bit'].sum().astype('int16')
+
+
+def imputar_coordenadas(df):
+    '''
+    Imputa con KNN la coordenada faltante de los siniestros que tienen la otra, con los vecinos del mismo año.
+
+    Los siniestros sin latitud ni longitud quedan con ambas nulas: sin ninguna coordenada no hay
+    vecinos de los cuales tomarlas, y el KNN los llevaba a todos al punto medio del histórico
+    (1.308 siniestros en -27.4806, -58.8146). El mapa de calor, los puntos calientes, el riesgo
+    por arista y el modelo de gravedad descartan las coordenadas nulas.
+    '''
+    parciales = (df['latitud'].isna() ^ df['longitud'].isna()).to_numpy()
+    if parciales.any() and df[['latitud', 'longitud']].notna().all(axis=1).any():
+        from sklearn.impute import KNNImputer
+
+        imputadas = KNNImputer(n_neighbors=3).fit_transform(df[['latitud', 'longitud']])
+        df.loc[parciales, ['latitud', 'longitud']] = np.round(imputadas[parciales], 7)
+    return df
+
+
+def resumir_anio(df):
+    '''
+    Resume los valores de un año que necesitan los pasos que dependen del histórico (ver estadisticas_globales).
+
+    Returns:
+        dict: 'medias' ({columna: [suma, cantidad de no nulos]} de COLUMNAS_MEDIA) y 'frecuencias'
+        ({columna: {valor: cantidad}} de COLUMNAS_MODA).
+    '''
+    return {
+        'medias': {columna: [float(df[columna].sum()), int(df[columna].count())] for columna in COLUMNAS_MEDIA},
+        'frecuencias': {columna: {str(valor): int(cantidad) for valor, cantidad in df[columna].value_counts().items()}
+                        for columna in COLUMNAS_MODA},
+    }
+
+
+def estadisticas_globales(resumenes):
+    '''
+    Combina los resúmenes de todos los años en las estadísticas del histórico que usa combinar_anios.
+
+    Parameters:
+        resumenes (list): Resúmenes de resumir_anio.
+
+    Returns:
+        dict: 'top_5' (tipos de siniestro más frecuentes), 'medias' y 'modas' por columna. Los
+        empates se resuelven por el valor, para que el resultado no dependa del orden de los años.
+    '''
+    medias, frecuencias = {}, {}
+    for columna in COLUMNAS_MEDIA:
+        suma = sum(resumen['medias'][columna][0] for resumen in resumenes)
+        cantidad = sum(resumen['medias'][columna][1] for resumen in resumenes)
+        medias[columna] = suma / cantidad if cantidad else 0.0
+    for columna in COLUMNAS_MODA:
+        conteo = frecuencias[columna] = {}
+        for resumen in resumenes:
+            for valor, cantidad in resumen['frecuencias'][columna].items():
+                conteo[valor] = conteo.get(valor, 0) + cantidad
+    ordenados = {columna: sorted(conteo, key=lambda valor: (-conteo[valor], valor)) for columna, conteo in frecuencias.items()}
+    return {
+        'top_5': ordenados['tipo_siniestro'][:5],
+        'medias': medias,
+        'modas': {columna: valores[0] for columna, valores in ordenados.items() if valores},
+    }
+
+
+def procesar_anio(anio, ruta_siniestros, ruta_involucrados, destino=DIRECTORIO_INTERMEDIOS):
+    '''
+    Limpia los siniestros de un año y arma la tabla de sus involucrados.
+
+    Aplica todas las transformaciones que sólo dependen de las filas del propio año; las que
+    necesitan el histórico completo (categorías más frecuentes y relleno de nulos) se hacen en
+    combinar_anios, con el resumen del año que devuelve esta función.
+
+    Parameters:
+        anio (int): Año a procesar.
+        ruta_siniestros (str): CSV de siniestros del FEU.
+        ruta_involucrados (str o None): CSV de involucrados del FEU.
+        destino (str): Carpeta de los parquet intermedios.
+
+    Returns:
+        tuple: (ruta del parquet intermedio de siniestros, ruta del de involucrados, dict de errores
+        de limpieza por columna, dict de calidad de los datos crudos según resumir_calidad, resumen
+        del año según resumir_anio).
+    '''
+    df = pd.read_csv(ruta_siniestros, dtype={'latitud': str, 'longitud': str, 'altura_km': str})
+    df = df.reindex(columns=COLUMNAS_SINIESTROS)
+    calidad = resumir_calidad(utils.perfilar(df))
+
+    # Coordenadas, fecha y hora (ver limpieza.py)
+    df, errores = limpieza.limpiar_siniestros(df)
+    df = imputar_coordenadas(df)
+    df['anio'] = df['siniestro_fecha'].dt.year
+    df['mes'] = df['siniestro_fecha'].dt.month
+    df['dia'] = df['siniestro_fecha'].dt.day
+
+    # Cruce y lugar del hecho
+    sin_cruce = df['entre_calle_1'].isnull()
+    df['cruce'] = np.where(sin_cruce, 'NO', 'SI')
+    df['lugar_del_hecho'] = np.where(
+        sin_cruce,
+        (df['nombre_via'] + ' ' + df['altura_km']).fillna(df['nombre_via']),
+        df['nombre_via'] + ' y ' + df['entre_calle_1'],
+    )
+
+    # Tipo de siniestro: los nulos se asumen colisión entre vehículos
+    df['es_colision'] = np.where(df['tipo_siniestro_unico'].isnull(), 'Asumido', 'Real')
+    df['tipo_siniestro_unico'] = df['tipo_siniestro_unico'].fillna('Colisión entre vehículos').replace({
+        'Choque': 'Colisión entre vehículos',
+        'S/D': 'Otro',
+    })
+
+    # Luz artificial y visibilidad: los nulos toman el valor más frecuente
+    df['luz_artificial'] = df['luz_artificial'].fillna('NO')
+    df['visibilidad'] = df['visibilidad'].fillna('Buena')
+
+    df = df.drop(columns=['estado_fisico_ambiental', 'luminosidad', 'visibilidad', 'nombre_via', 'altura_km',
+                          'entre_calle_1', 'siniestro_fecha', 'vehiculos'])
+    df = df.rename(columns=RENOMBRAR)
+
+    df = df.drop_duplicates(subset=['id_feu'], keep='first')
+
+    # Involucrados: tabla aparte y máscara de bits de los tipos presentes en cada siniestro
+    columnas_involucrados = ['id_feu', 'numero', 'tipo_involucrado']
+    if ruta_involucrados:
+        df_inv = pd.read_csv(ruta_involucrados, usecols=columnas_involucrados)
+    else:
+        df_inv = pd.DataFrame(columns=columnas_involucrados)
+    involucrados = preparar_involucrados(df_inv, df['id_feu'], anio)
+    df['mascara_involucrados'] = df['id_feu'].map(mascaras_involucrados(involucrados)).fillna(0).astype('int16')
+
+    os.makedirs(destino, exist_ok=True)
+    ruta_salida = os.path.join(destino, f'siniestros{anio}.parquet')
+    ruta_involucrados_salida = os.path.join(destino, f'involucrados{anio}.parquet')
+    df.to_parquet(ruta_salida, index=False)
+    involucrados.to_parquet(ruta_involucrados_salida, index=False)
+    return ruta_salida, ruta_involucrados_salida, errores, calidad, resumir_anio(df)
+
+
+def combinar_anios(rutas_intermedias, estadisticas):
+    '''
+    Arma el dataset final de algunos años a partir de sus parquet intermedios.
+
+    Incluye los pasos que dependen del histórico completo, con las estadísticas de todos los
+    años: agrupación de los tipos de siniestro fuera del top 5 en 'Otros' y relleno de nulos con
+    la media (numéricas) o la moda (categóricas).
+
+    Parameters:
+        rutas_intermedias (list): Parquet intermedios de los años a combinar.
+        estadisticas (dict): Estadísticas del histórico (ver estadisticas_globales).
+
+    Returns:
+        pandas.DataFrame: El dataset final de esos años con COLUMNAS_FINALES y los tipos de datos.ESQUEMA.
+    '''
+    df = pd.concat([pd.read_parquet(ruta) for ruta in rutas_intermedias], ignore_index=True)
+
+    # Tipo de siniestro para gráficos: top 5 más frecuentes y el resto como 'Otros'
+    df['tipo_siniestro_para_grafico'] = df['tipo_siniestro'].where(df['tipo_siniestro'].isin(estadisticas['top_5']), 'Otros')
+
+    # Completar nulos: media en numéricas, moda en categóricas (las coordenadas quedan nulas)
+    for columna in COLUMNAS_MEDIA:
+        df[columna] = df[columna].fillna(estadisticas['medias'][columna])
+    for columna, moda in estadisticas['modas'].items():
+        df[columna] = df[columna].fillna(moda)
+
+    return datos.aplicar_esquema(df[COLUMNAS_FINALES])
+
+
+def combinar_involucrados(rutas_intermedias, ids):
+    '''
+    Combina las tablas de involucrados de varios años, conservando sólo los siniestros del dataset final.
+    '''
+    involucrados = pd.concat([pd.read_parquet(ruta) for ruta in rutas_intermedias], ignore_index=True)
+    involucrados = involucrados[involucrados['id_feu'].isin(ids)].reset_index(drop=True)
+    involucrados['tipo_involucrado'] = datos.categorizar_involucrados(involucrados['tipo_involucrado'])
+    return involucrados
+
+
+def columna_vehiculo(involucrados, ids):
+    '''
+    Arma la columna 'vehiculo' de las versiones anteriores del ETL a partir de la tabla de involucrados.
+
+    Es el texto con los tipos de involucrado de cada siniestro separados por ', ', en el orden
+    del FEU ('' si no tiene involucrados). Se conserva sólo en siniestrosfinal.parquet, para los
+    notebooks que todavía la leen, durante la transición a 'mascara_involucrados' y a la tabla
+    de involucrados; no forma parte de datos.ESQUEMA ni del dataset particionado.
+
+    Parameters:
+        involucrados (pandas.DataFrame): Tabla de combinar_involucrados.
+        ids (pandas.Series): id_feu de los siniestros, en el orden del dataset final.
+
+    Returns:
+        numpy.ndarray: Un texto por siniestro, alineado con ids.
+    '''
+    # Una columna por posición del involucrado dentro del siniestro, que se concatenan en pocas operaciones
+    posicion = involucrados.groupby('id_feu', sort=False).cumcount()
+    por_posicion = pd.DataFrame({'id_feu': involucrados['id_feu'], 'posicion': posicion,
+                                 'tipo': involucrados['tipo_involucrado'].astype(str)}).pivot(
+        index='id_feu', columns='posicion', values='tipo').reindex(ids.to_numpy())
+    vehiculo = np.full(len(ids), '', dtype=object)
+    for columna in por_posicion.columns:
+        tipos = por_posicion[columna]
+        separador = ', ' if columna else ''
+        vehiculo = np.where(tipos.notna(), vehiculo + separador + tipos.fillna('').to_numpy(dtype=object), vehiculo)
+    return vehiculo
+
+
+def procesar_semaforos(directorio=DIRECTORIO_FUENTES, destino=RUTA_SEMAFOROS):
+    '''
+    Extrae latitud y longitud del relevamiento de semáforos (igual que ETL_siniestros2018.ipynb).
+    '''
+    rutas = sorted(glob.glob(os.path.join(directorio, PATRON_SEMAFOROS)))
+    if not rutas:
+        return None
+    pd.read_csv(rutas[-1])[['lat', 'lng']].to_csv(destino)
+    return rutas[-1]
+
+
+def regenerar_derivados(df_final):
+    '''
+    Recalcula los agregados del dashboard (cubo, mapa de calor, riesgo por arista y teselas de la red) a partir del dataset final.
+    '''
+    import cubo
+    import mapa_calor
+
+    cubo.guardar_cubo(cubo.construir_cubo(df_final))
+    mapa_calor.guardar_mapa_calor(mapa_calor.agregar_mapa_calor(df_final))
+
+    import red_vial
+    if os.path.exists(os.path.join(red_vial.DIRECTORIO_RED, 'meta.json')):
+        import riesgo_vial
+
+        red = red_vial.cargar_red()
+        riesgo = riesgo_vial.calcular_riesgo(red, df_final)
+        semaforos = riesgo_vial.contar_semaforos(red, pd.read_csv(RUTA_SEMAFOROS))
+        riesgo_vial.guardar_riesgo(riesgo, semaforos)
+
+        import teselas
+        teselas.actualizar_teselas()
+
+
+def particiones_existentes(anio):
+    '''
+    Indica si el año ya tiene sus particiones de siniestros y de involucrados en el dataset.
+    '''
+    particion = f'{datos.COLUMNA_PARTICION}={anio}'
+    return all(os.path.isdir(os.path.join(ruta, particion)) for ruta in (datos.RUTA_DATASET, datos.RUTA_INVOLUCRADOS))
+
+
+def ejecutar(forzar=False, procesos=None, derivados=True):
+    '''
+    Ejecuta el ETL completo de forma incremental.
+
+    Parameters:
+        forzar (bool): Si es True, reprocesa y reescribe todos los años aunque no hayan cambiado.
+        procesos (int, opcional): Cantidad de procesos paralelos; por defecto, uno por núcleo.
+        derivados (bool): Si es True, regenera los agregados del dashboard al final.
+
+    Returns:
+        dict: Resumen con los años procesados, los reutilizados, los años cuyas particiones se
+        reescribieron, los errores de limpieza de los años procesados y la cantidad de filas
+        finales. La calidad de cada carga queda en el manifiesto.
+    '''
+    fuentes = descubrir_fuentes()
+    manifiesto = cargar_manifiesto()
+    if manifiesto.get('version_etl') != VERSION_ETL:
+        forzar = True
+        manifiesto = {'version_etl': VERSION_ETL}
+
+    pendientes = {}
+    for anio, rutas in fuentes.items():
+        hashes = {clave: hash_archivo(ruta) if ruta else None for clave, ruta in rutas.items()}
+        registro = manifiesto.get(str(anio), {})
+        salidas = [registro.get('salida'), registro.get('involucrados')]
+        if forzar or registro.get('hashes') != hashes or not all(salidas) or not all(map(os.path.exists, salidas)):
+            pendientes[anio] = hashes
+
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            futuros = {
+                anio: ejecutor.submit(procesar_anio, anio, fuentes[anio]['siniestros'], fuentes[anio]['involucrados'])
+                for anio in pendientes
+            }
+            for anio, futuro in futuros.items():
+                salida, involucrados, errores, calidad, resumen = futuro.result()
+                manifiesto[str(anio)] = {
+                    'hashes': pendientes[anio], 'salida': salida, 'involucrados': involucrados,
+                    'errores': errores, 'calidad': calidad, 'resumen': resumen,
+                }
+
+    semaforos_anteriores = manifiesto.get('semaforos', {}).get('hashes')
+    ruta_semaforos = procesar_semaforos()
+    if ruta_semaforos:
+        manifiesto['semaforos'] = {'hashes': {'semaforos': hash_archivo(ruta_semaforos)}, 'salida': RUTA_SEMAFOROS}
+
+    # Se descartan del manifiesto los años cuyas fuentes ya no existen
+    for anio in [clave for clave in manifiesto if clave.isdigit() and int(clave) not in fuentes]:
+        del manifiesto[anio]
+
+    # Un año se reescribe si se reprocesó, si cambiaron las estadísticas del histórico con las que
+    # se escribió o si faltan sus particiones; los demás quedan como están (con sus deltas de ingesta.py)
+    estadisticas = estadisticas_globales([manifiesto[str(anio)]['resumen'] for anio in fuentes])
+    huella = hashlib.sha256(json.dumps(estadisticas, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    reescribir = [anio for anio in fuentes if forzar or anio in pendientes
+                  or manifiesto[str(anio)].get('estadisticas') != huella or not particiones_existentes(anio)]
+
+    if reescribir:
+        df_anios = combinar_anios([manifiesto[str(anio)]['salida'] for anio in reescribir], estadisticas)
+        involucrados_anios = combinar_involucrados([manifiesto[str(anio)]['involucrados'] for anio in reescribir],
+                                                   df_anios['id_feu'])
+        datos.guardar_particionado(df_anios)
+        datos.guardar_particionado(involucrados_anios, datos.RUTA_INVOLUCRADOS)
+        for anio in reescribir:
+            manifiesto[str(anio)]['estadisticas'] = huella
+
+    cambios = bool(reescribir) or manifiesto.get('semaforos', {}).get('hashes') != semaforos_anteriores
+    if cambios or not os.path.exists(RUTA_FINAL):
+        df_final = datos.cargar_siniestros()
+        involucrados = datos.cargar_involucrados()
+        involucrados = involucrados[involucrados['id_feu'].isin(df_final['id_feu'])]
+        vehiculo = pd.Categorical(columna_vehiculo(involucrados, df_final['id_feu']))
+        df_final.assign(vehiculo=vehiculo).to_parquet(RUTA_FINAL, index=False)
+        if derivados:
+            regenerar_derivados(df_final)
+        # Las particiones reescritas reemplazan a los deltas de ingesta.py: los procesos del dashboard recargan todo
+        ingesta.registrar_reconstruccion()
+        filas, filas_involucrados = len(df_final), len(involucrados)
+    else:
+        filas = len(datos.cargar_siniestros(columnas=['id_feu']))
+        filas_involucrados = len(datos.cargar_involucrados(columnas=['id_feu']))
+    guardar_manifiesto(manifiesto)
+
+    return {
+        'procesados': sorted(pendientes),
+        'reutilizados': sorted(set(fuentes) - set(pendientes)),
+        'reescritos': reescribir,
+        'errores': {anio: manifiesto[str(anio)]['errores'] for anio in sorted(pendientes)},
+        'filas': filas,
+        'involucrados': filas_involucrados,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ETL incremental de siniestros viales del FEU.')
+    parser.add_argument('--forzar', action='store_true', help='Reprocesar todos los años')
+    parser.add_argument('--procesos', type=int, default=None, help='Cantidad de procesos paralelos')
+    parser.add_argument('--sin-derivados', action='store_true', help='No regenerar cubo, mapa de calor ni riesgo')
+    args = parser.parse_args()
+
+    resumen = ejecutar(forzar=args.forzar, procesos=args.procesos, derivados=not args.sin_derivados)
+    print(f"Años procesados: {resumen['procesados'] or 'ninguno'}; reutilizados: {resumen['reutilizados'] or 'ninguno'}; "
+          f"particiones reescritas: {resumen['reescritos'] or 'ninguna'}")
+    for anio, errores in resumen['errores'].items():
+        detalle = ', '.join(f'{columna}: {sum(conteos.values())}' for columna, conteos in errores.items() if sum(conteos.values()))
+        print(f'  {anio} - valores descartados por limpieza: {detalle or "ninguno"}')
+    print(f"Dataset final guardado en {RUTA_FINAL}: {resumen['filas']} siniestros")
+    print(f"Involucrados guardados en {datos.RUTA_INVOLUCRADOS}: {resumen['involucrados']} filas")
@@ -0,0 +1,194 @@
+## ÍNDICES ESPACIALES PARA ASIGNAR PUNTOS A LA RED VIAL
+# KD-trees (scipy.spatial.cKDTree) sobre coordenadas proyectadas a metros. Se construyen una vez
+# junto con la red y resuelven en lote, con costo O(log n) por punto, la asignación de puntos
+# de inicio/fin, siniestros y semáforos al nodo o a la calle más cercana.
+#
+# La proyección sólo elige el vecino (o la calle) más cercano; la distancia que se devuelve es la
+# de haversine (ver distancias.py) entre el punto y ese vecino o el punto más cercano de la calle,
+# que no pierde precisión al alejarse de LATITUD_REFERENCIA como la proyección equirectangular.
+
+# Importaciones
+import numpy as np
+from scipy.spatial import cKDTree
+
+import distancias
+
+# Constantes
+METROS_POR_GRADO = 111320.0
+LATITUD_REFERENCIA = -27.4668  # Corrientes capital
+PASO_MUESTREO = 20.0  # metros entre puntos de muestreo de cada arista
+
+
+# Funciones
+def proyectar(lat, lon, lat_referencia=LATITUD_REFERENCIA):
+    '''
+    Proyecta coordenadas geográficas a metros con la aproximación equirectangular local.
+
+    Returns:
+        tuple: (x, y) en metros, como arreglos float64.
+    '''
+    coseno = np.cos(np.radians(lat_referencia))
+    x = np.asarray(lon, dtype=np.float64) * METROS_POR_GRADO * coseno
+    y = np.asarray(lat, dtype=np.float64) * METROS_POR_GRADO
+    return x, y
+
+
+def desproyectar(x, y, lat_referencia=LATITUD_REFERENCIA):
+    '''
+    Inversa de proyectar: convierte metros de la proyección local a (latitud, longitud).
+    '''
+    coseno = np.cos(np.radians(lat_referencia))
+    return np.asarray(y, dtype=np.float64) / METROS_POR_GRADO, np.asarray(x, dtype=np.float64) / (METROS_POR_GRADO * coseno)
+
+
+def punto_en_segmentos(px, py, ax, ay, bx, by):
+    '''
+    Punto más cercano a p sobre el segmento a-b (vectorizado, elemento a elemento), en metros proyectados.
+
+    Returns:
+        tuple: (x, y) del punto más cercano.
+    '''
+    dx, dy = bx - ax, by - ay
+    largo2 = np.maximum(dx * dx + dy * dy, 1e-9)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / largo2, 0.0, 1.0)
+    return ax + t * dx, ay + t * dy
+
+
+def distancia_a_segmentos(px, py, ax, ay, bx, by):
+    '''
+    Distancia (vectorizada, elemento a elemento) del punto p al segmento a-b, en metros proyectados.
+    '''
+    cx, cy = punto_en_segmentos(px, py, ax, ay, bx, by)
+    return np.hypot(cx - px, cy - py)
+
+
+# Clases
+class IndicePuntos:
+    '''
+    Índice de vecino más cercano sobre un conjunto fijo de puntos (nodos, semáforos, etc.).
+
+    Parameters:
+        lat, lon (array-like): Coordenadas de los puntos indexados.
+    '''
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        x, y = proyectar(self.lat, self.lon)
+        self.arbol = cKDTree(np.column_stack([x, y]))
+
+    def __len__(self):
+        return self.arbol.n
+
+    def consultar(self, lat, lon, k=1, distancia_maxima=np.inf):
+        '''
+        Busca en lote los k puntos indexados más cercanos a cada punto consultado.
+
+        Parameters:
+            lat, lon (array-like): Coordenadas de los N puntos a asignar.
+            k (int): Cantidad de vecinos por punto.
+            distancia_maxima (float): Radio en metros; los vecinos más lejanos devuelven posición len(self).
+
+        Returns:
+            tuple: (posiciones, distancias de haversine en metros), de forma (N,) si k == 1 o (N, k)
+            en otro caso. Los puntos con coordenadas nulas devuelven posición len(self) y distancia infinita.
+        '''
+        lat, lon = np.atleast_1d(np.asarray(lat, dtype=np.float64)), np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        x, y = proyectar(lat, lon)
+        validos = np.isfinite(x) & np.isfinite(y)
+        forma = (len(x),) if k == 1 else (len(x), k)
+        posiciones = np.full(forma, len(self), dtype=np.int64)
+        metros = np.full(forma, np.inf)
+        metros[validos], posiciones[validos] = self.arbol.query(
+            np.column_stack([x[validos], y[validos]]), k=k, distance_upper_bound=distancia_maxima
+        )
+        encontrados = posiciones < len(self)
+        if k != 1:
+            lat, lon = np.broadcast_to(lat[:, None], forma), np.broadcast_to(lon[:, None], forma)
+        metros[encontrados] = distancias.haversine(lat[encontrados], lon[encontrados],
+                                                   self.lat[posiciones[encontrados]], self.lon[posiciones[encontrados]])
+        return posiciones, metros
+
+    def en_radio(self, lat, lon, radio):
+        '''
+        Devuelve, para cada punto consultado, la lista de posiciones indexadas a menos de 'radio' metros.
+        '''
+        x, y = proyectar(np.atleast_1d(lat), np.atleast_1d(lon))
+        return self.arbol.query_ball_point(np.column_stack([x, y]), r=radio)
+
+
+class IndiceAristas:
+    '''
+    Índice de arista más cercana sobre los segmentos rectos origen-destino de una red.
+
+    Cada segmento se muestrea cada PASO_MUESTREO metros y las muestras se guardan en un KD-tree.
+    Una consulta toma la muestra más cercana (distancia s) y luego evalúa la distancia exacta
+    a todos los segmentos con alguna muestra a menos de s + paso / 2, que incluyen con certeza
+    al segmento más cercano.
+
+    Parameters:
+        lat_a, lon_a, lat_b, lon_b (array-like): Extremos de cada segmento.
+        paso (float): Distancia máxima en metros entre muestras consecutivas de un segmento.
+    '''
+
+    def __init__(self, lat_a, lon_a, lat_b, lon_b, paso=PASO_MUESTREO):
+        self.ax, self.ay = proyectar(lat_a, lon_a)
+        self.bx, self.by = proyectar(lat_b, lon_b)
+        self.paso = paso
+
+        largo = np.hypot(self.bx - self.ax, self.by - self.ay)
+        muestras = np.maximum(np.ceil(largo / paso).astype(np.int64), 1) + 1
+        self.segmento = np.repeat(np.arange(len(largo)), muestras)
+        inicio = np.repeat(np.cumsum(muestras) - muestras, muestras)
+        t = (np.arange(len(self.segmento)) - inicio) / (muestras[self.segmento] - 1)
+        x = self.ax[self.segmento] + t * (self.bx - self.ax)[self.segmento]
+        y = self.ay[self.segmento] + t * (self.by - self.ay)[self.segmento]
+        self.arbol = cKDTree(np.column_stack([x, y]))
+
+    def __len__(self):
+        return len(self.ax)
+
+    def consultar(self, lat, lon):
+        '''
+        Busca en lote el segmento más cercano a cada punto.
+
+        Parameters:
+            lat, lon (array-like): Coordenadas de los N puntos a asignar.
+
+        Returns:
+            tuple: (posiciones de los segmentos, distancias de haversine en metros al punto más
+            cercano de cada segmento), ambos de forma (N,). Los puntos con coordenadas nulas
+            devuelven posición len(self) y distancia infinita.
+        '''
+        lat, lon = np.atleast_1d(np.asarray(lat, dtype=np.float64)), np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        px, py = proyectar(lat, lon)
+        validos = np.isfinite(px) & np.isfinite(py)
+        posiciones = np.full(len(px), len(self), dtype=np.int64)
+        metros = np.full(len(px), np.inf)
+        if validos.any():
+            segmentos = self._consultar_proyectados(px[validos], py[validos])
+            posiciones[validos] = segmentos
+            cx, cy = punto_en_segmentos(px[validos], py[validos], self.ax[segmentos], self.ay[segmentos],
+                                        self.bx[segmentos], self.by[segmentos])
+            metros[validos] = distancias.haversine(lat[validos], lon[validos], *desproyectar(cx, cy))
+        return posiciones, metros
+
+    def _consultar_proyectados(self, px, py):
+        # Posición del segmento más cercano a cada punto proyectado
+        puntos = np.column_stack([px, py])
+        cercana, _ = self.arbol.query(puntos, k=1)
+        radio = cercana + self.paso / 2 + 1e-6
+        candidatas = self.arbol.query_ball_point(puntos, r=radio)
+
+        # Aplanar (punto, muestra candidata) y evaluar la distancia exacta a su segmento
+        cantidades = np.fromiter((len(c) for c in candidatas), dtype=np.int64, count=len(candidatas))
+        punto = np.repeat(np.arange(len(puntos)), cantidades)
+        segmento = self.segmento[np.concatenate(candidatas).astype(np.int64)]
+        distancia = distancia_a_segmentos(
+            px[punto], py[punto], self.ax[segmento], self.ay[segmento], self.bx[segmento], self.by[segmento]
+        )
+
+        # Mínimo por punto: ordenar por (punto, distancia) y tomar el primero de cada grupo
+        orden = np.lexsort((distancia, punto))
+        primeros = orden[np.r_[0, np.cumsum(cantidades)[:-1]]]
+        return segmento[primeros]
@@ -0,0 +1,317 @@
+## INGESTA INCREMENTAL DE SINIESTROS NUEVOS
+# Agrega lotes de siniestros nuevos (registros del FEU que llegan entre ejecuciones del ETL) sin
+# reescribir siniestrosfinal.parquet ni recalcular los agregados desde cero:
+#   1. el lote se valida contra el esquema final (datos.ESQUEMA) y se descartan los id_feu ya cargados;
+#   2. se escribe como archivos delta dentro de las particiones por año del dataset de datos.py,
+#      que cargar_siniestros lee junto con el resto;
+#   3. el cubo (conteos por año, mes, hora, ...) y las grillas del mapa de calor se actualizan
+#      sumando los agregados del lote a los guardados (los agregados son sumas, así que no hace
+#      falta releer los siniestros anteriores);
+#   4. por último se incrementa la versión en version_datos.json.
+# El dashboard consulta esa versión en cada ejecución: al cambiar, vuelve a abrir el cubo y el
+# mapa de calor y suma a sus celdas de puntos calientes sólo los deltas nuevos (ver leer_deltas).
+# servicio.py la consulta en cada pedido de agregados y vuelve a abrir el cubo de la misma forma.
+#
+# etl.py reemplaza completas las particiones de los años que reprocesa (deltas incluidos, ya que
+# las fuentes del FEU los contienen; los demás años conservan sus deltas) y registra una nueva
+# base: los procesos que vean una base posterior a su versión recargan todo.
+#
+# Límites:
+#   - el riesgo por arista de la red vial no se actualiza: sus archivos están abiertos con
+#     memory-map por el dashboard. Las rutas seguras no ven los lotes nuevos hasta ejecutar
+#     python riesgo_vial.py (que lee el dataset con los deltas) o el ETL;
+#   - la tabla de involucrados tampoco: los lotes traen sólo 'mascara_involucrados', así que el
+#     filtro por tipo de involucrado funciona pero no hay filas por vehículo de esos siniestros;
+#   - la ganancia frente a reconstruir es modesta con lotes chicos (en bench_ingesta.py, con
+#     500 000 siniestros, ~0.7 s por lote frente a 0.9-1.2 s de reconstruir): buscar los id_feu
+#     ya cargados y reescribir el cubo y el mapa de calor son costos fijos. Lo que se evita es
+#     reescribir siniestrosfinal.parquet y que el dashboard vuelva a leer todos los siniestros.
+# Se admite un solo proceso de ingesta a la vez.
+#
+# Uso:
+#     python ingesta.py nuevos.parquet
+#     python ingesta.py nuevos.csv
+
+# Importaciones
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import cubo
+import datos
+import mapa_calor
+
+# Constantes
+RUTA_VERSION = 'Datasets_limpios/version_datos.json'
+RANGOS = {  # valores admitidos por columna (los nulos se admiten donde el esquema lo permite)
+    'latitud': (-90, 90),
+    'longitud': (-180, 180),
+    'hora_num': (0, 23),
+    'mes': (1, 12),
+    'dia': (1, 31),
+    'anio': (1900, 2100),
+    'ilesos': (0, None),
+    'heridos': (0, None),
+    'fallecidos': (0, None),
+    'peatones': (0, None),
+    'vehiculos_involucrados': (0, None),
+    'mascara_involucrados': (0, 2 ** len(datos.TIPOS_INVOLUCRADO) - 1),
+}
+CLAVES_MAPA_CALOR = ['nivel', 'anio', 'celda_x', 'celda_y']
+
+
+# Funciones
+def leer_version(ruta=RUTA_VERSION):
+    '''
+    Devuelve el estado de version_datos.json: 'version', 'base' (versión de la última
+    reconstrucción completa) y 'deltas' (lotes agregados desde entonces).
+    '''
+    if not os.path.exists(ruta):
+        return {'version': 0, 'base': 0, 'deltas': []}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def version_datos(ruta=RUTA_VERSION):
+    '''
+    Devuelve la versión actual de los datos (0 si nunca se ingirió un lote).
+    '''
+    return leer_version(ruta)['version']
+
+
+def _escribir_atomico(ruta, escribir):
+    # Se escribe en un temporal y se reemplaza: los procesos que leen ven el archivo viejo o el nuevo
+    temporal = f'{ruta}.tmp'
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _guardar_version(estado, ruta):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+
+    def escribir(temporal):
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(estado, archivo, indent=2)
+    _escribir_atomico(ruta, escribir)
+
+
+def registrar_reconstruccion(ruta=RUTA_VERSION):
+    '''
+    Registra que el dataset y sus agregados se regeneraron completos (lo llama etl.py).
+
+    Returns:
+        int: La nueva versión, que pasa a ser la base.
+    '''
+    estado = leer_version(ruta)
+    version = estado['version'] + 1
+    _guardar_version({'version': version, 'base': version, 'deltas': []}, ruta)
+    return version
+
+
+def validar_lote(df):
+    '''
+    Verifica un lote de siniestros contra el esquema final y lo convierte a sus tipos.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros nuevos con (al menos) las columnas de datos.ESQUEMA.
+
+    Returns:
+        pandas.DataFrame: El lote con las columnas y tipos de datos.ESQUEMA.
+
+    Raises:
+        ValueError: Si faltan columnas, algún valor no se puede convertir a su tipo, hay id_feu
+            nulos o repetidos, alguna hora no es un datetime.time o algún valor está fuera de RANGOS.
+    '''
+    faltantes = [columna for columna in datos.ESQUEMA if columna not in df.columns]
+    if faltantes:
+        raise ValueError(f'Faltan columnas del esquema final: {", ".join(faltantes)}')
+    try:
+        df = datos.aplicar_esquema(df)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f'El lote no respeta el esquema final: {error}') from None
+
+    if df['id_feu'].isna().any() or df['id_feu'].duplicated().any():
+        raise ValueError('El lote tiene id_feu nulos o repetidos')
+    horas = df['hora'].dropna()
+    if not horas.map(lambda hora: isinstance(hora, datetime.time)).all():
+        raise ValueError("La columna 'hora' debe contener datetime.time o nulos")
+
+    errores = []
+    for columna, (minimo, maximo) in RANGOS.items():
+        valores = df[columna].dropna().astype('float64')
+        fuera = ((valores < minimo) if minimo is not None else False) | ((valores > maximo) if maximo is not None else False)
+        if np.any(fuera):
+            errores.append(f'{columna}: {int(np.sum(fuera))} valores fuera de [{minimo}, {maximo}]')
+    if errores:
+        raise ValueError('Valores fuera de rango en el lote: ' + '; '.join(errores))
+    return df
+
+
+def _ids_existentes(anios, ruta_dataset):
+    if not os.path.isdir(ruta_dataset):
+        return set()
+    existentes = datos.cargar_siniestros((min(anios), max(anios)), ['id_feu'], ruta_dataset)
+    return set(existentes['id_feu'].tolist())
+
+
+def sumar_agregados(anterior, nuevo, claves):
+    '''
+    Suma un agregado nuevo (cubo, grillas del mapa de calor o celdas de puntos calientes) a uno anterior.
+
+    Las filas del anterior cuyas claves aparecen en el nuevo se actualizan sumando sus medidas y
+    las claves nuevas se agregan al final: el costo depende del tamaño del lote y no hace falta
+    reagrupar el agregado completo. El resultado conserva las columnas y los tipos del anterior;
+    las categorías que sólo aparecen en el nuevo se agregan a las existentes.
+
+    Parameters:
+        anterior (pandas.DataFrame): Agregado guardado, una fila por combinación de claves.
+        nuevo (pandas.DataFrame): Agregado del lote, con las mismas columnas.
+        claves (list): Columnas que identifican cada fila; el resto son medidas que se suman.
+
+    Returns:
+        pandas.DataFrame: El agregado combinado.
+    '''
+    columnas = list(anterior.columns)
+    medidas = [columna for columna in columnas if columna not in claves]
+    nuevo = nuevo.groupby(claves, dropna=False, observed=True)[medidas].sum().reset_index()
+    posiciones = pd.MultiIndex.from_frame(anterior[claves]).get_indexer(pd.MultiIndex.from_frame(nuevo[claves]))
+    existentes = posiciones >= 0
+
+    combinado = anterior.copy()
+    for medida in medidas:
+        valores = combinado[medida].to_numpy(copy=True)
+        valores[posiciones[existentes]] += nuevo.loc[existentes, medida].to_numpy(dtype=valores.dtype)
+        combinado[medida] = valores
+    agregadas = nuevo.loc[~existentes, columnas]
+
+    for columna, tipo in anterior.dtypes.items():
+        if isinstance(tipo, pd.CategoricalDtype):
+            tipo = pd.CategoricalDtype(tipo.categories.append(
+                pd.Index(agregadas[columna].dropna().unique()).difference(tipo.categories)))
+            combinado[columna] = combinado[columna].astype(tipo)
+            agregadas = agregadas.astype({columna: tipo})
+    return pd.concat([combinado, agregadas.astype(combinado.dtypes.to_dict())], ignore_index=True)
+
+
+def _escribir_delta(df, version, ruta_dataset):
+    archivos = []
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        root_path=ruta_dataset,
+        partition_cols=[datos.COLUMNA_PARTICION],
+        basename_template=f'delta-{version:06d}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        row_group_size=datos.FILAS_POR_GRUPO,
+        write_statistics=True,
+        file_visitor=lambda archivo: archivos.append(os.path.relpath(archivo.path, ruta_dataset)),
+    )
+    return sorted(archivos)
+
+
+def ingerir(df, ruta_dataset=datos.RUTA_DATASET, ruta_cubo=cubo.RUTA_CUBO,
+            ruta_mapa_calor=mapa_calor.RUTA_MAPA_CALOR, ruta_version=RUTA_VERSION):
+    '''
+    Agrega un lote de siniestros nuevos al dataset y actualiza los agregados derivados.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros nuevos en el esquema final (ver validar_lote).
+        ruta_dataset (str): Carpeta raíz del dataset particionado.
+        ruta_cubo (str): Parquet del cubo de agregados.
+        ruta_mapa_calor (str): Parquet de las grillas del mapa de calor.
+        ruta_version (str): Archivo de versión que consultan los procesos del dashboard.
+
+    Returns:
+        dict: 'version' resultante, 'filas' agregadas, 'duplicados' descartados y 'archivos' delta escritos.
+    '''
+    lote = validar_lote(df)
+    if lote.empty:
+        return {'version': version_datos(ruta_version), 'filas': 0, 'duplicados': 0, 'archivos': []}
+    existentes = _ids_existentes(lote['anio'].unique().tolist(), ruta_dataset)
+    nuevos = lote[~lote['id_feu'].isin(existentes)]
+    resumen = {'filas': len(nuevos), 'duplicados': len(lote) - len(nuevos), 'archivos': []}
+
+    estado = leer_version(ruta_version)
+    if nuevos.empty:
+        return {'version': estado['version'], **resumen}
+    version = estado['version'] + 1
+
+    resumen['archivos'] = _escribir_delta(nuevos, version, ruta_dataset)
+
+    cubo_lote = cubo.construir_cubo(nuevos)
+    cubo_actual = cubo.cargar_cubo(ruta_cubo) if os.path.exists(ruta_cubo) else None
+    cubo_nuevo = cubo_lote if cubo_actual is None else sumar_agregados(cubo_actual, cubo_lote, cubo.DIMENSIONES)
+    _escribir_atomico(ruta_cubo, lambda temporal: cubo.guardar_cubo(cubo_nuevo, temporal))
+
+    celdas_lote = mapa_calor.agregar_mapa_calor(nuevos)
+    celdas_actuales = mapa_calor.cargar_mapa_calor(ruta_mapa_calor) if os.path.exists(ruta_mapa_calor) else None
+    celdas_nuevas = celdas_lote if celdas_actuales is None else sumar_agregados(celdas_actuales, celdas_lote, CLAVES_MAPA_CALOR)
+    _escribir_atomico(ruta_mapa_calor, lambda temporal: mapa_calor.guardar_mapa_calor(celdas_nuevas, temporal))
+
+    estado['deltas'].append({
+        'version': version,
+        'archivos': resumen['archivos'],
+        'filas': len(nuevos),
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+    })
+    estado['version'] = version
+    _guardar_version(estado, ruta_version)
+    return {'version': version, **resumen}
+
+
+def leer_deltas(desde, columnas=None, ruta_dataset=datos.RUTA_DATASET, ruta_version=RUTA_VERSION):
+    '''
+    Lee los siniestros agregados por ingerir después de una versión.
+
+    Parameters:
+        desde (int): Versión de los datos que el proceso ya tiene cargada.
+        columnas (list, opcional): Columnas a leer ('anio' se reconstruye desde la partición).
+        ruta_dataset (str): Carpeta raíz del dataset particionado.
+        ruta_version (str): Archivo de versión.
+
+    Returns:
+        pandas.DataFrame: Los siniestros nuevos (vacío si no hay), o None si hubo una
+        reconstrucción completa posterior a 'desde' y hay que recargar todo.
+    '''
+    estado = leer_version(ruta_version)
+    if desde < estado['base']:
+        return None
+    archivos = [os.path.join(ruta_dataset, archivo)
+                for delta in estado['deltas'] if delta['version'] > desde for archivo in delta['archivos']]
+    if not archivos:
+        return pd.DataFrame(columns=columnas or list(datos.ESQUEMA))
+    particiones = ds.partitioning(pa.schema([(datos.COLUMNA_PARTICION, pa.int16())]), flavor='hive')
+    dataset = ds.dataset(archivos, format='parquet', partitioning=particiones, partition_base_dir=ruta_dataset)
+    df = dataset.to_table(columns=columnas).to_pandas()
+    if datos.COLUMNA_PARTICION in df.columns:
+        df[datos.COLUMNA_PARTICION] = df[datos.COLUMNA_PARTICION].astype(datos.ESQUEMA[datos.COLUMNA_PARTICION])
+    datos.validar_esquema(df)
+    return df
+
+
+def leer_lote(ruta):
+    '''
+    Lee un lote de siniestros de un parquet o de un CSV (con la hora como texto HH:MM:SS).
+    '''
+    if ruta.endswith('.parquet'):
+        return pd.read_parquet(ruta)
+    df = pd.read_csv(ruta)
+    df['hora'] = pd.to_datetime(df['hora'], format='%H:%M:%S', errors='coerce').dt.time.astype(object)
+    df['hora'] = df['hora'].where(df['hora'].notna(), None)
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Agrega un lote de siniestros nuevos sin reconstruir el dataset.')
+    parser.add_argument('lote', help='Parquet o CSV con las columnas del esquema final (datos.ESQUEMA)')
+    args = parser.parse_args()
+
+    resultado = ingerir(leer_lote(args.lote))
+    print(f"Versión {resultado['version']}: {resultado['filas']} siniestros agregados, "
+          f"{resultado['duplicados']} ya cargados, {len(resultado['archivos'])} archivos delta")
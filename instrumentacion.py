@@ -0,0 +1,250 @@
+## INSTRUMENTACIÓN DE LOS TRAMOS CRÍTICOS
+# Mide el tiempo de reloj y el pico de memoria de cada tramo del dashboard (carga del cubo,
+# mapa de calor, gráficos, red vial, ruteo, ...). Cada tramo terminado se agrega a un búfer
+# por hilo (el panel de depuración del dashboard lo muestra) y, si hay un log configurado, se
+# escribe como una línea JSON en un archivo compartido por todos los procesos: cada registro
+# es una sola escritura en modo append, así que los workers no intercalan líneas.
+#
+# Desactivada (el valor por defecto) cada tramo cuesta una consulta a una variable global: no
+# se mide nada ni se asigna memoria. La memoria se mide con tracemalloc, que es global al
+# proceso: con varias sesiones simultáneas el pico de un tramo incluye lo que asignaron las otras.
+#
+# Se activa con la variable de entorno INSTRUMENTACION=1 (al importar el módulo se llama a
+# activar(), que crea la carpeta del log y arranca tracemalloc) o llamando a activar(). Los
+# logs de varios workers se resumen con:
+#     python instrumentacion.py logs/instrumentacion.jsonl
+
+# Importaciones
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Constantes
+RUTA_LOG = os.environ.get('INSTRUMENTACION_LOG', 'logs/instrumentacion.jsonl')
+MAX_REGISTROS = 1000  # registros por hilo que se conservan para el panel de depuración
+
+_activa = False
+_ruta_log = None
+_bloqueo_log = threading.Lock()
+_local = threading.local()
+
+
+# Clases
+class _TramoNulo:
+    '''
+    Tramo sin efecto que se devuelve cuando la instrumentación está desactivada.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_TRAMO_NULO = _TramoNulo()
+
+
+class Tramo:
+    '''
+    Mide un tramo de código usado como context manager.
+
+    Los tramos se pueden anidar: cada uno registra el nombre de su padre y el pico de memoria
+    del hijo también cuenta para el padre.
+    '''
+    def __init__(self, nombre, atributos):
+        self.nombre = nombre
+        self.atributos = atributos
+
+    def __enter__(self):
+        pila = _pila()
+        self.padre = pila[-1].nombre if pila else None
+        if tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1].maximo = max(pila[-1].maximo, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicial = self.maximo = actual
+        pila.append(self)
+        self.inicio = time.time()
+        self._reloj = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_excepcion, excepcion, traza):
+        segundos = time.perf_counter() - self._reloj
+        pila = _pila()
+        pila.pop()
+        pico_memoria = None
+        if tracemalloc.is_tracing() and hasattr(self, 'maximo'):
+            self.maximo = max(self.maximo, tracemalloc.get_traced_memory()[1])
+            pico_memoria = self.maximo - self.memoria_inicial
+            if pila:
+                pila[-1].maximo = max(pila[-1].maximo, self.maximo)
+            tracemalloc.reset_peak()
+
+        registrar({
+            'tramo': self.nombre,
+            'padre': self.padre,
+            'inicio': round(self.inicio, 6),
+            'segundos': round(segundos, 6),
+            'pico_memoria': pico_memoria,
+            'error': tipo_excepcion.__name__ if tipo_excepcion else None,
+            'pid': os.getpid(),
+            'hilo': threading.get_ident(),
+            **self.atributos,
+        })
+        return False
+
+
+# Funciones
+def _pila():
+    if not hasattr(_local, 'pila'):
+        _local.pila = []
+    return _local.pila
+
+
+def _buffer():
+    if not hasattr(_local, 'registros'):
+        _local.registros = deque(maxlen=MAX_REGISTROS)
+    return _local.registros
+
+
+def activar(ruta_log=RUTA_LOG, memoria=True):
+    '''
+    Activa la instrumentación en todo el proceso.
+
+    Parameters:
+        ruta_log (str): Archivo JSON-lines donde se agregan los registros; None para no escribir log.
+        memoria (bool): Si se mide el pico de memoria con tracemalloc (agrega costo a cada asignación).
+    '''
+    global _activa, _ruta_log
+    if ruta_log:
+        os.makedirs(os.path.dirname(ruta_log) or '.', exist_ok=True)
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _ruta_log = ruta_log
+    _activa = True
+
+
+def desactivar():
+    global _activa
+    _activa = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def activa():
+    return _activa
+
+
+def tramo(nombre, **atributos):
+    '''
+    Devuelve un context manager que mide el bloque con el nombre y atributos dados.
+
+    Ejemplo:
+        with instrumentacion.tramo('mapa_calor', nivel=13):
+            ...
+    '''
+    if not _activa:
+        return _TRAMO_NULO
+    return Tramo(nombre, atributos)
+
+
+def medido(nombre=None):
+    '''
+    Decorador que mide cada llamada a la función como un tramo (por defecto, con su nombre).
+    '''
+    def decorador(funcion):
+        nombre_tramo = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activa:
+                return funcion(*args, **kwargs)
+            with Tramo(nombre_tramo, {}):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar(registro):
+    '''
+    Agrega un registro al búfer del hilo y lo escribe en el log, si está configurado.
+    '''
+    _buffer().append(registro)
+    if _ruta_log:
+        linea = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+        with _bloqueo_log, open(_ruta_log, 'a', encoding='utf-8') as archivo:
+            archivo.write(linea)
+
+
+def tomar_registros():
+    '''
+    Devuelve y vacía los registros del hilo actual (los tramos de la ejecución en curso).
+    '''
+    registros = _buffer()
+    lista = list(registros)
+    registros.clear()
+    return lista
+
+
+def resumir(registros):
+    '''
+    Resume registros de tramos (de uno o varios workers) por nombre de tramo.
+
+    Parameters:
+        registros (list | pandas.DataFrame): Registros como los que escribe registrar.
+
+    Returns:
+        pandas.DataFrame: Por tramo, 'llamadas', 'total_s', 'media_s', 'p95_s', 'max_s' y
+        'pico_memoria_mb', ordenado por tiempo total.
+    '''
+    import pandas as pd
+
+    df = pd.DataFrame(registros)
+    if df.empty:
+        return pd.DataFrame(columns=['tramo', 'llamadas', 'total_s', 'media_s', 'p95_s', 'max_s', 'pico_memoria_mb'])
+    if 'pico_memoria' not in df.columns:
+        df['pico_memoria'] = None
+    df['pico_memoria'] = pd.to_numeric(df['pico_memoria'], errors='coerce')
+    resumen = df.groupby('tramo').agg(
+        llamadas=('segundos', 'size'),
+        total_s=('segundos', 'sum'),
+        media_s=('segundos', 'mean'),
+        p95_s=('segundos', lambda segundos: segundos.quantile(0.95)),
+        max_s=('segundos', 'max'),
+        pico_memoria_mb=('pico_memoria', lambda picos: picos.max() / 2 ** 20),
+    )
+    return resumen.sort_values('total_s', ascending=False).reset_index()
+
+
+def leer_log(ruta=RUTA_LOG):
+    '''
+    Lee un log JSON-lines (se ignoran las líneas incompletas, por ejemplo de un worker interrumpido).
+    '''
+    registros = []
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            try:
+                registros.append(json.loads(linea))
+            except json.JSONDecodeError:
+                continue
+    return registros
+
+
+# Con INSTRUMENTACION=1 el proceso arranca con la instrumentación completa (log y memoria)
+if os.environ.get('INSTRUMENTACION') == '1':
+    activar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resume el log de instrumentación de uno o varios workers.')
+    parser.add_argument('rutas', nargs='*', default=[RUTA_LOG], help='Logs JSON-lines a combinar')
+    args = parser.parse_args()
+
+    todos = [registro for ruta in args.rutas for registro in leer_log(ruta)]
+    print(resumir(todos).to_string(index=False, float_format=lambda valor: f'{valor:.4f}'))
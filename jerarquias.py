@@ -0,0 +1,406 @@
+## JERARQUÍAS DE CONTRACCIÓN PARA RUTAS PUNTO A PUNTO
+# Preprocesamiento opcional de la red para responder rutas punto a punto sin recorrerla. Los
+# nodos se contraen de a uno, de menos a más importante: al quitar un nodo v, cada camino
+# u -> v -> w que era el más corto se reemplaza por un atajo u -> w con su costo (si una búsqueda
+# local no encuentra otro camino igual de corto, un "testigo"). El orden de contracción es el
+# rango de cada nodo y todo camino mínimo pasa a ser uno que sube de rango desde el origen y
+# baja hacia el destino. El orden sale de una disección anidada geométrica: la red se corta en
+# mitades por la mediana de su lado más largo, los nodos con calles que cruzan el corte (el
+# separador) quedan para el final y cada mitad se ordena igual. Se calcula con numpy en una
+# fracción de segundo y sirve para cualquier costo, así que sólo las búsquedas de testigos se
+# hacen en Python, una vez por nodo.
+#
+# De la jerarquía se derivan etiquetas por nodo: el costo por aristas que suben de rango hacia
+# cada nodo alcanzable (ida) y desde cada nodo que lo alcanza (vuelta). Se calculan de una vez
+# recorriendo los nodos de mayor a menor rango, sin Dijkstra, y el costo mínimo de s a t es el
+# mínimo de ida(s)[h] + vuelta(t)[h] sobre los nodos h comunes a ambas etiquetas: una
+# intersección de dos arreglos ordenados, sin recorrer la red. Cada entrada guarda además su
+# primer salto, así la ruta se reconstruye expandiendo los atajos.
+#
+# El costo de las aristas es la longitud (alpha = 0) o el costo combinado con el riesgo de un
+# alpha (ver riesgo_vial.costo_aristas), y cada uno se preprocesa por separado. Las tablas se
+# guardan junto a la red con la versión de la red y del riesgo; sin tablas vigentes, el ruteo
+# sigue con el Dijkstra de scipy. Las matrices de muchos a muchos también siguen con Dijkstra
+# (riesgo_vial.matriz_costos): un Dijkstra por origen ya responde a todos los destinos.
+#
+# Uso del paso offline (después de python riesgo_vial.py):
+#     python jerarquias.py --alphas 0 0.5
+
+# Importaciones
+import argparse
+import heapq
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import red_vial
+import riesgo_vial
+from indice_espacial import proyectar
+
+# Constantes
+ASENTADOS_TESTIGO = 40  # nodos que asienta como máximo cada búsqueda de testigos (si no alcanza, se agrega el atajo)
+HOJA_DISECCION = 16  # nodos de las partes que ya no se cortan
+ALPHAS = (0.0, 0.5)
+ARREGLOS_JERARQUIA = ('rango', 'indptr_ida', 'nodos_ida', 'costos_ida', 'saltos_ida',
+                      'indptr_vuelta', 'nodos_vuelta', 'costos_vuelta', 'saltos_vuelta',
+                      'atajo_origen', 'atajo_destino', 'atajo_medio')
+
+
+# Clases
+@dataclass
+class Jerarquia:
+    '''
+    Jerarquía de contracción de una red para un costo de aristas, con las etiquetas de cada nodo.
+
+    Las etiquetas de ida del nodo i ocupan las posiciones indptr_ida[i]:indptr_ida[i + 1] de
+    'nodos_ida' (ordenados), 'costos_ida' y 'saltos_ida' (el primer nodo del camino hacia ese
+    nodo); las de vuelta, lo mismo con el último nodo antes de llegar a i. Los atajos guardan el
+    nodo contraído entre su origen y su destino. 'clave' identifica el costo (ver
+    riesgo_vial.clave_costo) y 'version' la red y el riesgo con que se calculó.
+    '''
+    rango: np.ndarray
+    indptr_ida: np.ndarray
+    nodos_ida: np.ndarray
+    costos_ida: np.ndarray
+    saltos_ida: np.ndarray
+    indptr_vuelta: np.ndarray
+    nodos_vuelta: np.ndarray
+    costos_vuelta: np.ndarray
+    saltos_vuelta: np.ndarray
+    atajo_origen: np.ndarray
+    atajo_destino: np.ndarray
+    atajo_medio: np.ndarray
+    clave: str
+    version: str
+    _medios: dict = field(default=None, repr=False)
+
+    @property
+    def bytes(self):
+        return sum(getattr(self, nombre).nbytes for nombre in ARREGLOS_JERARQUIA)
+
+    @property
+    def medios(self):
+        # Nodo contraído de cada atajo, por (origen * n + destino); se arma en la primera ruta
+        if self._medios is None:
+            n = len(self.rango)
+            claves = self.atajo_origen.astype(np.int64) * n + self.atajo_destino
+            self._medios = dict(zip(claves.tolist(), self.atajo_medio.tolist()))
+        return self._medios
+
+
+# Funciones
+def _version(red):
+    return f'{red.version}-{red.version_riesgo}'
+
+
+def _pesos(red, alpha):
+    '''
+    Devuelve el costo por arista (float64) de un alpha y su clave.
+    '''
+    clave = riesgo_vial.clave_costo(red, alpha)
+    if clave == 'longitud':
+        return np.asarray(red.longitud, dtype=np.float64), clave
+    return riesgo_vial.costo_aristas(red, round(float(alpha), 3)), clave
+
+
+def _testigos(salida, origen, excluido, limite, maximo_asentados):
+    # Dijkstra local desde 'origen' sin pasar por 'excluido', hasta 'limite' o 'maximo_asentados'.
+    # Los costos provisorios también son caminos reales, así que sirven como testigos
+    costos = {origen: 0.0}
+    cola = [(0.0, origen)]
+    asentados = 0
+    while cola and asentados < maximo_asentados:
+        costo, nodo = heapq.heappop(cola)
+        if costo > limite:
+            break
+        if costo > costos[nodo]:
+            continue
+        asentados += 1
+        for vecino, peso in salida[nodo].items():
+            if vecino != excluido:
+                costo_vecino = costo + peso
+                if costo_vecino < costos.get(vecino, np.inf):
+                    costos[vecino] = costo_vecino
+                    heapq.heappush(cola, (costo_vecino, vecino))
+    return costos
+
+
+def _atajos(salida, entrada, nodo, maximo_asentados):
+    # Atajos (u, w, costo) necesarios para contraer 'nodo' sin perder caminos mínimos
+    atajos = []
+    for u, costo_u in entrada[nodo].items():
+        candidatos = [(w, costo_u + costo_w) for w, costo_w in salida[nodo].items() if w != u]
+        if not candidatos:
+            continue
+        costos = _testigos(salida, u, nodo, max(costo for _, costo in candidatos), maximo_asentados)
+        atajos.extend((u, w, costo) for w, costo in candidatos if costos.get(w, np.inf) > costo)
+    return atajos
+
+
+def orden_disecciones(red, hoja=HOJA_DISECCION):
+    '''
+    Ordena los nodos por disección anidada: cada parte se corta por la mediana de su lado más
+    largo y su separador (el borde con menos nodos entre los dos lados del corte) va después
+    de las dos mitades, que se ordenan igual hasta tener 'hoja' nodos o menos.
+
+    Returns:
+        numpy.ndarray: Las posiciones de los nodos, de la primera a la última en contraerse.
+    '''
+    n = red.cantidad_nodos
+    x, y = proyectar(red.lat, red.lon)
+    # Vecinos de cada nodo en ambos sentidos, en formato CSR
+    extremos = np.concatenate([red_vial.origenes_aristas(red), np.asarray(red.indices)])
+    vecinos = np.concatenate([np.asarray(red.indices), red_vial.origenes_aristas(red)])[np.argsort(extremos, kind='stable')]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(extremos, minlength=n), out=indptr[1:])
+    lado = np.zeros(n, dtype=np.int8)
+
+    def diseccionar(nodos):
+        if len(nodos) <= hoja:
+            return [nodos]
+        eje = x[nodos] if np.ptp(x[nodos]) >= np.ptp(y[nodos]) else y[nodos]
+        izquierda = eje <= np.median(eje)
+        if izquierda.all():
+            return [nodos]
+        lado[nodos] = np.where(izquierda, 1, 2)
+        cantidades = indptr[nodos + 1] - indptr[nodos]
+        duenos = np.repeat(np.arange(len(nodos)), cantidades)
+        posiciones = indptr[nodos][duenos] + np.arange(cantidades.sum()) - np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+        borde = np.zeros(len(nodos), dtype=bool)
+        borde[duenos[lado[vecinos[posiciones]] == 3 - lado[nodos][duenos]]] = True
+        lado[nodos] = 0
+        separador = borde & izquierda if (borde & izquierda).sum() <= (borde & ~izquierda).sum() else borde & ~izquierda
+        return diseccionar(nodos[izquierda & ~separador]) + diseccionar(nodos[~izquierda & ~separador]) + [nodos[separador]]
+
+    return np.concatenate(diseccionar(np.arange(n)))
+
+
+def contraer(red, pesos, orden, maximo_asentados=ASENTADOS_TESTIGO):
+    '''
+    Contrae los nodos de la red en el orden dado y devuelve las aristas hacia arriba y los atajos.
+
+    Returns:
+        tuple: (aristas hacia arriba de ida y de vuelta de cada nodo, como listas de (vecino,
+        costo); atajos como diccionario {(u, w): nodo contraído}).
+    '''
+    n = red.cantidad_nodos
+    salida = [{} for _ in range(n)]
+    entrada = [{} for _ in range(n)]
+    origenes = red_vial.origenes_aristas(red).tolist()
+    for u, v, peso in zip(origenes, np.asarray(red.indices).tolist(), pesos.tolist()):
+        if u != v and peso < salida[u].get(v, np.inf):
+            salida[u][v] = peso
+            entrada[v][u] = peso
+
+    medios = {}
+    arriba_ida, arriba_vuelta = [None] * n, [None] * n
+    for nodo in orden:
+        atajos = _atajos(salida, entrada, nodo, maximo_asentados)
+        # Los vecinos que quedan se contraen después: son las aristas que suben de rango
+        arriba_ida[nodo] = list(salida[nodo].items())
+        arriba_vuelta[nodo] = list(entrada[nodo].items())
+        for u in entrada[nodo]:
+            del salida[u][nodo]
+        for w in salida[nodo]:
+            del entrada[w][nodo]
+        for u, w, costo in atajos:
+            if costo < salida[u].get(w, np.inf):
+                salida[u][w] = costo
+                entrada[w][u] = costo
+                medios[(u, w)] = nodo
+        salida[nodo], entrada[nodo] = {}, {}
+    return arriba_ida, arriba_vuelta, medios
+
+
+def _etiquetas(orden, arriba, n):
+    # Etiquetas de cada nodo a partir de las de sus vecinos de mayor rango (ya calculadas): el
+    # propio nodo con costo 0 más, por cada vecino, su etiqueta desplazada por el costo de la arista
+    nodos, costos, saltos = [None] * n, [None] * n, [None] * n
+    for nodo in reversed(orden):
+        partes_nodos, partes_costos, partes_saltos = [np.array([nodo], np.int32)], [np.zeros(1)], [np.array([nodo], np.int32)]
+        for vecino, costo in arriba[nodo]:
+            partes_nodos.append(nodos[vecino])
+            partes_costos.append(costos[vecino] + costo)
+            partes_saltos.append(np.full(len(nodos[vecino]), vecino, np.int32))
+        todos_nodos = np.concatenate(partes_nodos)
+        todos_costos = np.concatenate(partes_costos)
+        orden_etiqueta = np.lexsort((todos_costos, todos_nodos))
+        primeros = np.ones(len(orden_etiqueta), dtype=bool)
+        primeros[1:] = todos_nodos[orden_etiqueta[1:]] != todos_nodos[orden_etiqueta[:-1]]
+        elegidos = orden_etiqueta[primeros]
+        nodos[nodo], costos[nodo], saltos[nodo] = todos_nodos[elegidos], todos_costos[elegidos], np.concatenate(partes_saltos)[elegidos]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(etiqueta) for etiqueta in nodos], out=indptr[1:])
+    return indptr, np.concatenate(nodos), np.concatenate(costos), np.concatenate(saltos)
+
+
+def preprocesar(red, alpha=0.0, maximo_asentados=ASENTADOS_TESTIGO):
+    '''
+    Calcula la jerarquía de contracción y las etiquetas de la red para un alpha.
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        alpha (float): 0 para la longitud; entre 0 y 1 para el costo combinado con el riesgo.
+        maximo_asentados (int): Límite de cada búsqueda de testigos; uno menor agrega más atajos
+            pero contrae más rápido.
+
+    Returns:
+        Jerarquia: Las tablas listas para ruta_jerarquia.
+    '''
+    pesos, clave = _pesos(red, alpha)
+    n = red.cantidad_nodos
+    orden = orden_disecciones(red).tolist()
+    arriba_ida, arriba_vuelta, medios = contraer(red, pesos, orden, maximo_asentados)
+    rango = np.empty(n, dtype=np.int32)
+    rango[orden] = np.arange(n, dtype=np.int32)
+    indptr_ida, nodos_ida, costos_ida, saltos_ida = _etiquetas(orden, arriba_ida, n)
+    indptr_vuelta, nodos_vuelta, costos_vuelta, saltos_vuelta = _etiquetas(orden, arriba_vuelta, n)
+    atajos = np.array([(u, w, medio) for (u, w), medio in medios.items()], dtype=np.int32).reshape(-1, 3)
+    return Jerarquia(
+        rango=rango,
+        indptr_ida=indptr_ida, nodos_ida=nodos_ida, costos_ida=costos_ida, saltos_ida=saltos_ida,
+        indptr_vuelta=indptr_vuelta, nodos_vuelta=nodos_vuelta, costos_vuelta=costos_vuelta, saltos_vuelta=saltos_vuelta,
+        atajo_origen=atajos[:, 0].copy(), atajo_destino=atajos[:, 1].copy(), atajo_medio=atajos[:, 2].copy(),
+        clave=clave,
+        version=_version(red),
+    )
+
+
+def _ruta_archivo(directorio, alpha):
+    return os.path.join(directorio, f'jerarquia_{round(float(alpha), 3)}.npz')
+
+
+def guardar_jerarquia(jerarquia, alpha, directorio=red_vial.DIRECTORIO_RED):
+    '''
+    Guarda las tablas de un alpha junto a la red, en 'jerarquia_<alpha>.npz'.
+    '''
+    np.savez(_ruta_archivo(directorio, alpha), clave=jerarquia.clave, version=jerarquia.version,
+             **{nombre: getattr(jerarquia, nombre) for nombre in ARREGLOS_JERARQUIA})
+
+
+def cargar_jerarquia(red, alpha, directorio=red_vial.DIRECTORIO_RED):
+    '''
+    Abre las tablas guardadas de un alpha si corresponden a la red y al riesgo actuales.
+
+    Returns:
+        Jerarquia: Las tablas, o None si no existen o se calcularon con otra versión de la red.
+    '''
+    ruta = _ruta_archivo(directorio, alpha)
+    if not os.path.exists(ruta):
+        return None
+    clave = riesgo_vial.clave_costo(red, alpha)
+    with np.load(ruta) as archivo:
+        if str(archivo['clave']) != clave or str(archivo['version']) != _version(red):
+            return None
+        return Jerarquia(clave=clave, version=_version(red), **{nombre: archivo[nombre] for nombre in ARREGLOS_JERARQUIA})
+
+
+def jerarquia(red, alpha=0.0, directorio=red_vial.DIRECTORIO_RED):
+    '''
+    Devuelve las tablas de un alpha guardadas en la red o leídas de disco, o None si no se preprocesaron.
+
+    Sólo se guardan en la red las tablas encontradas: si faltan, se vuelven a buscar en la
+    siguiente consulta, así un proceso en marcha usa las que 'python jerarquias.py' guarde después.
+    '''
+    clave = riesgo_vial.clave_costo(red, alpha)
+    if clave not in red._jerarquias:
+        tablas = cargar_jerarquia(red, alpha, directorio)
+        if tablas is None:
+            return None
+        red._jerarquias[clave] = tablas
+    return red._jerarquias[clave]
+
+
+def costo_jerarquia(jerarquia, origen, destino):
+    '''
+    Devuelve el costo mínimo entre dos nodos y el nodo común de sus etiquetas donde se alcanza.
+
+    Returns:
+        tuple: (costo, nodo común); (inf, -1) si no hay camino.
+    '''
+    inicio_ida, fin_ida = jerarquia.indptr_ida[origen], jerarquia.indptr_ida[origen + 1]
+    inicio_vuelta, fin_vuelta = jerarquia.indptr_vuelta[destino], jerarquia.indptr_vuelta[destino + 1]
+    comunes, en_ida, en_vuelta = np.intersect1d(
+        jerarquia.nodos_ida[inicio_ida:fin_ida], jerarquia.nodos_vuelta[inicio_vuelta:fin_vuelta],
+        assume_unique=True, return_indices=True,
+    )
+    if not len(comunes):
+        return np.inf, -1
+    totales = jerarquia.costos_ida[inicio_ida + en_ida] + jerarquia.costos_vuelta[inicio_vuelta + en_vuelta]
+    mejor = int(np.argmin(totales))
+    return float(totales[mejor]), int(comunes[mejor])
+
+
+def _salto(indptr, nodos, saltos, nodo, comun):
+    inicio, fin = indptr[nodo], indptr[nodo + 1]
+    return int(saltos[inicio + np.searchsorted(nodos[inicio:fin], comun)])
+
+
+def _expandir(medios, n, u, w, ruta):
+    # Agrega a 'ruta' los nodos de la arista u -> w sin 'u', reemplazando los atajos por sus tramos
+    pendientes = [(u, w)]
+    while pendientes:
+        a, b = pendientes.pop()
+        medio = medios.get(a * n + b)
+        if medio is None:
+            ruta.append(b)
+        else:
+            pendientes.append((medio, b))
+            pendientes.append((a, medio))
+
+
+def ruta_jerarquia(jerarquia, origen, destino):
+    '''
+    Calcula el camino de menor costo entre dos nodos con las etiquetas de la jerarquía.
+
+    Parameters:
+        jerarquia (Jerarquia): Las tablas del costo buscado (ver jerarquia).
+        origen (int): Posición del nodo de inicio.
+        destino (int): Posición del nodo de destino.
+
+    Returns:
+        tuple: (posiciones de los nodos de la ruta, costo total); (None, inf) si no hay camino.
+        Con alpha = 0 el costo es la longitud en metros.
+    '''
+    origen, destino = int(origen), int(destino)
+    costo, comun = costo_jerarquia(jerarquia, origen, destino)
+    if comun < 0:
+        return None, np.inf
+    n, medios = len(jerarquia.rango), jerarquia.medios
+
+    ruta = [origen]
+    nodo = origen
+    while nodo != comun:
+        siguiente = _salto(jerarquia.indptr_ida, jerarquia.nodos_ida, jerarquia.saltos_ida, nodo, comun)
+        _expandir(medios, n, nodo, siguiente, ruta)
+        nodo = siguiente
+
+    # De destino hacia el nodo común por los saltos de vuelta, luego se recorre en el otro sentido
+    tramos = []
+    nodo = destino
+    while nodo != comun:
+        anterior = _salto(jerarquia.indptr_vuelta, jerarquia.nodos_vuelta, jerarquia.saltos_vuelta, nodo, comun)
+        tramos.append((anterior, nodo))
+        nodo = anterior
+    for anterior, nodo in reversed(tramos):
+        _expandir(medios, n, anterior, nodo, ruta)
+    return ruta, costo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Preprocesa las jerarquías de contracción de la red vial.')
+    parser.add_argument('--red', default=red_vial.DIRECTORIO_RED, help='Carpeta de la red compilada')
+    parser.add_argument('--alphas', type=float, nargs='+', default=list(ALPHAS), help='Costos a preprocesar')
+    args = parser.parse_args()
+
+    red_compilada = red_vial.cargar_red(args.red)
+    for valor_alpha in args.alphas:
+        inicio = time.perf_counter()
+        jerarquia_alpha = preprocesar(red_compilada, valor_alpha)
+        guardar_jerarquia(jerarquia_alpha, valor_alpha, args.red)
+        print(f'Jerarquía para alpha={valor_alpha:g} ({jerarquia_alpha.clave}) guardada en {args.red}: '
+              f'{len(jerarquia_alpha.atajo_medio)} atajos, {len(jerarquia_alpha.nodos_ida) / red_compilada.cantidad_nodos:.0f} '
+              f'nodos por etiqueta, {jerarquia_alpha.bytes / 2 ** 20:.1f} MB, {time.perf_counter() - inicio:.1f} s')
@@ -0,0 +1,159 @@
+## LIMPIEZA VECTORIZADA DE LOS EXPORTS DEL FEU
+# Convierte coordenadas, fecha y hora de los CSV crudos usando sólo operaciones de Series/NumPy
+# (sin .apply ni bucles por fila), valida las coordenadas contra la zona de Corrientes y
+# devuelve la cantidad de errores por columna. El modo por bloques permite limpiar exports
+# provinciales de varios GB con memoria acotada.
+
+# Importaciones
+import numpy as np
+import pandas as pd
+
+# Constantes
+# Zona válida: provincia de Corrientes, con un pequeño margen
+LATITUD_MIN, LATITUD_MAX = -30.8, -27.2
+LONGITUD_MIN, LONGITUD_MAX = -59.7, -55.6
+DIGITOS_ENTEROS = 2  # las coordenadas de la provincia tienen dos dígitos enteros (-27.x, -58.x)
+TAMANIO_BLOQUE = 100_000
+
+
+# Funciones
+def parsear_coordenada(serie):
+    '''
+    Convierte coordenadas con separadores de miles corruptos a float64.
+
+    Los exports guardan, por ejemplo, '-2.747.829' en lugar de -27.47829. Se quitan todos los
+    separadores y se vuelve a ubicar la coma decimal después de DIGITOS_ENTEROS dígitos, lo que
+    también deja intactos los valores ya correctos ('-27.47829').
+
+    Parameters:
+        serie (pandas.Series): Coordenadas como texto (o números).
+
+    Returns:
+        pandas.Series: Coordenadas float64; NaN donde el valor es nulo o no tiene formato numérico.
+    '''
+    texto = serie.astype('string').str.strip().str.replace(r'[.,\s]', '', regex=True)
+    negativo = texto.str.startswith('-')
+    digitos = texto.str.lstrip('-+')
+    valido = digitos.str.fullmatch(r'\d+').fillna(False).astype(bool)
+
+    valores = pd.to_numeric(digitos.where(valido), errors='coerce').astype('float64')
+    escala = np.power(10.0, (digitos.str.len().astype('float64') - DIGITOS_ENTEROS).clip(lower=0))
+    valores = (valores / escala).where(~negativo.fillna(False).astype(bool), -(valores / escala))
+    return valores.astype('float64')
+
+
+def validar_coordenadas(lat, lon):
+    '''
+    Devuelve una máscara booleana con las coordenadas dentro de la zona de Corrientes.
+    '''
+    return lat.between(LATITUD_MIN, LATITUD_MAX) & lon.between(LONGITUD_MIN, LONGITUD_MAX)
+
+
+def parsear_fecha(serie):
+    '''
+    Convierte 'siniestro_fecha' ('AAAA-MM-DD', con o sin hora) a datetime64; NaT si es inválida.
+    '''
+    return pd.to_datetime(serie.astype('string').str.slice(0, 10), format='%Y-%m-%d', errors='coerce')
+
+
+def parsear_hora(serie):
+    '''
+    Convierte 'siniestro_hora' ('H:MM:SS' o 'H:MM') a datetime64 del día 1900-01-01; NaT si es inválida.
+    '''
+    texto = serie.astype('string').str.strip()
+    hora = pd.to_datetime(texto, format='%H:%M:%S', errors='coerce')
+    return hora.fillna(pd.to_datetime(texto, format='%H:%M', errors='coerce'))
+
+
+def limpiar_siniestros(df):
+    '''
+    Limpia coordenadas, fecha y hora de un bloque de siniestros del FEU.
+
+    Reemplaza 'latitud' y 'longitud' por float64 (NaN si son inválidas o caen fuera de
+    Corrientes), 'siniestro_fecha' por datetime64 y 'siniestro_hora' por datetime.time, y
+    agrega 'hora_num' con la hora del día (UInt8, nula si la hora es inválida).
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros crudos.
+
+    Returns:
+        tuple: (DataFrame limpio, dict de errores por columna). Los errores se cuentan como
+        'nulos' (dato faltante), 'formato' (no se pudo interpretar) y 'fuera_de_zona'.
+    '''
+    df = df.copy()
+    errores = {}
+
+    lat = parsear_coordenada(df['latitud'])
+    lon = parsear_coordenada(df['longitud'])
+    en_zona = validar_coordenadas(lat, lon)
+    for columna, valores in (('latitud', lat), ('longitud', lon)):
+        nulos = df[columna].isna()
+        errores[columna] = {
+            'nulos': int(nulos.sum()),
+            'formato': int((valores.isna() & ~nulos).sum()),
+            'fuera_de_zona': int((valores.notna() & lat.notna() & lon.notna() & ~en_zona).sum()),
+        }
+    df['latitud'] = lat.where(en_zona)
+    df['longitud'] = lon.where(en_zona)
+
+    for columna, parser in (('siniestro_fecha', parsear_fecha), ('siniestro_hora', parsear_hora)):
+        valores = parser(df[columna])
+        nulos = df[columna].isna()
+        errores[columna] = {'nulos': int(nulos.sum()), 'formato': int((valores.isna() & ~nulos).sum())}
+        df[columna] = valores
+    df['hora_num'] = df['siniestro_hora'].dt.hour.astype('UInt8')
+    df['siniestro_hora'] = df['siniestro_hora'].dt.time
+
+    return df, errores
+
+
+def sumar_errores(total, parcial):
+    '''
+    Acumula los conteos de errores de 'parcial' en 'total' (ambos dict de dict) y devuelve 'total'.
+    '''
+    for columna, conteos in parcial.items():
+        destino = total.setdefault(columna, {})
+        for tipo, cantidad in conteos.items():
+            destino[tipo] = destino.get(tipo, 0) + cantidad
+    return total
+
+
+def limpiar_por_bloques(ruta_csv, tamanio_bloque=TAMANIO_BLOQUE, **kwargs_csv):
+    '''
+    Lee y limpia un CSV de siniestros por bloques, sin cargarlo completo en memoria.
+
+    Parameters:
+        ruta_csv (str): CSV crudo del FEU.
+        tamanio_bloque (int): Cantidad de filas por bloque.
+        **kwargs_csv: Argumentos adicionales para pandas.read_csv (por ejemplo usecols).
+
+    Yields:
+        tuple: (DataFrame limpio del bloque, dict de errores del bloque).
+    '''
+    kwargs_csv.setdefault('dtype', {'latitud': str, 'longitud': str})
+    for bloque in pd.read_csv(ruta_csv, chunksize=tamanio_bloque, **kwargs_csv):
+        yield limpiar_siniestros(bloque)
+
+
+def limpiar_csv(ruta_csv, ruta_parquet, tamanio_bloque=TAMANIO_BLOQUE, **kwargs_csv):
+    '''
+    Limpia un CSV por bloques y escribe el resultado en un parquet, con memoria acotada al bloque.
+
+    Returns:
+        dict: Errores por columna acumulados en todo el archivo.
+    '''
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    errores, escritor = {}, None
+    try:
+        for bloque, errores_bloque in limpiar_por_bloques(ruta_csv, tamanio_bloque, **kwargs_csv):
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(ruta_parquet, tabla.schema)
+            escritor.write_table(tabla.cast(escritor.schema))
+            sumar_errores(errores, errores_bloque)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return errores
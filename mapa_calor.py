@@ -0,0 +1,109 @@
+## MAPA DE CALOR PREAGREGADO EN GRILLAS MULTIRRESOLUCIÓN
+# Etapa de agregación: los siniestros se agrupan por año en celdas de una grilla regular, con un
+# tamaño de celda por nivel de zoom. Cada celda guarda la cantidad de siniestros y la suma de
+# sus coordenadas, de modo que las grillas de varios años se combinan sumando y el centroide
+# ponderado se obtiene al final. El dashboard envía a folium una celda por punto del mapa de
+# calor, así que el tamaño del HTML depende de la cantidad de celdas y no de siniestros.
+#
+# Uso de la etapa de agregación:
+#     python mapa_calor.py
+
+# Importaciones
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import datos
+
+# Constantes
+RUTA_MAPA_CALOR = 'Datasets_limpios/mapa_calor.parquet'
+NIVELES_ZOOM = (11, 13, 15, 17)
+NIVEL_POR_DEFECTO = 13
+CELDAS_POR_TESELA = 32  # celdas por cada tesela de 256 px del mapa
+
+
+# Funciones
+def tamanio_celda(zoom):
+    '''
+    Devuelve el tamaño de celda en grados para un nivel de zoom (32 celdas por tesela del mapa).
+    '''
+    return 360.0 / (2 ** zoom) / CELDAS_POR_TESELA
+
+
+def agregar_mapa_calor(df, niveles=NIVELES_ZOOM):
+    '''
+    Agrupa los siniestros en celdas por año y nivel de zoom.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros con columnas 'anio', 'latitud' y 'longitud'.
+        niveles (tuple): Niveles de zoom para los que se arma la grilla.
+
+    Returns:
+        pandas.DataFrame: Una fila por (nivel, anio, celda) con 'cantidad', 'suma_lat' y 'suma_lon'.
+    '''
+    df = df.dropna(subset=['latitud', 'longitud'])
+    lat = df['latitud'].to_numpy(dtype=np.float64)
+    lon = df['longitud'].to_numpy(dtype=np.float64)
+
+    grillas = []
+    for zoom in niveles:
+        tamanio = tamanio_celda(zoom)
+        grilla = pd.DataFrame({
+            'nivel': np.uint8(zoom),
+            'anio': df['anio'].to_numpy(dtype=np.int16),
+            'celda_x': np.floor(lon / tamanio).astype(np.int32),
+            'celda_y': np.floor(lat / tamanio).astype(np.int32),
+            'cantidad': np.int32(1),
+            'suma_lat': lat,
+            'suma_lon': lon,
+        })
+        grillas.append(grilla.groupby(['nivel', 'anio', 'celda_x', 'celda_y'], as_index=False).sum())
+    return pd.concat(grillas, ignore_index=True)
+
+
+def combinar_celdas(df_celdas, rango_anios, zoom=NIVEL_POR_DEFECTO):
+    '''
+    Suma las grillas precalculadas de los años seleccionados para un nivel de zoom.
+
+    Parameters:
+        df_celdas (pandas.DataFrame): Resultado de agregar_mapa_calor.
+        rango_anios (tuple): (año inicial, año final), ambos inclusive.
+        zoom (int): Nivel de zoom de la grilla a usar.
+
+    Returns:
+        pandas.DataFrame: Una fila por celda con 'latitud', 'longitud' (centroide ponderado) y 'cantidad'.
+    '''
+    seleccion = df_celdas[(df_celdas['nivel'] == zoom) & df_celdas['anio'].between(*rango_anios)]
+    celdas = seleccion.groupby(['celda_x', 'celda_y'])[['cantidad', 'suma_lat', 'suma_lon']].sum()
+    return pd.DataFrame({
+        'latitud': celdas['suma_lat'] / celdas['cantidad'],
+        'longitud': celdas['suma_lon'] / celdas['cantidad'],
+        'cantidad': celdas['cantidad'],
+    }).reset_index(drop=True)
+
+
+def puntos_mapa_calor(df_celdas, rango_anios, zoom=NIVEL_POR_DEFECTO):
+    '''
+    Devuelve la lista [latitud, longitud, peso] de las celdas, lista para folium.plugins.HeatMap.
+    '''
+    return combinar_celdas(df_celdas, rango_anios, zoom).to_numpy().tolist()
+
+
+def guardar_mapa_calor(df_celdas, ruta=RUTA_MAPA_CALOR):
+    df_celdas.to_parquet(ruta, index=False)
+
+
+def cargar_mapa_calor(ruta=RUTA_MAPA_CALOR):
+    return pd.read_parquet(ruta)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Preagrega los siniestros en grillas para el mapa de calor.')
+    parser.add_argument('--siniestros', default=datos.RUTA_DATASET, help='Dataset particionado de siniestros (con los deltas de ingesta.py)')
+    parser.add_argument('--destino', default=RUTA_MAPA_CALOR, help='Parquet de salida')
+    args = parser.parse_args()
+
+    celdas = agregar_mapa_calor(datos.cargar_siniestros(columnas=['anio', 'latitud', 'longitud'], ruta=args.siniestros))
+    guardar_mapa_calor(celdas, args.destino)
+    print(f'Mapa de calor guardado en {args.destino}: {len(celdas)} celdas en {len(NIVELES_ZOOM)} niveles')
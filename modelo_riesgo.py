@@ -0,0 +1,193 @@
+## MODELO DE RIESGO DE SINIESTROS GRAVES
+# Entrenamiento fuera de línea: un RandomForest (en paralelo con n_jobs) estima la probabilidad
+# de que un siniestro tenga heridos o fallecidos a partir de la hora, el día de la semana, el
+# mes, el tipo de vía, la calzada, la luz, el clima y la celda de la grilla del mapa de calor.
+# El modelo se guarda con joblib y se precalcula, con predict_proba por lotes, una tabla de
+# riesgo por celda x hora x día de la semana. El dashboard sólo consulta esa tabla: no entrena
+# ni carga scikit-learn en cada ejecución.
+#
+# Uso:
+#     python modelo_riesgo.py
+#     python modelo_riesgo.py --arboles 500 --procesos 4
+
+# Importaciones
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import datos
+import mapa_calor
+
+# Constantes
+RUTA_MODELO = 'Datasets_limpios/modelo_riesgo.joblib'
+RUTA_TABLA = 'Datasets_limpios/riesgo_celdas.parquet'
+NIVEL_CELDA = 13  # nivel de zoom de la grilla de mapa_calor (celdas de ~150 m)
+NUMERICAS = ['hora_num', 'dia_semana', 'mes', 'celda_x', 'celda_y']
+CATEGORICAS = ['tipo_via', 'material_de_la_calzada', 'luz_artificial', 'condiciones_climaticas']
+COLUMNAS = ['anio', 'mes', 'dia', 'hora_num', 'latitud', 'longitud', 'heridos', 'fallecidos'] + CATEGORICAS
+TAMANIO_LOTE = 50_000
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+# Funciones
+def preparar_variables(df, nivel=NIVEL_CELDA):
+    '''
+    Arma las variables del modelo y el objetivo (1 si hubo heridos o fallecidos).
+
+    Returns:
+        tuple: (DataFrame de variables NUMERICAS + CATEGORICAS, Series objetivo).
+    '''
+    df = df.dropna(subset=['hora_num', 'latitud', 'longitud'])
+    tamanio = mapa_calor.tamanio_celda(nivel)
+    fechas = pd.to_datetime(pd.DataFrame({'year': df['anio'], 'month': df['mes'], 'day': df['dia']}), errors='coerce')
+
+    variables = pd.DataFrame({
+        'hora_num': df['hora_num'].astype('int16'),
+        'dia_semana': fechas.dt.dayofweek.astype('int16'),
+        'mes': df['mes'].astype('int16'),
+        'celda_x': np.floor(df['longitud'].to_numpy(dtype=np.float64) / tamanio).astype(np.int32),
+        'celda_y': np.floor(df['latitud'].to_numpy(dtype=np.float64) / tamanio).astype(np.int32),
+    }, index=df.index)
+    for columna in CATEGORICAS:
+        variables[columna] = df[columna].astype(str)
+    objetivo = ((df['heridos'] > 0) | (df['fallecidos'] > 0)).astype('int8')
+    return variables, objetivo
+
+
+def entrenar(variables, objetivo, arboles=300, procesos=-1, semilla=0):
+    '''
+    Entrena el modelo (codificación ordinal de las categóricas + RandomForest) y lo evalúa.
+
+    Parameters:
+        arboles (int): Cantidad de árboles del bosque.
+        procesos (int): n_jobs de scikit-learn (-1 usa todos los núcleos).
+
+    Returns:
+        tuple: (Pipeline entrenado con todos los datos, dict de métricas sobre un 20 % reservado).
+    '''
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OrdinalEncoder
+
+    def nuevo_modelo():
+        codificador = ColumnTransformer(
+            [('categoricas', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), CATEGORICAS)],
+            remainder='passthrough',
+        )
+        bosque = RandomForestClassifier(
+            n_estimators=arboles, min_samples_leaf=5, class_weight='balanced', n_jobs=procesos, random_state=semilla,
+        )
+        return Pipeline([('codificador', codificador), ('bosque', bosque)])
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        variables, objetivo, test_size=0.2, stratify=objetivo, random_state=semilla,
+    )
+    modelo = nuevo_modelo().fit(x_train, y_train)
+    probabilidades = modelo.predict_proba(x_test)[:, 1]
+    metricas = {
+        'auc': float(roc_auc_score(y_test, probabilidades)),
+        'exactitud': float(accuracy_score(y_test, probabilidades >= 0.5)),
+        'filas': int(len(variables)),
+    }
+    return nuevo_modelo().fit(variables, objetivo), metricas
+
+
+def construir_tabla(modelo, variables, tamanio_lote=TAMANIO_LOTE):
+    '''
+    Precalcula la probabilidad de siniestro grave para cada celda con siniestros x hora x día.
+
+    Las variables que no son dimensiones de la tabla toman su valor más frecuente: por celda
+    para el tipo de vía y la calzada, por hora para la luz artificial y global para el mes y el clima.
+
+    Returns:
+        pandas.DataFrame: 'celda_x', 'celda_y', 'hora_num', 'dia_semana' y 'probabilidad' (float32).
+    '''
+    celdas = variables.groupby(['celda_x', 'celda_y'])[['tipo_via', 'material_de_la_calzada']].agg(
+        lambda valores: valores.mode().iloc[0]
+    ).reset_index()
+    luz_por_hora = variables.groupby('hora_num')['luz_artificial'].agg(lambda valores: valores.mode().iloc[0])
+
+    horarios = pd.MultiIndex.from_product([range(24), range(7)], names=['hora_num', 'dia_semana']).to_frame(index=False)
+    grilla = celdas.merge(horarios, how='cross')
+    grilla['mes'] = variables['mes'].mode().iloc[0]
+    grilla['condiciones_climaticas'] = variables['condiciones_climaticas'].mode().iloc[0]
+    grilla['luz_artificial'] = grilla['hora_num'].map(luz_por_hora).fillna(variables['luz_artificial'].mode().iloc[0])
+
+    entradas = grilla[NUMERICAS + CATEGORICAS]
+    probabilidad = np.concatenate([
+        modelo.predict_proba(entradas.iloc[inicio:inicio + tamanio_lote])[:, 1]
+        for inicio in range(0, len(entradas), tamanio_lote)
+    ])
+    tabla = grilla[['celda_x', 'celda_y', 'hora_num', 'dia_semana']].astype({'hora_num': 'int8', 'dia_semana': 'int8'})
+    tabla['probabilidad'] = probabilidad.astype(np.float32)
+    return tabla
+
+
+def guardar_tabla(tabla, ruta=RUTA_TABLA):
+    tabla.to_parquet(ruta, index=False)
+
+
+def cargar_tabla(ruta=RUTA_TABLA):
+    return pd.read_parquet(ruta)
+
+
+def indexar_tabla(tabla):
+    '''
+    Convierte la tabla en un diccionario {(celda_x, celda_y, hora, dia_semana): probabilidad} para consultas O(1).
+    '''
+    claves = zip(tabla['celda_x'].tolist(), tabla['celda_y'].tolist(), tabla['hora_num'].tolist(), tabla['dia_semana'].tolist())
+    return dict(zip(claves, tabla['probabilidad'].tolist()))
+
+
+def consultar_riesgo(indice, lat, lon, hora, dia_semana, nivel=NIVEL_CELDA):
+    '''
+    Devuelve la probabilidad precalculada para un punto y horario, o None si la celda no tiene siniestros.
+
+    Parameters:
+        indice (dict): Resultado de indexar_tabla.
+        lat, lon (float): Coordenadas del punto.
+        hora (int): Hora del día (0-23).
+        dia_semana (int): 0 = lunes ... 6 = domingo.
+    '''
+    tamanio = mapa_calor.tamanio_celda(nivel)
+    return indice.get((int(np.floor(lon / tamanio)), int(np.floor(lat / tamanio)), int(hora), int(dia_semana)))
+
+
+def riesgo_por_horario(tabla, hora, dia_semana, nivel=NIVEL_CELDA):
+    '''
+    Devuelve el centro de cada celda y su probabilidad para una hora y día de la semana.
+
+    Returns:
+        pandas.DataFrame: 'latitud', 'longitud' y 'probabilidad'.
+    '''
+    tamanio = mapa_calor.tamanio_celda(nivel)
+    seleccion = tabla[(tabla['hora_num'] == hora) & (tabla['dia_semana'] == dia_semana)]
+    return pd.DataFrame({
+        'latitud': (seleccion['celda_y'].to_numpy() + 0.5) * tamanio,
+        'longitud': (seleccion['celda_x'].to_numpy() + 0.5) * tamanio,
+        'probabilidad': seleccion['probabilidad'].to_numpy(),
+    })
+
+
+if __name__ == '__main__':
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Entrena el modelo de riesgo y precalcula su tabla de consulta.')
+    parser.add_argument('--arboles', type=int, default=300, help='Cantidad de árboles del RandomForest')
+    parser.add_argument('--procesos', type=int, default=-1, help='n_jobs para entrenar y predecir (-1: todos los núcleos)')
+    parser.add_argument('--modelo', default=RUTA_MODELO, help='Archivo joblib del modelo')
+    parser.add_argument('--tabla', default=RUTA_TABLA, help='Parquet de la tabla de riesgo')
+    args = parser.parse_args()
+
+    x, y = preparar_variables(datos.cargar_siniestros(columnas=COLUMNAS))
+    modelo_riesgo, metricas_modelo = entrenar(x, y, args.arboles, args.procesos)
+    joblib.dump(modelo_riesgo, args.modelo, compress=3)
+    tabla_riesgo = construir_tabla(modelo_riesgo, x)
+    guardar_tabla(tabla_riesgo, args.tabla)
+    print(f"Modelo guardado en {args.modelo}: AUC {metricas_modelo['auc']:.3f}, "
+          f"exactitud {metricas_modelo['exactitud']:.3f} sobre el 20 % reservado ({metricas_modelo['filas']} siniestros)")
+    print(f'Tabla de riesgo guardada en {args.tabla}: {len(tabla_riesgo)} combinaciones celda x hora x día')
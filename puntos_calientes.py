@@ -0,0 +1,141 @@
+## PUNTOS CALIENTES PARA LA RECOMENDACIÓN DE SEMÁFOROS
+# Agrupa los siniestros cercanos entre sí (por defecto, los de semáforos que no funcionan, como
+# en el dashboard original; ver ESTADOS_SEMAFORO) en sitios, en lugar de contar pares exactos de
+# coordenadas. Los siniestros se asignan por año a una grilla de celdas de RADIO metros (hash
+# espacial); al cambiar el rango de años sólo se suman las celdas de los años elegidos. Los
+# sitios se eligen de forma voraz con un heap: el de mayor cantidad de siniestros en su
+# vecindario de 3x3 celdas, luego el siguiente entre las celdas restantes, etc. Los sitios a
+# menos de DISTANCIA_SEMAFORO metros de un semáforo ya instalado se descartan con un KD-tree.
+#
+# Uso:
+#     python puntos_calientes.py --desde 2018 --hasta 2024 --cantidad 5
+#     python puntos_calientes.py --estados "No Funciona" "Sin Semáforo"
+
+# Importaciones
+import argparse
+import heapq
+
+import numpy as np
+import pandas as pd
+
+import datos
+from indice_espacial import IndicePuntos, proyectar
+
+# Constantes
+RUTA_SEMAFOROS = 'Datasets_limpios/semaforos_lat_lng.csv'
+RADIO = 50.0  # metros; lado de cada celda de la grilla
+DISTANCIA_SEMAFORO = 50.0  # metros; sitios más cerca de un semáforo existente se descartan
+CANTIDAD = 5
+ESTADOS_SEMAFORO = ['No Funciona']  # valores de 'semaforo' de los siniestros que se agrupan
+VECINOS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+# Funciones
+def agregar_celdas(df, radio=RADIO, estados=ESTADOS_SEMAFORO):
+    '''
+    Asigna los siniestros con alguno de los estados de semáforo dados a celdas de la grilla, por año.
+
+    Parameters:
+        df (pandas.DataFrame): Siniestros con 'anio', 'latitud', 'longitud' y 'semaforo'.
+        radio (float): Lado de la celda en metros.
+        estados (list): Valores de 'semaforo' que se consideran (por defecto, 'No Funciona').
+
+    Returns:
+        pandas.DataFrame: Una fila por (anio, celda) con 'cantidad', 'suma_lat' y 'suma_lon'.
+    '''
+    df = df[df['semaforo'].isin(estados)].dropna(subset=['latitud', 'longitud'])
+    lat = df['latitud'].to_numpy(dtype=np.float64)
+    lon = df['longitud'].to_numpy(dtype=np.float64)
+    x, y = proyectar(lat, lon)
+    celdas = pd.DataFrame({
+        'anio': df['anio'].to_numpy(dtype=np.int16),
+        'celda_x': np.floor(x / radio).astype(np.int32),
+        'celda_y': np.floor(y / radio).astype(np.int32),
+        'cantidad': np.int32(1),
+        'suma_lat': lat,
+        'suma_lon': lon,
+    })
+    return celdas.groupby(['anio', 'celda_x', 'celda_y'], as_index=False).sum()
+
+
+def cargar_indice_semaforos(ruta=RUTA_SEMAFOROS):
+    '''
+    Construye el índice espacial de los semáforos relevados (se omiten los que no tienen coordenadas).
+    '''
+    df = pd.read_csv(ruta).dropna(subset=['lat', 'lng'])
+    return IndicePuntos(df['lat'].to_numpy(), df['lng'].to_numpy())
+
+
+def puntos_calientes(df_celdas, rango_anios, cantidad=CANTIDAD, indice_semaforos=None,
+                     distancia_semaforo=DISTANCIA_SEMAFORO):
+    '''
+    Devuelve los sitios con más siniestros en el rango de años, lejos de los semáforos existentes.
+
+    Cada sitio reúne las celdas de un vecindario de 3x3 (hasta 1,5 * radio del centro) y cada
+    celda se asigna a un solo sitio. El heap guarda el puntaje de cada celda y se corrige de
+    forma perezosa al sacarla si sus vecinas ya fueron asignadas a otro sitio.
+
+    Parameters:
+        df_celdas (pandas.DataFrame): Resultado de agregar_celdas.
+        rango_anios (tuple): (año inicial, año final), ambos inclusive.
+        cantidad (int): Cantidad de sitios a devolver.
+        indice_semaforos (IndicePuntos, opcional): Semáforos existentes; si es None no se excluye nada.
+        distancia_semaforo (float): Distancia en metros por debajo de la cual un sitio se descarta.
+
+    Returns:
+        pandas.DataFrame: 'latitud', 'longitud' (centroide), 'cantidad_siniestros' y
+        'distancia_semaforo' (metros al semáforo más cercano), ordenado de mayor a menor.
+    '''
+    seleccion = df_celdas[df_celdas['anio'].between(*rango_anios)]
+    sumas = seleccion.groupby(['celda_x', 'celda_y'])[['cantidad', 'suma_lat', 'suma_lon']].sum()
+    celdas = {clave: fila for clave, fila in zip(sumas.index, sumas.to_numpy())}
+
+    def puntaje(cx, cy):
+        return sum(celdas[(cx + dx, cy + dy)][0] for dx, dy in VECINOS if (cx + dx, cy + dy) in celdas)
+
+    heap = [(-puntaje(cx, cy), cx, cy) for cx, cy in celdas]
+    heapq.heapify(heap)
+
+    sitios = []
+    while heap and len(sitios) < cantidad:
+        negativo, cx, cy = heapq.heappop(heap)
+        actual = puntaje(cx, cy)
+        if actual == 0:
+            continue
+        if actual != -negativo:
+            heapq.heappush(heap, (-actual, cx, cy))
+            continue
+
+        vecinas = [celdas.pop((cx + dx, cy + dy)) for dx, dy in VECINOS if (cx + dx, cy + dy) in celdas]
+        total, suma_lat, suma_lon = np.sum(vecinas, axis=0)
+        lat, lon = suma_lat / total, suma_lon / total
+
+        distancia = np.inf
+        if indice_semaforos is not None and len(indice_semaforos):
+            distancia = float(indice_semaforos.consultar(lat, lon)[1][0])
+        if distancia >= distancia_semaforo:
+            sitios.append((lat, lon, int(total), distancia))
+
+    return pd.DataFrame(sitios, columns=['latitud', 'longitud', 'cantidad_siniestros', 'distancia_semaforo'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sitios con más siniestros en semáforos que no funcionan.')
+    parser.add_argument('--desde', type=int, default=None, help='Año inicial (por defecto, el primero)')
+    parser.add_argument('--hasta', type=int, default=None, help='Año final (por defecto, el último)')
+    parser.add_argument('--cantidad', type=int, default=CANTIDAD, help='Cantidad de sitios')
+    parser.add_argument('--radio', type=float, default=RADIO, help='Lado de la celda en metros')
+    parser.add_argument('--distancia-semaforo', type=float, default=DISTANCIA_SEMAFORO,
+                        help='Distancia mínima en metros a un semáforo existente')
+    parser.add_argument('--estados', nargs='+', default=ESTADOS_SEMAFORO,
+                        help="Valores de 'semaforo' de los siniestros a agrupar (por ejemplo, 'Sin Semáforo')")
+    args = parser.parse_args()
+
+    anios = datos.anios_disponibles()
+    rango = (args.desde or anios[0], args.hasta or anios[-1])
+    df_siniestros = datos.cargar_siniestros(rango, ['anio', 'latitud', 'longitud', 'semaforo'])
+    sitios_calientes = puntos_calientes(
+        agregar_celdas(df_siniestros, args.radio, args.estados), rango, args.cantidad,
+        cargar_indice_semaforos(), args.distancia_semaforo,
+    )
+    print(sitios_calientes.to_string(index=False))
@@ -0,0 +1,362 @@
+## RED VIAL COMPACTA PARA EL CÁLCULO DE RUTAS
+# La red de calles de Corrientes se compila una sola vez (paso offline) a un formato CSR
+# de arreglos numpy. El dashboard la abre mediante memory-map, de modo que todos los
+# procesos y sesiones comparten las mismas páginas de memoria y no se reconstruye ningún grafo.
+#
+# Uso del paso offline:
+#     python red_vial.py                      # compila desde el JSON de Overpass en cache/
+#     python red_vial.py --descargar          # descarga la red con OSMnx y la compila
+
+# Importaciones
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+from indice_espacial import IndiceAristas, IndicePuntos
+
+# Constantes
+DIRECTORIO_RED = 'Datasets_limpios/red_vial'
+RUTA_OVERPASS = 'cache/18edd754d62d2079448e7d47da82bd9153e0820c.json'
+CENTRO = (-27.4668, -58.8467)
+DISTANCIA = 2000
+DISTANCIA_MAXIMA_NODO = 500.0  # metros; un punto más lejos de todos los nodos está fuera de la red
+ARREGLOS = ('indptr', 'indices', 'longitud', 'lat', 'lon', 'osmid')
+ARREGLOS_RIESGO = ('riesgo', 'semaforos')
+
+
+@dataclass
+class RedVial:
+    '''
+    Red vial dirigida en formato CSR (Compressed Sparse Row).
+
+    Las aristas que salen del nodo i ocupan las posiciones indptr[i]:indptr[i + 1] de los
+    arreglos 'indices' (nodo destino) y 'longitud' (metros). Los nodos se identifican por su
+    posición (0..n-1); 'osmid' guarda el identificador original de OpenStreetMap.
+    'riesgo' (por arista) y 'semaforos' (por nodo), si fueron precalculados, provienen de riesgo_vial.py.
+    'medias' (longitud y riesgo medios) sólo se indica cuando la red es un recorte de una más
+    grande (ver teselas.py), para que el costo de cada arista no dependa del recorte.
+    Los índices espaciales de nodos y aristas se construyen una vez y quedan junto a la red, igual
+    que las matrices de costos y las jerarquías de contracción (ver jerarquias.py). Las matrices
+    se crean bajo un lock, así varios hilos pueden pedir la misma sin armarla dos veces ni pisar
+    el diccionario.
+    '''
+    indptr: np.ndarray
+    indices: np.ndarray
+    longitud: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    osmid: np.ndarray
+    version: str = ''
+    riesgo: np.ndarray = None
+    semaforos: np.ndarray = None
+    version_riesgo: str = ''
+    medias: tuple = None
+    _matrices: dict = field(default_factory=dict, repr=False)
+    _jerarquias: dict = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def cantidad_nodos(self):
+        return len(self.lat)
+
+    @property
+    def cantidad_aristas(self):
+        return len(self.indices)
+
+    @cached_property
+    def indice_nodos(self):
+        return IndicePuntos(self.lat, self.lon)
+
+    @cached_property
+    def indice_aristas(self):
+        origen = origenes_aristas(self)
+        return IndiceAristas(self.lat[origen], self.lon[origen], self.lat[self.indices], self.lon[self.indices])
+
+    def matriz(self, pesos=None, clave='longitud'):
+        '''
+        Devuelve la matriz dispersa de adyacencia (float64) que usa scipy para Dijkstra.
+
+        La matriz de longitudes se arma sobre los propios arreglos de la red: como las longitudes
+        se guardan en float64 (el tipo que usa scipy), no se copian y siguen compartiendo el
+        memory-map entre procesos. Para pesos personalizados se indica una 'clave' distinta y el
+        resultado también queda guardado.
+        '''
+        from scipy.sparse import csr_matrix
+
+        matriz = self._matrices.get(clave)
+        if matriz is not None:
+            return matriz
+        with self._lock:
+            if clave not in self._matrices:
+                datos = self.longitud if pesos is None else pesos
+                n = self.cantidad_nodos
+                self._matrices[clave] = csr_matrix(
+                    (np.asarray(datos, dtype=np.float64), np.asarray(self.indices), np.asarray(self.indptr)),
+                    shape=(n, n), copy=False,
+                )
+            return self._matrices[clave]
+
+
+# Funciones
+def descargar_grafo(ruta_json=RUTA_OVERPASS, centro=CENTRO, distancia=DISTANCIA):
+    '''
+    Obtiene el grafo vial de OSMnx (MultiDiGraph simplificado) de la zona de interés.
+
+    Si existe la respuesta de Overpass guardada en 'cache/', el grafo se arma a partir de ella
+    sin acceder a internet. En caso contrario se descarga con ox.graph_from_point.
+
+    Parameters:
+        ruta_json (str): Ruta a la respuesta JSON de Overpass.
+        centro (tuple): (latitud, longitud) del punto central, usado sólo al descargar.
+        distancia (int): Radio en metros alrededor del centro, usado sólo al descargar.
+
+    Returns:
+        networkx.MultiDiGraph: El grafo vial de la red 'drive'.
+    '''
+    import osmnx as ox
+
+    if ruta_json and os.path.exists(ruta_json):
+        with open(ruta_json, encoding='utf-8') as archivo:
+            respuesta = json.load(archivo)
+        # La respuesta se pasa a XML de OSM y se arma con la API pública de OSMnx: graph_from_xml
+        # conserva la componente más grande y simplifica el grafo, igual que graph_from_point
+        with tempfile.TemporaryDirectory() as temporal:
+            ruta_xml = os.path.join(temporal, 'red.osm')
+            overpass_a_xml(respuesta, ruta_xml)
+            return ox.graph_from_xml(ruta_xml, bidirectional=False, simplify=True, retain_all=False)
+
+    return ox.graph_from_point(centro, dist=distancia, network_type='drive')
+
+
+def overpass_a_xml(respuesta, ruta_xml):
+    '''
+    Escribe los nodos y calles de una respuesta JSON de Overpass como un archivo XML de OSM.
+    '''
+    import xml.etree.ElementTree as ET
+
+    raiz = ET.Element('osm', version='0.6', generator='red_vial.py')
+    for elemento in respuesta['elements']:
+        if elemento['type'] == 'node':
+            nodo = ET.SubElement(raiz, 'node', id=str(elemento['id']), lat=str(elemento['lat']), lon=str(elemento['lon']))
+            etiquetas, padre = elemento.get('tags', {}), nodo
+        elif elemento['type'] == 'way':
+            padre = ET.SubElement(raiz, 'way', id=str(elemento['id']))
+            for referencia in elemento['nodes']:
+                ET.SubElement(padre, 'nd', ref=str(referencia))
+            etiquetas = elemento.get('tags', {})
+        else:
+            continue
+        for clave, valor in etiquetas.items():
+            ET.SubElement(padre, 'tag', k=clave, v=str(valor))
+    ET.ElementTree(raiz).write(ruta_xml, encoding='utf-8', xml_declaration=True)
+
+
+def compilar_csr(G):
+    '''
+    Convierte un grafo de OSMnx en una RedVial con arreglos compactos.
+
+    Las aristas paralelas entre el mismo par de nodos se reducen a la de menor longitud,
+    que es la única que puede formar parte de un camino mínimo.
+
+    Parameters:
+        G (networkx.MultiDiGraph): Grafo vial con atributos 'x', 'y' en los nodos y 'length' en las aristas.
+
+    Returns:
+        RedVial: La red compilada en memoria.
+    '''
+    osmid = np.array(sorted(G.nodes), dtype=np.int64)
+    posicion = {nodo: i for i, nodo in enumerate(osmid.tolist())}
+    lat = np.array([G.nodes[n]['y'] for n in osmid.tolist()], dtype=np.float32)
+    lon = np.array([G.nodes[n]['x'] for n in osmid.tolist()], dtype=np.float32)
+
+    aristas = [(posicion[u], posicion[v], datos.get('length', 0.0)) for u, v, datos in G.edges(data=True)]
+    origen, destino, longitud = (np.array(col) for col in zip(*aristas))
+
+    # Ordenar por (origen, destino, longitud) y quedarse con la primera arista de cada par
+    orden = np.lexsort((longitud, destino, origen))
+    origen, destino, longitud = origen[orden], destino[orden], longitud[orden]
+    unicas = np.ones(len(origen), dtype=bool)
+    unicas[1:] = (origen[1:] != origen[:-1]) | (destino[1:] != destino[:-1])
+    origen, destino, longitud = origen[unicas], destino[unicas], longitud[unicas]
+
+    indptr = np.zeros(len(osmid) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(origen, minlength=len(osmid)), out=indptr[1:])
+
+    return RedVial(
+        indptr=indptr,
+        indices=destino.astype(np.int32),
+        longitud=longitud.astype(np.float64),  # el tipo de scipy: la matriz de Dijkstra no copia el memory-map
+        lat=lat,
+        lon=lon,
+        osmid=osmid,
+    )
+
+
+def guardar_red(red, directorio=DIRECTORIO_RED):
+    '''
+    Guarda la red como archivos .npy (uno por arreglo) más un 'meta.json' con su versión.
+
+    Returns:
+        str: La versión (hash del contenido) de la red guardada.
+    '''
+    os.makedirs(directorio, exist_ok=True)
+    huella = hashlib.sha1()
+    for nombre in ARREGLOS:
+        arreglo = np.ascontiguousarray(getattr(red, nombre))
+        np.save(os.path.join(directorio, f'{nombre}.npy'), arreglo)
+        huella.update(arreglo.tobytes())
+
+    red.version = huella.hexdigest()[:16]
+    meta = {'version': red.version, 'nodos': red.cantidad_nodos, 'aristas': red.cantidad_aristas}
+    with open(os.path.join(directorio, 'meta.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo, indent=2)
+    return red.version
+
+
+def cargar_red(directorio=DIRECTORIO_RED):
+    '''
+    Abre la red compilada mediante memory-map, sin copiar los arreglos a memoria.
+
+    Parameters:
+        directorio (str): Carpeta generada por guardar_red.
+
+    Returns:
+        RedVial: La red lista para consultas de ruteo.
+    '''
+    with open(os.path.join(directorio, 'meta.json'), encoding='utf-8') as archivo:
+        meta = json.load(archivo)
+    arreglos = {
+        nombre: np.load(os.path.join(directorio, f'{nombre}.npy'), mmap_mode='r')
+        for nombre in ARREGLOS
+    }
+    red = RedVial(**arreglos, version=meta['version'])
+
+    if meta.get('version_riesgo'):
+        for nombre in ARREGLOS_RIESGO:
+            ruta = os.path.join(directorio, f'{nombre}.npy')
+            if os.path.exists(ruta):
+                setattr(red, nombre, np.load(ruta, mmap_mode='r'))
+        red.version_riesgo = meta['version_riesgo']
+    return red
+
+
+def version_guardada(directorio=DIRECTORIO_RED):
+    '''
+    Devuelve la versión de la red y del riesgo guardados en disco, leyendo sólo 'meta.json'.
+
+    Sirve para notar que red_vial.py o riesgo_vial.py regeneraron la red mientras un proceso
+    conserva abierta la anterior.
+
+    Returns:
+        tuple: (versión de la red, versión del riesgo o '' si no fue precalculado).
+    '''
+    with open(os.path.join(directorio, 'meta.json'), encoding='utf-8') as archivo:
+        meta = json.load(archivo)
+    return meta['version'], meta.get('version_riesgo', '')
+
+
+def origenes_aristas(red):
+    '''
+    Devuelve, para cada arista, la posición de su nodo de origen (la inversa de indptr).
+    '''
+    return np.repeat(np.arange(red.cantidad_nodos, dtype=np.int32), np.diff(red.indptr))
+
+
+def nodos_mas_cercanos(red, lat, lon):
+    '''
+    Asigna en lote cada punto (lat, lon) al nodo más cercano de la red usando su KD-tree.
+
+    Returns:
+        tuple: (posiciones de los nodos, distancias en metros) como arreglos numpy.
+    '''
+    return red.indice_nodos.consultar(lat, lon)
+
+
+def nodo_mas_cercano(red, lat, lon):
+    '''
+    Devuelve la posición del nodo de la red más cercano a un único punto (lat, lon).
+    '''
+    posiciones, _ = nodos_mas_cercanos(red, lat, lon)
+    return int(posiciones[0])
+
+
+def rutas_mas_cortas(red, origen, destinos, pesos=None, clave='longitud'):
+    '''
+    Calcula los caminos mínimos desde un nodo hacia varios destinos con una sola ejecución de Dijkstra.
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        origen (int): Posición del nodo de inicio.
+        destinos (list): Posiciones de los nodos de destino.
+        pesos (numpy.ndarray, opcional): Costo por arista alineado con red.indices. Por defecto la longitud.
+        clave (str): Nombre con el que se guarda la matriz de pesos en la red.
+
+    Returns:
+        list: Para cada destino, las posiciones de los nodos de la ruta (desde el origen), o None
+        si no existe un camino.
+    '''
+    from scipy.sparse.csgraph import dijkstra
+
+    _, predecesores = dijkstra(red.matriz(pesos, clave), directed=True, indices=origen, return_predecessors=True)
+
+    rutas = []
+    for destino in destinos:
+        if origen != destino and predecesores[destino] < 0:
+            rutas.append(None)
+            continue
+        ruta = [int(destino)]
+        while ruta[-1] != origen:
+            ruta.append(int(predecesores[ruta[-1]]))
+        rutas.append(ruta[::-1])
+    return rutas
+
+
+def ruta_mas_corta(red, origen, destino, pesos=None, clave='longitud'):
+    '''
+    Calcula el camino mínimo entre dos nodos de la red con Dijkstra (scipy.sparse.csgraph).
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        origen (int): Posición del nodo de inicio.
+        destino (int): Posición del nodo de destino.
+        pesos (numpy.ndarray, opcional): Costo por arista alineado con red.indices. Por defecto la longitud.
+        clave (str): Nombre con el que se guarda la matriz de pesos en la red.
+
+    Returns:
+        list: Posiciones de los nodos que forman la ruta, desde el origen hasta el destino.
+
+    Raises:
+        ValueError: Si no existe un camino entre ambos nodos.
+    '''
+    ruta = rutas_mas_cortas(red, origen, [destino], pesos, clave)[0]
+    if ruta is None:
+        raise ValueError(f'No existe una ruta entre los nodos {origen} y {destino}')
+    return ruta
+
+
+def coordenadas_ruta(red, ruta):
+    '''
+    Devuelve la lista de (latitud, longitud) de los nodos de una ruta, lista para folium.PolyLine.
+    '''
+    ruta = np.asarray(ruta)
+    return list(zip(red.lat[ruta].astype(float), red.lon[ruta].astype(float)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compila la red vial de Corrientes al formato CSR.')
+    parser.add_argument('--descargar', action='store_true', help='Descargar la red con OSMnx en lugar de usar cache/')
+    parser.add_argument('--destino', default=DIRECTORIO_RED, help='Carpeta de salida')
+    args = parser.parse_args()
+
+    grafo = descargar_grafo(None if args.descargar else RUTA_OVERPASS)
+    red_compilada = compilar_csr(grafo)
+    version = guardar_red(red_compilada, args.destino)
+    print(f'Red vial guardada en {args.destino}: {red_compilada.cantidad_nodos} nodos, '
+          f'{red_compilada.cantidad_aristas} aristas (versión {version})')
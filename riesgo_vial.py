@@ -0,0 +1,283 @@
+## RIESGO DE SINIESTROS POR ARISTA Y RUTA SEGURA
+# Precálculo por lotes: cada siniestro del dataset particionado de datos.py (con los deltas de
+# ingesta.py) se asigna a la calle (arista) más cercana de la red compilada y se acumula un
+# riesgo por arista ponderado por heridos y fallecidos. Con ese arreglo guardado junto a la red, una ruta segura cuesta lo mismo que un
+# camino mínimo común: sólo cambian los pesos de las aristas. Las matrices de muchos orígenes a
+# muchos destinos (matriz_costos) se resuelven con un Dijkstra de scipy por bloque de orígenes.
+#
+# Uso del paso offline (después de python red_vial.py); también actualiza las teselas de teselas.py:
+#     python riesgo_vial.py
+
+# Importaciones
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+import red_vial
+
+# Constantes
+RUTA_SEMAFOROS = 'Datasets_limpios/semaforos_lat_lng.csv'
+PESO_SINIESTRO = 1.0
+PESO_HERIDO = 1.0
+PESO_FALLECIDO = 10.0
+DISTANCIA_MAXIMA = 50.0  # metros; siniestros más lejos de toda calle de la red se descartan
+DISTANCIA_SEMAFORO = 30.0  # metros; semáforos más lejos de todo nodo (intersección) se descartan
+EPSILON_LONGITUD = 1e-3
+BLOQUE_ORIGENES = 256  # orígenes por Dijkstra en matriz_costos (cada uno ocupa una fila de n costos)
+
+
+# Funciones
+def aristas_mas_cercanas(red, lat, lon):
+    '''
+    Encuentra en lote, para cada punto, la arista de la red más cercana y la distancia a ella.
+
+    Las aristas se aproximan por el segmento recto entre sus nodos y se consultan a través del
+    índice espacial de la red (ver indice_espacial.IndiceAristas).
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        lat, lon (array-like): Coordenadas de los puntos.
+
+    Returns:
+        tuple: (posición de la arista, distancia en metros) como arreglos numpy.
+    '''
+    return red.indice_aristas.consultar(lat, lon)
+
+
+def aristas_inversas(red):
+    '''
+    Devuelve, para cada arista u->v, la posición de la arista v->u o -1 si la calle es de mano única.
+    '''
+    n = red.cantidad_nodos
+    origen = red_vial.origenes_aristas(red).astype(np.int64)
+    destino = np.asarray(red.indices, dtype=np.int64)
+    claves = origen * n + destino  # ya ordenadas: CSR ordenado por (origen, destino)
+    buscadas = destino * n + origen
+    posiciones = np.searchsorted(claves, buscadas)
+    posiciones = np.minimum(posiciones, len(claves) - 1)
+    return np.where(claves[posiciones] == buscadas, posiciones, -1)
+
+
+def calcular_riesgo(red, df_siniestros, distancia_maxima=DISTANCIA_MAXIMA):
+    '''
+    Calcula el riesgo acumulado por arista a partir de los siniestros, en un único lote vectorizado.
+
+    Cada siniestro aporta PESO_SINIESTRO + PESO_HERIDO * heridos + PESO_FALLECIDO * fallecidos a la
+    arista más cercana y, si la calle es doble mano, también a la arista del sentido contrario.
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        df_siniestros (pandas.DataFrame): Siniestros con 'latitud', 'longitud', 'heridos' y 'fallecidos'.
+        distancia_maxima (float): Distancia en metros a partir de la cual un siniestro no se asigna.
+
+    Returns:
+        numpy.ndarray: Riesgo por arista (float32), alineado con red.indices.
+    '''
+    df = df_siniestros.dropna(subset=['latitud', 'longitud'])
+    posiciones, distancias = aristas_mas_cercanas(red, df['latitud'].to_numpy(), df['longitud'].to_numpy())
+
+    pesos = (
+        PESO_SINIESTRO
+        + PESO_HERIDO * df['heridos'].fillna(0).to_numpy()
+        + PESO_FALLECIDO * df['fallecidos'].fillna(0).to_numpy()
+    )
+    validos = distancias <= distancia_maxima
+    riesgo = np.bincount(posiciones[validos], weights=pesos[validos], minlength=red.cantidad_aristas)
+
+    inversas = aristas_inversas(red)
+    doble_mano = inversas >= 0
+    riesgo_total = riesgo.copy()
+    riesgo_total[doble_mano] += riesgo[inversas[doble_mano]]
+    return riesgo_total.astype(np.float32)
+
+
+def contar_semaforos(red, df_semaforos, distancia_maxima=DISTANCIA_SEMAFORO):
+    '''
+    Asigna en lote cada semáforo al nodo (intersección) más cercano y cuenta los semáforos por nodo.
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        df_semaforos (pandas.DataFrame): Semáforos con columnas 'lat' y 'lng'.
+        distancia_maxima (float): Distancia en metros a partir de la cual un semáforo no se asigna.
+
+    Returns:
+        numpy.ndarray: Cantidad de semáforos por nodo (uint8), alineado con red.lat.
+    '''
+    posiciones, distancias = red_vial.nodos_mas_cercanos(red, df_semaforos['lat'].to_numpy(), df_semaforos['lng'].to_numpy())
+    validos = distancias <= distancia_maxima
+    return np.bincount(posiciones[validos], minlength=red.cantidad_nodos).astype(np.uint8)
+
+
+def guardar_riesgo(riesgo, semaforos, directorio=red_vial.DIRECTORIO_RED):
+    '''
+    Guarda el riesgo por arista y los semáforos por nodo junto a la red, y registra su versión en 'meta.json'.
+
+    Returns:
+        str: La versión (hash del contenido) de los datos guardados.
+    '''
+    ruta_meta = os.path.join(directorio, 'meta.json')
+    with open(ruta_meta, encoding='utf-8') as archivo:
+        meta = json.load(archivo)
+    if len(riesgo) != meta['aristas'] or len(semaforos) != meta['nodos']:
+        raise ValueError('El riesgo no está alineado con la red guardada')
+
+    riesgo = np.ascontiguousarray(riesgo, dtype=np.float32)
+    semaforos = np.ascontiguousarray(semaforos, dtype=np.uint8)
+    np.save(os.path.join(directorio, 'riesgo.npy'), riesgo)
+    np.save(os.path.join(directorio, 'semaforos.npy'), semaforos)
+    meta['version_riesgo'] = hashlib.sha1(riesgo.tobytes() + semaforos.tobytes()).hexdigest()[:16]
+    with open(ruta_meta, 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo, indent=2)
+    return meta['version_riesgo']
+
+
+def costo_aristas(red, alpha):
+    '''
+    Combina longitud y riesgo en un costo por arista según el parámetro alpha.
+
+    Ambos términos se normalizan por su media (la de red.medias si la red es un recorte) para que
+    sean comparables: costo = (1 - alpha) * longitud / media_longitud + alpha * riesgo / media_riesgo.
+    Se suma una fracción mínima de la longitud para que, con alpha = 1, entre rutas igual de
+    seguras se prefiera la más corta.
+
+    Parameters:
+        red (RedVial): La red vial con el riesgo precalculado.
+        alpha (float): 0 minimiza sólo la distancia, 1 minimiza sólo el riesgo.
+
+    Returns:
+        numpy.ndarray: Costo por arista (float64), alineado con red.indices.
+    '''
+    if red.riesgo is None:
+        raise ValueError('La red no tiene riesgo precalculado; ejecute python riesgo_vial.py')
+
+    longitud = np.asarray(red.longitud, dtype=np.float64)
+    riesgo = np.asarray(red.riesgo, dtype=np.float64)
+    if red.medias is not None:
+        media_longitud, media_riesgo = red.medias
+    else:
+        media_longitud = longitud.mean()
+        media_riesgo = riesgo[riesgo > 0].mean() if (riesgo > 0).any() else 1.0
+
+    return (
+        (1 - alpha) * longitud / media_longitud
+        + alpha * riesgo / media_riesgo
+        + EPSILON_LONGITUD * longitud / media_longitud
+    )
+
+
+def clave_costo(red, alpha):
+    '''
+    Devuelve la clave con la que se guarda la matriz de costos de un alpha ('longitud' si el costo es sólo la distancia).
+    '''
+    alpha = round(float(alpha), 3)
+    if alpha == 0 or red.riesgo is None:
+        return 'longitud'
+    return f'riesgo-{red.version_riesgo}-{alpha}'
+
+
+def rutas_seguras(red, origen, destinos, alpha=0.5):
+    '''
+    Calcula las rutas de menor costo combinado longitud/riesgo desde un nodo hacia varios destinos.
+
+    La matriz de costos de cada alpha se arma una vez por proceso y queda guardada en la red,
+    por lo que las consultas siguientes cuestan lo mismo que un camino mínimo por longitud.
+
+    Returns:
+        list: Para cada destino, las posiciones de los nodos de la ruta, o None si no hay camino.
+    '''
+    alpha = round(float(alpha), 3)
+    clave = clave_costo(red, alpha)
+    if clave == 'longitud':
+        return red_vial.rutas_mas_cortas(red, origen, destinos)
+
+    pesos = None if clave in red._matrices else costo_aristas(red, alpha)
+    return red_vial.rutas_mas_cortas(red, origen, destinos, pesos=pesos, clave=clave)
+
+
+def ruta_segura(red, origen, destino, alpha=0.5):
+    '''
+    Calcula la ruta de menor costo combinado longitud/riesgo entre dos nodos.
+
+    Returns:
+        list: Posiciones de los nodos que forman la ruta.
+
+    Raises:
+        ValueError: Si no existe un camino entre ambos nodos.
+    '''
+    ruta = rutas_seguras(red, origen, [destino], alpha)[0]
+    if ruta is None:
+        raise ValueError(f'No existe una ruta entre los nodos {origen} y {destino}')
+    return ruta
+
+
+def matriz_costos(red, origenes, destinos, alpha=0.0, bloque=BLOQUE_ORIGENES):
+    '''
+    Calcula el costo mínimo de cada origen a cada destino (matriz de muchos a muchos).
+
+    Los orígenes repetidos se calculan una sola vez; cada bloque de orígenes es un único llamado
+    a Dijkstra de scipy que resuelve todos los destinos.
+
+    Parameters:
+        red (RedVial): La red vial compilada.
+        origenes, destinos (array-like): Posiciones de los nodos.
+        alpha (float): 0 para distancias en metros; entre 0 y 1 para el costo combinado con el riesgo.
+        bloque (int): Orígenes por llamado a Dijkstra.
+
+    Returns:
+        numpy.ndarray: Matriz (len(origenes), len(destinos)) de costos (float64), inf si no hay camino.
+    '''
+    from scipy.sparse.csgraph import dijkstra
+
+    alpha = round(float(alpha), 3)
+    clave = clave_costo(red, alpha)
+    pesos = None if clave == 'longitud' or clave in red._matrices else costo_aristas(red, alpha)
+    matriz = red.matriz(pesos, clave)
+    destinos = np.asarray(destinos, dtype=np.int64)
+    unicos, inversa = np.unique(np.asarray(origenes, dtype=np.int64), return_inverse=True)
+
+    costos = np.empty((len(unicos), len(destinos)))
+    for inicio in range(0, len(unicos), bloque):
+        filas = dijkstra(matriz, directed=True, indices=unicos[inicio:inicio + bloque])
+        costos[inicio:inicio + bloque] = filas[:, destinos]
+    return costos[inversa]
+
+
+def resumen_ruta(red, ruta):
+    '''
+    Devuelve la longitud total (metros), el riesgo acumulado y la cantidad de semáforos de una ruta.
+    '''
+    semaforos = int(np.asarray(red.semaforos)[ruta].sum()) if red.semaforos is not None else 0
+    longitud, riesgo = 0.0, 0.0
+    for u, v in zip(ruta[:-1], ruta[1:]):
+        inicio, fin = red.indptr[u], red.indptr[u + 1]
+        arista = inicio + int(np.searchsorted(red.indices[inicio:fin], v))
+        longitud += float(red.longitud[arista])
+        if red.riesgo is not None:
+            riesgo += float(red.riesgo[arista])
+    return longitud, riesgo, semaforos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precalcula el riesgo de siniestros por arista de la red vial.')
+    parser.add_argument('--siniestros', default=datos.RUTA_DATASET, help='Dataset particionado de siniestros (con los deltas de ingesta.py)')
+    parser.add_argument('--semaforos', default=RUTA_SEMAFOROS, help='CSV de semáforos')
+    parser.add_argument('--red', default=red_vial.DIRECTORIO_RED, help='Carpeta de la red compilada')
+    parser.add_argument('--teselas', default='Datasets_limpios/teselas', help='Carpeta de la red en teselas a actualizar')
+    args = parser.parse_args()
+
+    red_compilada = red_vial.cargar_red(args.red)
+    df = datos.cargar_siniestros(columnas=['latitud', 'longitud', 'heridos', 'fallecidos'], ruta=args.siniestros)
+    riesgo_aristas = calcular_riesgo(red_compilada, df)
+    semaforos_nodos = contar_semaforos(red_compilada, pd.read_csv(args.semaforos))
+    version = guardar_riesgo(riesgo_aristas, semaforos_nodos, args.red)
+    print(f'Riesgo guardado en {args.red}: {int((riesgo_aristas > 0).sum())} aristas con siniestros, '
+          f'{int((semaforos_nodos > 0).sum())} nodos con semáforo (versión {version})')
+
+    import teselas  # teselas.py importa este módulo: se importa sólo al ejecutarlo
+    meta_teselas = teselas.actualizar_teselas(args.red, args.teselas)
+    print(f"Teselas actualizadas en {args.teselas}: {len(meta_teselas['teselas'])} teselas (versión {meta_teselas['version']})")
@@ -0,0 +1,521 @@
+## SERVICIO DE RUTAS SEGURAS Y AGREGADOS SIN INTERFAZ
+# Expone el ruteo (carga de la red, asignación de puntos a nodos y ruta segura) y los
+# agregados por rango de años fuera de Streamlit, para que otros sistemas los consulten sin
+# una sesión del navegador y para escalar el ruteo por separado de los gráficos.
+#
+# La red y el cubo se cargan una sola vez por proceso. Los pedidos de rutas se resuelven en
+# lote: todos los puntos se asignan a nodos con una sola consulta al KD-tree, las rutas ya
+# calculadas salen de la caché LRU y las restantes se agrupan por (origen, alpha) para que un
+# solo Dijkstra responda a todos los destinos del mismo origen; si un origen tiene un único
+# destino y la red tiene jerarquías de contracción para ese alpha (ver jerarquias.py), la ruta
+# sale de sus etiquetas sin recorrer la red. Los puntos a más de red_vial.DISTANCIA_MAXIMA_NODO
+# de todo nodo están fuera de la red: su pedido responde un error.
+#
+# El Dijkstra de scipy no libera el GIL, así que repartir los grupos entre hilos no acelera el
+# ruteo. El servidor HTTP atiende cada conexión en su propio hilo y, para usar varios núcleos,
+# 'servir --procesos N' arranca N procesos que comparten el socket y la red (por memory-map).
+#
+# Funciona sin internet: usa la red compilada en Datasets_limpios/red_vial/ o, si no existe,
+# la compila desde la respuesta de Overpass guardada en cache/. Con --teselas usa en cambio la
+# red particionada por teselas.py (varias ciudades o la provincia): cada pedido carga sólo las
+# teselas de su corredor y la memoria queda acotada por la caché de teselas.
+#
+# Uso:
+#     python servicio.py servir --puerto 8000 --procesos 4
+#     python servicio.py lote pedidos.csv --salida rutas.jsonl
+#     python servicio.py --teselas Datasets_limpios/teselas servir
+#
+# Endpoints:
+#     GET  /salud
+#     GET  /ruta?lat_inicio=-27.4668&lon_inicio=-58.8467&lat_fin=-27.4650&lon_fin=-58.8403&alpha=0.5
+#     POST /rutas        {"pedidos": [{"lat_inicio": ..., "lon_inicio": ..., "lat_fin": ..., "lon_fin": ..., "alpha": 0.5}]}
+#     POST /matriz       {"origenes": [[lat, lon], ...], "destinos": [[lat, lon], ...], "alpha": 0}
+#     GET  /agregados?desde=2018&hasta=2024&dimensiones=anio,hora_num&involucrados=Motocicleta,Bicicleta
+
+# Importaciones
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import cubo
+import datos
+import ingesta
+import instrumentacion
+import jerarquias
+import red_vial
+import riesgo_vial
+import teselas
+from cache_rutas import CacheRutas, armar_entrada
+
+# Constantes
+PUERTO = 8000
+PROCESOS = 1
+ALPHA = 0.5
+CAMPOS_PEDIDO = ['lat_inicio', 'lon_inicio', 'lat_fin', 'lon_fin']
+DIMENSIONES_AGREGADOS = ['anio', 'mes', 'dia', 'hora_num', 'tipo_via', 'semaforo']
+MAX_PEDIDOS = 10_000  # pedidos por lote en el endpoint /rutas
+MAX_CELDAS = 4_000_000  # orígenes x destinos en el endpoint /matriz
+
+
+# Clases
+class Servicio:
+    '''
+    Ruteo y agregados con la red y el cubo cargados una sola vez, seguro para uso desde varios hilos.
+
+    Parameters:
+        directorio_red (str): Carpeta de la red compilada (ver red_vial.guardar_red).
+        ruta_cubo (str): Parquet del cubo de agregados (ver cubo.py).
+        ruta_version (str): Versión de los datos (ver ingesta.py); el cubo se vuelve a abrir cuando cambia.
+        ruta_dataset (str): Dataset particionado, del que salen los agregados filtrados por involucrados.
+        capacidad_cache (int): Rutas que guarda la caché LRU.
+        directorio_teselas (str, opcional): Carpeta de teselas (ver teselas.py); si se indica, se
+            usa en lugar de la red compilada.
+        memoria_teselas (int): Bytes de teselas que se conservan en memoria.
+    '''
+
+    def __init__(self, directorio_red=red_vial.DIRECTORIO_RED, ruta_cubo=cubo.RUTA_CUBO,
+                 capacidad_cache=512, directorio_teselas=None, memoria_teselas=teselas.MEMORIA_MAXIMA,
+                 ruta_version=ingesta.RUTA_VERSION, ruta_dataset=datos.RUTA_DATASET):
+        self._red, self.teselas = None, None
+        self.directorio_red = directorio_red
+        self._lock_red = threading.Lock()
+        with instrumentacion.tramo('servicio_carga'):
+            if directorio_teselas:
+                self.teselas = teselas.RedTeselada(directorio_teselas, memoria_teselas)
+            else:
+                self._red = preparar_red(cargar_o_compilar_red(directorio_red))
+        self.ruta_cubo = ruta_cubo
+        self.ruta_version = ruta_version
+        self.ruta_dataset = ruta_dataset
+        self._cubo = (None, None)  # (versión de los datos, cubo)
+        self.cache = CacheRutas(capacidad_cache)
+
+    @property
+    def red(self):
+        # Igual que la caché de rutas, se compara con la versión guardada en disco (meta.json): si
+        # red_vial.py o riesgo_vial.py regeneraron la red, se abre la nueva sin reiniciar el servicio
+        if self._red is None:
+            return None
+        version = red_vial.version_guardada(self.directorio_red)
+        with self._lock_red:
+            if (self._red.version, self._red.version_riesgo) != version:
+                self._red = preparar_red(red_vial.cargar_red(self.directorio_red))
+            return self._red
+
+    @property
+    def cubo(self):
+        # Como en app.py, la versión de los datos es la clave: un lote de ingesta.py o una
+        # reconstrucción del ETL se ven en el siguiente pedido, sin reiniciar el servicio
+        version = ingesta.version_datos(self.ruta_version)
+        version_cargada, datos_cubo = self._cubo
+        if version_cargada != version:
+            datos_cubo = cubo.cargar_cubo(self.ruta_cubo)
+            self._cubo = (version, datos_cubo)
+        return datos_cubo
+
+    def salud(self):
+        if self.teselas is not None:
+            return {'estado': 'ok', 'version_teselas': self.teselas.version,
+                    'teselas': len(self.teselas.meta['teselas']), 'cache_teselas': self.teselas.estadisticas()}
+        red = self.red
+        return {
+            'estado': 'ok',
+            'version_red': red.version,
+            'version_riesgo': red.version_riesgo,
+            'nodos': red.cantidad_nodos,
+            'aristas': red.cantidad_aristas,
+            'cache': self.cache.estadisticas(),
+            'version_datos': ingesta.version_datos(self.ruta_version),
+        }
+
+    def _ruta_teselada(self, punto, alpha):
+        respuesta = {'alpha': alpha}
+        try:
+            entrada = self.teselas.ruta(*punto, alpha)
+        except ValueError as error:
+            respuesta['error'] = str(error)
+            return respuesta
+        respuesta.update({clave: entrada[clave] for clave in ('osmid_inicio', 'osmid_fin', 'longitud', 'riesgo', 'semaforos')})
+        respuesta.update({clave: round(entrada[clave], 1) for clave in ('distancia_inicio', 'distancia_fin')})
+        respuesta['coordenadas'] = [list(coordenada) for coordenada in entrada['coordenadas']]
+        return respuesta
+
+    def _calcular_grupo(self, red, origen, destinos, alpha):
+        tablas = jerarquias.jerarquia(red, alpha, self.directorio_red) if len(destinos) == 1 else None
+        if tablas is not None:
+            rutas = [jerarquias.ruta_jerarquia(tablas, origen, destinos[0])[0]]
+        else:
+            rutas = riesgo_vial.rutas_seguras(red, origen, destinos, alpha)
+        return [None if ruta is None else armar_entrada(red, ruta) for ruta in rutas]
+
+    def rutas(self, pedidos):
+        '''
+        Resuelve un lote de pedidos de ruta segura.
+
+        Parameters:
+            pedidos (list): Diccionarios con 'lat_inicio', 'lon_inicio', 'lat_fin', 'lon_fin' y,
+                opcionalmente, 'alpha' (por defecto ALPHA).
+
+        Returns:
+            list: Una respuesta por pedido, en el mismo orden (ver respuesta_ruta), con 'error' si
+            algún punto está fuera de la red o no existe un camino entre los nodos asignados. Con
+            teselas cada pedido se resuelve en su corredor y los nodos se identifican por su osmid.
+        '''
+        if not pedidos:
+            return []
+        with instrumentacion.tramo('servicio_rutas', pedidos=len(pedidos)):
+            puntos = validar_pedidos(pedidos)
+            alphas = [round(float(pedido.get('alpha', ALPHA)), 3) for pedido in pedidos]
+            if self.teselas is not None:
+                return [self._ruta_teselada(punto, alpha) for punto, alpha in zip(puntos.tolist(), alphas)]
+            red = self.red  # la misma versión de la red para todo el lote
+            nodos, distancias = red_vial.nodos_mas_cercanos(
+                red, np.concatenate([puntos[:, 0], puntos[:, 2]]), np.concatenate([puntos[:, 1], puntos[:, 3]]),
+            )
+            inicios, fines = nodos[:len(pedidos)], nodos[len(pedidos):]
+            fuera = np.maximum(distancias[:len(pedidos)], distancias[len(pedidos):]) > red_vial.DISTANCIA_MAXIMA_NODO
+
+            self.cache.validar_version((red.version, red.version_riesgo))
+            entradas = [None] * len(pedidos)
+            faltantes = defaultdict(list)  # (origen, alpha) -> posiciones de los pedidos sin caché
+            for i, (inicio, fin, alpha) in enumerate(zip(inicios.tolist(), fines.tolist(), alphas)):
+                if fuera[i]:
+                    continue
+                entradas[i] = self.cache.obtener((inicio, fin, alpha))
+                if entradas[i] is None:
+                    faltantes[(inicio, alpha)].append(i)
+
+            grupos = {grupo: sorted({int(fines[i]) for i in posiciones}) for grupo, posiciones in faltantes.items()}
+            for (origen, alpha), destinos in grupos.items():
+                por_destino = dict(zip(destinos, self._calcular_grupo(red, origen, destinos, alpha)))
+                for destino, entrada in por_destino.items():
+                    if entrada is not None:
+                        self.cache.guardar((origen, destino, alpha), entrada)
+                for i in faltantes[(origen, alpha)]:
+                    entradas[i] = por_destino[int(fines[i])]
+
+            return [
+                respuesta_ruta(entrada, int(inicios[i]), int(fines[i]), alphas[i],
+                               float(distancias[i]), float(distancias[len(pedidos) + i]))
+                for i, entrada in enumerate(entradas)
+            ]
+
+    def ruta(self, lat_inicio, lon_inicio, lat_fin, lon_fin, alpha=ALPHA):
+        '''
+        Resuelve un único pedido de ruta segura (ver rutas).
+        '''
+        pedido = {'lat_inicio': lat_inicio, 'lon_inicio': lon_inicio, 'lat_fin': lat_fin, 'lon_fin': lon_fin,
+                  'alpha': alpha}
+        return self.rutas([pedido])[0]
+
+    def matriz(self, origenes, destinos, alpha=0.0):
+        '''
+        Calcula la matriz de costos de muchos orígenes a muchos destinos (ver riesgo_vial.matriz_costos).
+
+        Parameters:
+            origenes, destinos (list): Puntos [latitud, longitud]; cada uno se asigna a su nodo más cercano.
+            alpha (float): 0 para distancias en metros; entre 0 y 1 para el costo combinado con el riesgo.
+
+        Returns:
+            dict: 'alpha' y 'costos' (una fila por origen; None donde no hay camino).
+
+        Raises:
+            ValueError: Si algún punto no es válido o está fuera de la red (a más de
+                red_vial.DISTANCIA_MAXIMA_NODO de todo nodo).
+        '''
+        if self.teselas is not None:
+            raise ValueError('La matriz de costos no está disponible con la red en teselas')
+        if len(origenes) * len(destinos) > MAX_CELDAS:
+            raise ValueError(f'Se admiten hasta {MAX_CELDAS} celdas (orígenes x destinos) por matriz')
+        with instrumentacion.tramo('servicio_matriz', origenes=len(origenes), destinos=len(destinos)):
+            puntos = validar_puntos(list(origenes) + list(destinos))
+            red = self.red
+            nodos, distancias = red_vial.nodos_mas_cercanos(red, puntos[:, 0], puntos[:, 1])
+            fuera = np.flatnonzero(distancias > red_vial.DISTANCIA_MAXIMA_NODO)
+            if len(fuera):
+                nombres = [f'origen {i}' if i < len(origenes) else f'destino {i - len(origenes)}' for i in fuera.tolist()]
+                raise ValueError(f'Puntos fuera de la red (a más de {red_vial.DISTANCIA_MAXIMA_NODO:.0f} m '
+                                 f'de todo nodo): {", ".join(nombres[:20])}')
+            alpha = round(float(alpha), 3)
+            costos = riesgo_vial.matriz_costos(red, nodos[:len(origenes)], nodos[len(origenes):], alpha)
+            return {'alpha': alpha,
+                    'costos': [[None if np.isinf(costo) else round(costo, 3) for costo in fila] for fila in costos.tolist()]}
+
+    def agregados(self, rango_anios=None, dimensiones=None, involucrados=None):
+        '''
+        Devuelve los KPIs y los conteos por dimensión del cubo filtrado por un rango de años.
+
+        Parameters:
+            rango_anios (tuple, opcional): (año inicial, año final); por defecto, todos los años.
+            dimensiones (list, opcional): Dimensiones de DIMENSIONES_AGREGADOS a contar; por defecto, todas.
+            involucrados (list, opcional): Tipos de datos.TIPOS_INVOLUCRADO; si se indican, sólo
+                cuentan los siniestros con alguno de ellos.
+
+        Returns:
+            dict: 'rango_anios', 'involucrados', 'kpis' y 'conteos' ({dimension: {valor: cantidad}}).
+
+        Raises:
+            ValueError: Si alguna dimensión o tipo de involucrado es desconocido.
+        '''
+        dimensiones = dimensiones or DIMENSIONES_AGREGADOS
+        desconocidas = [d for d in dimensiones if d not in DIMENSIONES_AGREGADOS]
+        if desconocidas:
+            raise ValueError(f'Dimensiones desconocidas: {", ".join(desconocidas)} '
+                             f'(opciones: {", ".join(DIMENSIONES_AGREGADOS)})')
+        involucrados = involucrados or []
+        mascara = datos.mascara_involucrados(involucrados)
+
+        with instrumentacion.tramo('servicio_agregados'):
+            datos_cubo = self.cubo
+            if rango_anios is None:
+                rango_anios = (int(datos_cubo['anio'].min()), int(datos_cubo['anio'].max()))
+            if mascara:
+                filtrado = cubo.cubo_involucrados(rango_anios, mascara, self.ruta_dataset)
+            else:
+                filtrado = cubo.filtrar_cubo(datos_cubo, rango_anios)
+            conteos = {}
+            for dimension in dimensiones:
+                conteo = cubo.conteo_por(filtrado, dimension)
+                conteos[dimension] = {_valor_json(valor): int(cantidad)
+                                      for valor, cantidad in zip(conteo[dimension], conteo['cantidad'])}
+            return {'rango_anios': list(rango_anios), 'involucrados': involucrados, 'kpis': cubo.kpis(filtrado),
+                    'conteos': conteos}
+
+
+class Manejador(BaseHTTPRequestHandler):
+    '''
+    Atiende los pedidos HTTP/JSON; el Servicio compartido se asigna en el atributo de clase 'servicio'.
+    '''
+    servicio = None
+    protocol_version = 'HTTP/1.1'
+
+    def _responder(self, estado, contenido):
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _atender(self, funcion):
+        try:
+            contenido = funcion()
+            # /ruta responde un solo pedido: si no tiene solución (fuera de la red o sin camino) es un 422
+            self._responder(422 if 'error' in contenido else 200, contenido)
+        except (KeyError, ValueError, TypeError, json.JSONDecodeError) as error:
+            self._responder(400, {'error': str(error)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        if url.path == '/salud':
+            self._atender(self.servicio.salud)
+        elif url.path == '/ruta':
+            self._atender(lambda: self.servicio.rutas([parametros])[0])
+        elif url.path == '/agregados':
+            self._atender(lambda: self.servicio.agregados(
+                _rango(parametros.get('desde'), parametros.get('hasta')),
+                parametros['dimensiones'].split(',') if parametros.get('dimensiones') else None,
+                parametros['involucrados'].split(',') if parametros.get('involucrados') else None,
+            ))
+        else:
+            self._responder(404, {'error': f'Ruta desconocida: {url.path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ('/rutas', '/matriz'):
+            self._responder(404, {'error': f'Ruta desconocida: {url.path}'})
+            return
+
+        def resolver():
+            longitud = int(self.headers.get('Content-Length', 0))
+            cuerpo = json.loads(self.rfile.read(longitud) or b'{}')
+            if url.path == '/matriz':
+                return self.servicio.matriz(cuerpo['origenes'], cuerpo['destinos'], cuerpo.get('alpha', 0.0))
+            pedidos = cuerpo['pedidos']
+            if len(pedidos) > MAX_PEDIDOS:
+                raise ValueError(f'Se admiten hasta {MAX_PEDIDOS} pedidos por lote')
+            return {'rutas': self.servicio.rutas(pedidos)}
+        self._atender(resolver)
+
+    def log_message(self, formato, *args):
+        sys.stderr.write(f'{self.address_string()} - {formato % args}\n')
+
+
+# Funciones
+def cargar_o_compilar_red(directorio=red_vial.DIRECTORIO_RED, ruta_json=red_vial.RUTA_OVERPASS):
+    '''
+    Abre la red compilada o, si no existe, la compila desde la respuesta de Overpass en cache/ (sin internet).
+    '''
+    if not os.path.exists(os.path.join(directorio, 'meta.json')):
+        if not os.path.exists(ruta_json):
+            raise FileNotFoundError(f'No existe la red compilada en {directorio} ni la respuesta de Overpass {ruta_json}')
+        red_vial.guardar_red(red_vial.compilar_csr(red_vial.descargar_grafo(ruta_json)), directorio)
+    return red_vial.cargar_red(directorio)
+
+
+def preparar_red(red):
+    '''
+    Arma el KD-tree y la matriz de longitudes de la red ahora, y no en el primer pedido.
+    '''
+    red.indice_nodos
+    red.matriz()
+    return red
+
+
+def validar_pedidos(pedidos):
+    '''
+    Convierte los pedidos en una matriz (N, 4) de coordenadas y verifica que sean números finitos.
+
+    Raises:
+        ValueError: Si falta algún campo de CAMPOS_PEDIDO o alguna coordenada no es válida.
+    '''
+    try:
+        puntos = np.array([[float(pedido[campo]) for campo in CAMPOS_PEDIDO] for pedido in pedidos], dtype=np.float64)
+    except KeyError as error:
+        raise ValueError(f'Falta el campo {error.args[0]!r} en un pedido (campos: {", ".join(CAMPOS_PEDIDO)})') from None
+    validar_puntos(puntos.reshape(-1, 2))
+    return puntos
+
+
+def validar_puntos(puntos):
+    '''
+    Convierte una lista de puntos [latitud, longitud] en una matriz (N, 2) y verifica que sean coordenadas válidas.
+
+    Raises:
+        ValueError: Si algún punto no tiene dos coordenadas o alguna está fuera de rango.
+    '''
+    try:
+        puntos = np.array(puntos, dtype=np.float64).reshape(len(puntos), -1)
+    except (TypeError, ValueError):
+        raise ValueError('Cada punto debe ser [latitud, longitud]') from None
+    if puntos.shape[1:] != (2,) and len(puntos):
+        raise ValueError('Cada punto debe ser [latitud, longitud]')
+    if not np.isfinite(puntos).all() or (np.abs(puntos[:, 0]) > 90).any() or (np.abs(puntos[:, 1]) > 180).any():
+        raise ValueError('Coordenadas fuera de rango en algún pedido')
+    return puntos
+
+
+def respuesta_ruta(entrada, nodo_inicio, nodo_fin, alpha, distancia_inicio, distancia_fin):
+    '''
+    Arma la respuesta JSON de una ruta a partir de su entrada de caché (ver cache_rutas.armar_entrada).
+
+    Returns:
+        dict: Nodos asignados y su distancia al punto pedido, 'alpha', 'longitud', 'riesgo',
+        'semaforos' y 'coordenadas' ([latitud, longitud] de cada nodo); o 'error' si algún punto
+        está fuera de la red o no hay camino.
+    '''
+    respuesta = {
+        'nodo_inicio': nodo_inicio,
+        'nodo_fin': nodo_fin,
+        'distancia_inicio': round(distancia_inicio, 1),
+        'distancia_fin': round(distancia_fin, 1),
+        'alpha': alpha,
+    }
+    if max(distancia_inicio, distancia_fin) > red_vial.DISTANCIA_MAXIMA_NODO:
+        respuesta['error'] = (f'El punto de {"inicio" if distancia_inicio >= distancia_fin else "fin"} está '
+                              f'fuera de la red (a más de {red_vial.DISTANCIA_MAXIMA_NODO:.0f} m de todo nodo)')
+        return respuesta
+    if entrada is None:
+        respuesta['error'] = f'No existe una ruta entre los nodos {nodo_inicio} y {nodo_fin}'
+        return respuesta
+    respuesta.update({
+        'longitud': entrada['longitud'],
+        'riesgo': entrada['riesgo'],
+        'semaforos': entrada['semaforos'],
+        'coordenadas': [list(coordenada) for coordenada in entrada['coordenadas']],
+    })
+    return respuesta
+
+
+def _rango(desde, hasta):
+    if desde is None and hasta is None:
+        return None
+    if desde is None or hasta is None:
+        raise ValueError("Indique 'desde' y 'hasta' para filtrar por años")
+    return int(desde), int(hasta)
+
+
+def _valor_json(valor):
+    # Las claves de los conteos en JSON: enteros (año, hora, ...) o texto (tipo de vía, semáforo)
+    return int(valor) if isinstance(valor, (int, np.integer)) or (isinstance(valor, float) and valor.is_integer()) else str(valor)
+
+
+def crear_servidor(servicio, host='127.0.0.1', puerto=PUERTO):
+    '''
+    Crea el servidor HTTP (un hilo por conexión) que atiende los pedidos con el servicio dado.
+    '''
+    manejador = type('ManejadorServicio', (Manejador,), {'servicio': servicio})
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def leer_pedidos(ruta):
+    '''
+    Lee los pedidos de un CSV (con columnas CAMPOS_PEDIDO y, opcionalmente, 'alpha') o de un JSON-lines.
+    '''
+    if ruta.endswith(('.jsonl', '.json')):
+        with open(ruta, encoding='utf-8') as archivo:
+            return [json.loads(linea) for linea in archivo if linea.strip()]
+    return pd.read_csv(ruta).to_dict('records')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servicio de rutas seguras y agregados de siniestros.')
+    parser.add_argument('--red', default=red_vial.DIRECTORIO_RED, help='Carpeta de la red compilada')
+    parser.add_argument('--teselas', default=None, help='Carpeta de la red en teselas (en lugar de --red)')
+    parser.add_argument('--memoria-teselas', type=float, default=teselas.MEMORIA_MAXIMA / 2 ** 20,
+                        help='Límite de la caché de teselas (MB)')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_servir = subparsers.add_parser('servir', help='Atiende pedidos HTTP/JSON')
+    parser_servir.add_argument('--host', default='127.0.0.1', help='Dirección en la que escuchar')
+    parser_servir.add_argument('--puerto', type=int, default=PUERTO, help='Puerto en el que escuchar')
+    parser_servir.add_argument('--procesos', type=int, default=PROCESOS,
+                               help='Procesos que atienden el mismo puerto (uno por núcleo para rutear en paralelo)')
+
+    parser_lote = subparsers.add_parser('lote', help='Resuelve un archivo de pedidos y escribe una respuesta JSON por línea')
+    parser_lote.add_argument('pedidos', help='CSV o JSON-lines con lat_inicio, lon_inicio, lat_fin, lon_fin y alpha')
+    parser_lote.add_argument('--salida', default=None, help='Archivo JSON-lines de salida (por defecto, la salida estándar)')
+    args = parser.parse_args()
+
+    servicio_rutas = Servicio(args.red, directorio_teselas=args.teselas,
+                              memoria_teselas=int(args.memoria_teselas * 2 ** 20))
+    if args.comando == 'servir':
+        servidor = crear_servidor(servicio_rutas, args.host, args.puerto)
+        cobertura = (f"{len(servicio_rutas.teselas.meta['teselas'])} teselas" if servicio_rutas.teselas
+                     else f'{servicio_rutas.red.cantidad_nodos} nodos')
+        print(f'Servicio escuchando en http://{args.host}:{args.puerto} ({cobertura}, {args.procesos} procesos)')
+        # Los procesos se crean después de abrir el socket y cargar la red: comparten el puerto
+        # (el sistema reparte las conexiones) y las páginas de la red abierta por memory-map
+        hijos = []
+        for _ in range(args.procesos - 1):
+            pid = os.fork()
+            if pid == 0:
+                hijos = None
+                break
+            hijos.append(pid)
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+            for pid in hijos or []:
+                os.waitpid(pid, 0)
+    else:
+        respuestas = servicio_rutas.rutas(leer_pedidos(args.pedidos))
+        salida = open(args.salida, 'w', encoding='utf-8') if args.salida else sys.stdout
+        try:
+            for respuesta_pedido in respuestas:
+                salida.write(json.dumps(respuesta_pedido, ensure_ascii=False) + '\n')
+        finally:
+            if args.salida:
+                salida.close()
@@ -0,0 +1,451 @@
+## RED VIAL EN TESELAS CON CARGA BAJO DEMANDA
+# Para cubrir la provincia o varias ciudades sin cargar una única red enorme en cada worker, la
+# red compilada (ver red_vial.py) se parte en teselas de TAMANIO_TESELA grados guardadas en
+# disco. Cada tesela guarda sus nodos (identificados por su osmid, único en todo OpenStreetMap)
+# y las aristas que salen de ellos; las que cruzan el borde apuntan al osmid del nodo de la
+# tesela vecina. Agregar otra ciudad es volver a particionar su red sobre la misma carpeta.
+#
+# Para una ruta se cargan sólo las teselas del corredor entre el origen y el destino (el
+# rectángulo que los contiene más un margen) y se unen en una RedVial: las aristas de borde se
+# reconectan por osmid y las que salen del corredor se descartan. Si no hay camino dentro del
+# corredor, el margen se duplica y se reintenta. Las teselas quedan en una caché LRU acotada
+# por bytes, así la memoria crece con el área consultada y no con el área cubierta. Los
+# corredores ya armados (la RedVial con su KD-tree y sus matrices de costos) quedan en otra
+# caché LRU de SUBREDES entradas, de modo que las rutas dentro de la misma zona no vuelven a
+# unir teselas. Las medias de longitud y riesgo se guardan para toda la red, de modo que el
+# costo de cada arista (y la ruta) no dependa del corredor cargado.
+#
+# Las teselas se regeneran con la red: etl.py y riesgo_vial.py llaman a actualizar_teselas
+# después de guardar el riesgo, y el dashboard la llama si la red guardada es más nueva que
+# sus teselas. Un riesgo nuevo reemplaza al anterior en las mismas teselas; una red recompilada
+# rehace la carpeta (junto con las demás redes que tenga, desde sus carpetas de origen).
+#
+# Uso:
+#     python teselas.py particionar --red Datasets_limpios/red_vial
+#     python teselas.py ruta -27.4668 -58.8467 -27.4650 -58.8403 --alpha 0.5
+
+# Importaciones
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import red_vial
+import riesgo_vial
+from cache_rutas import CacheRutas, armar_entrada
+from indice_espacial import METROS_POR_GRADO
+
+# Constantes
+DIRECTORIO_TESELAS = 'Datasets_limpios/teselas'
+TAMANIO_TESELA = 0.01  # grados (~1,1 km de latitud)
+MARGEN = 500.0  # metros alrededor del rectángulo origen-destino
+AMPLIACIONES = 3  # veces que se duplica el margen si no hay camino dentro del corredor
+MEMORIA_MAXIMA = 256 * 2 ** 20  # bytes de teselas en la caché
+SUBREDES = 32  # corredores armados (RedVial con su KD-tree y matrices) que se conservan
+ARREGLOS_TESELA = ('osmid', 'lat', 'lon', 'semaforos', 'indptr', 'destino', 'longitud', 'riesgo')
+
+
+# Funciones
+def claves_teselas(lat, lon, tamanio=TAMANIO_TESELA):
+    '''
+    Devuelve los índices (columna, fila) de la tesela de cada punto.
+    '''
+    return (np.floor(np.asarray(lon, dtype=np.float64) / tamanio).astype(np.int64),
+            np.floor(np.asarray(lat, dtype=np.float64) / tamanio).astype(np.int64))
+
+
+def _nombre(columna, fila):
+    return f'{columna}_{fila}'
+
+
+def _posiciones_aristas(indptr, nodos):
+    # Posiciones (en los arreglos de aristas) de las aristas que salen de 'nodos', en ese orden
+    cantidades = indptr[nodos + 1] - indptr[nodos]
+    desplazamientos = np.arange(cantidades.sum()) - np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+    return np.repeat(indptr[nodos], cantidades) + desplazamientos, cantidades
+
+
+def _indptr(cantidades):
+    indptr = np.zeros(len(cantidades) + 1, dtype=np.int64)
+    np.cumsum(cantidades, out=indptr[1:])
+    return indptr
+
+
+def leer_tesela(ruta):
+    with np.load(ruta) as archivo:
+        return {nombre: archivo[nombre] for nombre in ARREGLOS_TESELA}
+
+
+def _bytes(tesela):
+    return sum(arreglo.nbytes for arreglo in tesela.values())
+
+
+def unir_teselas(teselas):
+    '''
+    Une teselas en una sola, ordenada por osmid. Si un nodo aparece en más de una tesela, se conserva el primero.
+
+    Parameters:
+        teselas (list): Diccionarios con los ARREGLOS_TESELA.
+
+    Returns:
+        dict: Los ARREGLOS_TESELA de la unión ('destino' sigue expresado en osmid).
+    '''
+    if len(teselas) == 1:
+        return teselas[0]
+    nodos = {nombre: np.concatenate([t[nombre] for t in teselas]) for nombre in ('osmid', 'lat', 'lon', 'semaforos')}
+    aristas = {nombre: np.concatenate([t[nombre] for t in teselas]) for nombre in ('destino', 'longitud', 'riesgo')}
+    desplazamientos = np.cumsum([0] + [len(t['destino']) for t in teselas[:-1]])
+    indptr = np.concatenate([teselas[0]['indptr'][:1]] + [
+        t['indptr'][1:] + desplazamiento for t, desplazamiento in zip(teselas, desplazamientos)
+    ])
+
+    _, primeros = np.unique(nodos['osmid'], return_index=True)  # ordenados por osmid
+    posiciones, cantidades = _posiciones_aristas(indptr, primeros)
+    union = {nombre: arreglo[primeros] for nombre, arreglo in nodos.items()}
+    union.update({nombre: arreglo[posiciones] for nombre, arreglo in aristas.items()})
+    union['indptr'] = _indptr(cantidades)
+    return union
+
+
+def armar_red(tesela, medias=None, version=''):
+    '''
+    Convierte una tesela (o una unión de teselas) en una RedVial, reconectando las aristas por osmid.
+
+    Las aristas cuyo destino no está entre los nodos cargados se descartan.
+
+    Returns:
+        RedVial: La red del área cargada, con 'riesgo', 'semaforos' y 'medias'.
+    '''
+    osmid = tesela['osmid']
+    origen = np.repeat(np.arange(len(osmid)), np.diff(tesela['indptr']))
+    destino = np.minimum(np.searchsorted(osmid, tesela['destino']), max(len(osmid) - 1, 0))
+    validas = osmid[destino] == tesela['destino']
+    # Dentro de cada nodo las aristas quedan ordenadas por destino (lo supone riesgo_vial.resumen_ruta)
+    orden = np.lexsort((destino[validas], origen[validas]))
+    posiciones = np.flatnonzero(validas)[orden]
+
+    return red_vial.RedVial(
+        indptr=_indptr(np.bincount(origen[posiciones], minlength=len(osmid))).astype(np.int32),
+        indices=destino[posiciones].astype(np.int32),
+        longitud=tesela['longitud'][posiciones],
+        lat=tesela['lat'],
+        lon=tesela['lon'],
+        osmid=osmid,
+        version=version,
+        riesgo=tesela['riesgo'][posiciones],
+        semaforos=tesela['semaforos'],
+        version_riesgo=version,
+        medias=medias,
+    )
+
+
+def leer_meta(directorio=DIRECTORIO_TESELAS):
+    '''
+    Devuelve el contenido de 'meta.json' de la carpeta de teselas, o None si todavía no se particionó ninguna red.
+    '''
+    ruta_meta = os.path.join(directorio, 'meta.json')
+    if not os.path.exists(ruta_meta):
+        return None
+    with open(ruta_meta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def version_guardada(directorio=DIRECTORIO_TESELAS):
+    '''
+    Devuelve la versión de las teselas guardadas (None si no hay), para usarla como clave de caché.
+    '''
+    meta = leer_meta(directorio)
+    return None if meta is None else meta['version']
+
+
+def particionar(red, directorio=DIRECTORIO_TESELAS, tamanio=TAMANIO_TESELA, origen=None):
+    '''
+    Parte una red compilada en teselas y las guarda en 'directorio', junto a un 'meta.json'.
+
+    Si la carpeta ya tiene teselas del mismo tamaño (por ejemplo, de otra ciudad), la red se
+    agrega: las teselas compartidas se unen por osmid y las medias se recalculan para el total.
+    Si ya tiene la misma red con otro riesgo, los nodos de la red reemplazan a los anteriores.
+
+    Parameters:
+        red (RedVial): La red compilada, con su riesgo.
+        directorio (str): Carpeta de las teselas.
+        tamanio (float): Lado de cada tesela en grados.
+        origen (str, opcional): Carpeta de la red compilada, para rehacer la carpeta si se recompila
+            (ver actualizar_teselas).
+
+    Returns:
+        dict: El contenido de 'meta.json'.
+    '''
+    os.makedirs(directorio, exist_ok=True)
+    meta = leer_meta(directorio) or {'tamanio': tamanio, 'teselas': {}, 'redes': []}
+    if meta['tamanio'] != tamanio:
+        raise ValueError(f"Las teselas de {directorio} son de {meta['tamanio']} grados, no de {tamanio}")
+    if any(entrada['version'] == red.version and entrada['version_riesgo'] == red.version_riesgo
+           for entrada in meta['redes']):
+        return meta  # esta red ya fue particionada en la carpeta
+    # La misma red con otro riesgo: sus aristas se reemplazan (la tesela nueva va primero en la unión)
+    meta['redes'] = [entrada for entrada in meta['redes'] if entrada['version'] != red.version]
+
+    indptr = np.asarray(red.indptr, dtype=np.int64)
+    riesgo = np.zeros(red.cantidad_aristas, np.float32) if red.riesgo is None else np.asarray(red.riesgo, np.float32)
+    semaforos = np.zeros(red.cantidad_nodos, np.uint8) if red.semaforos is None else np.asarray(red.semaforos, np.uint8)
+    columnas, filas = claves_teselas(red.lat, red.lon, tamanio)
+    orden = np.lexsort((np.asarray(red.osmid), filas, columnas))
+    cortes = np.flatnonzero((np.diff(columnas[orden]) != 0) | (np.diff(filas[orden]) != 0)) + 1
+
+    for nodos in np.split(orden, cortes):
+        nombre = _nombre(columnas[nodos[0]], filas[nodos[0]])
+        posiciones, cantidades = _posiciones_aristas(indptr, nodos)
+        tesela = {
+            'osmid': np.asarray(red.osmid, dtype=np.int64)[nodos],
+            'lat': np.asarray(red.lat, dtype=np.float32)[nodos],
+            'lon': np.asarray(red.lon, dtype=np.float32)[nodos],
+            'semaforos': semaforos[nodos],
+            'indptr': _indptr(cantidades),
+            'destino': np.asarray(red.osmid, dtype=np.int64)[np.asarray(red.indices)[posiciones]],
+            'longitud': np.asarray(red.longitud, dtype=np.float32)[posiciones],
+            'riesgo': riesgo[posiciones],
+        }
+        ruta = os.path.join(directorio, f'{nombre}.npz')
+        if nombre in meta['teselas']:
+            tesela = unir_teselas([tesela, leer_tesela(ruta)])
+        np.savez(ruta, **tesela)
+        meta['teselas'][nombre] = {'nodos': len(tesela['osmid']), 'aristas': len(tesela['destino']),
+                                   'bytes': sum(arreglo.nbytes for arreglo in tesela.values())}
+
+    meta['redes'].append({
+        'version': red.version,
+        'version_riesgo': red.version_riesgo,
+        'origen': origen,
+        'suma_longitud': float(np.asarray(red.longitud, dtype=np.float64).sum()),
+        'aristas': int(red.cantidad_aristas),
+        'suma_riesgo': float(riesgo.sum(dtype=np.float64)),
+        'aristas_con_riesgo': int((riesgo > 0).sum()),
+    })
+    for total in ('suma_longitud', 'aristas', 'suma_riesgo', 'aristas_con_riesgo'):
+        meta[total] = sum(entrada[total] for entrada in meta['redes'])
+    versiones = [[entrada['version'], entrada['version_riesgo']] for entrada in meta['redes']]
+    meta['version'] = hashlib.sha1(json.dumps(versiones).encode()).hexdigest()[:16]
+    with open(os.path.join(directorio, 'meta.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(meta, archivo, indent=2)
+    return meta
+
+
+def actualizar_teselas(directorio_red=red_vial.DIRECTORIO_RED, directorio=DIRECTORIO_TESELAS):
+    '''
+    Particiona la red compilada de 'directorio_red' si las teselas no tienen su versión actual.
+
+    Un riesgo nuevo se particiona sobre las mismas teselas. Si la red se recompiló, sus nodos
+    anteriores no se pueden quitar de las teselas: la carpeta se rehace en una carpeta temporal
+    con la red nueva y las demás redes (desde sus carpetas de origen) y luego se reemplaza.
+
+    Returns:
+        dict: El contenido de 'meta.json' de las teselas.
+    '''
+    version, version_riesgo = red_vial.version_guardada(directorio_red)
+    meta = leer_meta(directorio)
+    if meta is None:
+        return particionar(red_vial.cargar_red(directorio_red), directorio, origen=directorio_red)
+    if any(entrada['version'] == version and entrada['version_riesgo'] == version_riesgo for entrada in meta['redes']):
+        return meta
+    recompilada = any(entrada['origen'] == directorio_red and entrada['version'] != version for entrada in meta['redes'])
+    if not recompilada:
+        return particionar(red_vial.cargar_red(directorio_red), directorio, meta['tamanio'], directorio_red)
+
+    temporal = f'{directorio}.nuevo'
+    shutil.rmtree(temporal, ignore_errors=True)
+    otras = [entrada['origen'] for entrada in meta['redes'] if entrada['origen'] != directorio_red]
+    for origen in [directorio_red] + [origen for origen in otras if origen and os.path.isdir(origen)]:
+        meta_nueva = particionar(red_vial.cargar_red(origen), temporal, meta['tamanio'], origen)
+    anterior = f'{directorio}.anterior'
+    os.replace(directorio, anterior)
+    os.replace(temporal, directorio)
+    shutil.rmtree(anterior)
+    return meta_nueva
+
+
+# Clases
+class RedTeselada:
+    '''
+    Red vial particionada en teselas que se cargan bajo demanda, con una caché LRU acotada por memoria.
+
+    Es segura para uso desde varios hilos. El límite de memoria se aplica a la caché de teselas:
+    las del corredor que se está usando pueden superarlo mientras dura la consulta, y los
+    corredores armados (hasta 'subredes') ocupan memoria aparte.
+
+    Parameters:
+        directorio (str): Carpeta generada por particionar.
+        memoria_maxima (int): Bytes de teselas que se conservan en la caché.
+        subredes (int): Corredores armados que se conservan.
+        capacidad_cache (int): Rutas que guarda la caché LRU (ver cache_rutas.CacheRutas).
+    '''
+
+    def __init__(self, directorio=DIRECTORIO_TESELAS, memoria_maxima=MEMORIA_MAXIMA, subredes=SUBREDES,
+                 capacidad_cache=512):
+        self.meta = leer_meta(directorio)
+        if self.meta is None:
+            raise FileNotFoundError(f'No hay teselas en {directorio}; ejecute python teselas.py particionar')
+        self.directorio = directorio
+        self.memoria_maxima = memoria_maxima
+        self.tamanio = self.meta['tamanio']
+        self.version = self.meta['version']
+        self.medias = (
+            self.meta['suma_longitud'] / max(self.meta['aristas'], 1),
+            self.meta['suma_riesgo'] / self.meta['aristas_con_riesgo'] if self.meta['aristas_con_riesgo'] else 1.0,
+        )
+        self.cargadas = 0
+        self.aciertos = 0
+        self._teselas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.subredes = subredes
+        self.subredes_armadas = 0
+        self._subredes = OrderedDict()
+        self._lock_subredes = threading.Lock()
+        self.cache = CacheRutas(capacidad_cache)
+        self.cache.validar_version(self.version)
+
+    def tesela(self, nombre):
+        '''
+        Devuelve una tesela desde la caché o desde el disco, descartando las menos usadas si se supera el límite.
+        '''
+        with self._lock:
+            tesela = self._teselas.get(nombre)
+            if tesela is not None:
+                self._teselas.move_to_end(nombre)
+                self.aciertos += 1
+                return tesela
+            tesela = leer_tesela(os.path.join(self.directorio, f'{nombre}.npz'))
+            self.cargadas += 1
+            self._teselas[nombre] = tesela
+            self._bytes += _bytes(tesela)
+            while self._bytes > self.memoria_maxima and len(self._teselas) > 1:
+                _, descartada = self._teselas.popitem(last=False)
+                self._bytes -= _bytes(descartada)
+            return tesela
+
+    def corredor(self, lat_inicio, lon_inicio, lat_fin, lon_fin, margen=MARGEN):
+        '''
+        Devuelve los nombres de las teselas existentes que tocan el rectángulo de ambos puntos más el margen (metros).
+        '''
+        margen_lat = margen / METROS_POR_GRADO
+        margen_lon = margen_lat / np.cos(np.radians((lat_inicio + lat_fin) / 2))
+        columnas, filas = claves_teselas(
+            [min(lat_inicio, lat_fin) - margen_lat, max(lat_inicio, lat_fin) + margen_lat],
+            [min(lon_inicio, lon_fin) - margen_lon, max(lon_inicio, lon_fin) + margen_lon],
+            self.tamanio,
+        )
+        return [
+            _nombre(columna, fila)
+            for columna in range(columnas[0], columnas[1] + 1) for fila in range(filas[0], filas[1] + 1)
+            if _nombre(columna, fila) in self.meta['teselas']
+        ]
+
+    def subred(self, nombres):
+        '''
+        Devuelve la RedVial de las teselas indicadas, desde la caché de corredores o uniéndolas
+        (y cargándolas si hace falta). El KD-tree y las matrices de costos quedan con la red.
+        '''
+        clave = tuple(sorted(nombres))
+        with self._lock_subredes:
+            red = self._subredes.get(clave)
+            if red is not None:
+                self._subredes.move_to_end(clave)
+                return red
+            version = hashlib.sha1(f"{self.version}-{','.join(clave)}".encode()).hexdigest()[:16]
+            red = armar_red(unir_teselas([self.tesela(nombre) for nombre in clave]), self.medias, version)
+            self.subredes_armadas += 1
+            self._subredes[clave] = red
+            while len(self._subredes) > self.subredes:
+                self._subredes.popitem(last=False)
+            return red
+
+    def ruta(self, lat_inicio, lon_inicio, lat_fin, lon_fin, alpha=0.5, margen=MARGEN, ampliaciones=AMPLIACIONES):
+        '''
+        Calcula la ruta segura entre dos puntos cargando sólo las teselas del corredor.
+
+        Las rutas quedan en la caché LRU 'cache', con clave (osmid de inicio, osmid de fin, alpha).
+
+        Returns:
+            dict: La entrada de la ruta (ver cache_rutas.armar_entrada) con los osmid de los nodos
+            asignados ('osmid_inicio', 'osmid_fin'), su distancia a los puntos pedidos y las teselas usadas.
+
+        Raises:
+            ValueError: Si los puntos están fuera de la cobertura, alguno queda a más de
+                red_vial.DISTANCIA_MAXIMA_NODO de todo nodo o no hay camino tras las ampliaciones.
+        '''
+        for _ in range(ampliaciones + 1):
+            nombres = self.corredor(lat_inicio, lon_inicio, lat_fin, lon_fin, margen)
+            if not nombres:
+                raise ValueError('Los puntos están fuera de la cobertura de las teselas')
+            red = self.subred(nombres)
+            nodos, distancias = red_vial.nodos_mas_cercanos(red, [lat_inicio, lat_fin], [lon_inicio, lon_fin])
+            # El corredor incluye todo lo que está a MARGEN (>= DISTANCIA_MAXIMA_NODO) de cada punto,
+            # así que un nodo más lejano que el límite en el corredor también lo es en toda la red
+            if distancias.max() > red_vial.DISTANCIA_MAXIMA_NODO:
+                raise ValueError(f'Algún punto está fuera de la red (a más de {red_vial.DISTANCIA_MAXIMA_NODO:.0f} m '
+                                 f'de todo nodo)')
+            clave = (int(red.osmid[nodos[0]]), int(red.osmid[nodos[1]]), round(float(alpha), 3))
+            entrada = self.cache.obtener(clave)
+            if entrada is None:
+                ruta = riesgo_vial.rutas_seguras(red, int(nodos[0]), [int(nodos[1])], alpha)[0]
+                if ruta is not None:
+                    entrada = armar_entrada(red, ruta)
+                    entrada['teselas'] = len(nombres)
+                    self.cache.guardar(clave, entrada)
+            if entrada is not None:
+                return {**entrada, 'osmid_inicio': clave[0], 'osmid_fin': clave[1],
+                        'distancia_inicio': float(distancias[0]), 'distancia_fin': float(distancias[1])}
+            if len(nombres) == len(self.meta['teselas']):
+                break
+            margen *= 2
+        raise ValueError('No existe una ruta entre los puntos dentro de la cobertura de las teselas')
+
+    def estadisticas(self):
+        '''
+        Devuelve las teselas y bytes en caché, el límite, los contadores de cargas y aciertos y
+        los corredores armados y en caché.
+        '''
+        with self._lock:
+            estadisticas = {
+                'teselas': len(self._teselas),
+                'bytes': self._bytes,
+                'memoria_maxima': self.memoria_maxima,
+                'cargadas': self.cargadas,
+                'aciertos': self.aciertos,
+            }
+        with self._lock_subredes:
+            estadisticas.update({'subredes': len(self._subredes), 'subredes_armadas': self.subredes_armadas})
+        return estadisticas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Red vial en teselas con carga bajo demanda.')
+    parser.add_argument('--teselas', default=DIRECTORIO_TESELAS, help='Carpeta de las teselas')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_particionar = subparsers.add_parser('particionar', help='Parte una red compilada en teselas (o la agrega)')
+    parser_particionar.add_argument('--red', default=red_vial.DIRECTORIO_RED, help='Carpeta de la red compilada')
+    parser_particionar.add_argument('--tamanio', type=float, default=TAMANIO_TESELA, help='Lado de cada tesela en grados')
+
+    parser_ruta = subparsers.add_parser('ruta', help='Calcula una ruta cargando sólo las teselas del corredor')
+    for nombre_coordenada in ('lat_inicio', 'lon_inicio', 'lat_fin', 'lon_fin'):
+        parser_ruta.add_argument(nombre_coordenada, type=float)
+    parser_ruta.add_argument('--alpha', type=float, default=0.5, help='Peso del riesgo frente a la distancia')
+    args = parser.parse_args()
+
+    if args.comando == 'particionar':
+        meta_teselas = particionar(red_vial.cargar_red(args.red), args.teselas, args.tamanio, args.red)
+        print(f"Teselas guardadas en {args.teselas}: {len(meta_teselas['teselas'])} teselas, "
+              f"{meta_teselas['aristas']} aristas (versión {meta_teselas['version']})")
+    else:
+        red_teselada = RedTeselada(args.teselas)
+        entrada_ruta = red_teselada.ruta(args.lat_inicio, args.lon_inicio, args.lat_fin, args.lon_fin, args.alpha)
+        print(f"Ruta de {entrada_ruta['longitud']:.0f} m, riesgo {entrada_ruta['riesgo']:.0f}, "
+              f"{entrada_ruta['semaforos']} semáforos, {entrada_ruta['teselas']} teselas cargadas "
+              f"({red_teselada.estadisticas()['bytes'] / 2 ** 20:.1f} MB)")